@@ -1,16 +1,57 @@
-"""Alerts API: GET list, optionally filtered by classroom_id."""
-from flask import Blueprint, request, jsonify
+"""Alerts API: GET list, optionally filtered by classroom_id.
+Supports incremental polling (?since= / X-Poll-Cursor, in insertion order), keyset
+pagination (?before= / X-Next-Cursor) and conditional requests (ETag / If-None-Match -> 304)."""
+import hashlib
 
-from app.db.store import get_alerts
+from flask import Blueprint, Response, request, jsonify
+
+from app.db.store import get_alerts, get_latest_alert_marker, encode_alert_cursor, is_seq_cursor
 
 bp = Blueprint('alerts', __name__, url_prefix='/api/alerts')
 
 
+def _alerts_etag(marker, query_string: bytes) -> str:
+    """ETag for an alerts response: changes whenever an alert is inserted, whatever its timestamp
+    (or the query differs)."""
+    latest = f"{marker.get('created_seq', '')}|{marker.get('id', '')}" if marker else ''
+    return hashlib.sha1(latest.encode('utf-8') + b'?' + query_string).hexdigest()[:20]
+
+
+def _poll_cursor(marker, alerts: list, since: str = None) -> str:
+    """X-Poll-Cursor: the created_seq to pass as ?since= next, i.e. the last inserted alert covered by this
+    response (the marker, read before the list, unless this was a created_seq poll)."""
+    if is_seq_cursor(since):
+        return str(max([int(since)] + [alert.get('created_seq') or 0 for alert in alerts]))
+    return str((marker or {}).get('created_seq') or 0)
+
+
 @bp.route('', methods=['GET'])
 @bp.route('/', methods=['GET'])
 def list_alerts():
-    """GET /api/alerts — return all alerts, optionally filtered by classroom_id."""
+    """GET /api/alerts — return all alerts, optionally filtered by classroom_id.
+    Query: classroom_id, limit, since (X-Poll-Cursor of the previous response: alerts inserted since, in
+    insertion order; or a cursor / timestamp: only newer timestamps), before (cursor: next page of older alerts).
+    Responses carry an ETag; If-None-Match with the current ETag returns 304.
+    X-Poll-Cursor is the ?since= for the next poll; X-Next-Cursor is set when a limited newest-first page
+    is full (pass it as ?before=), not on ascending ?since=<X-Poll-Cursor> polls.
+    """
     classroom_id = request.args.get('classroom_id')
     limit = request.args.get('limit', type=int)
-    alerts = get_alerts(classroom_id=classroom_id, limit=limit)
-    return jsonify(alerts)
+    since = request.args.get('since')
+    before = request.args.get('before')
+
+    marker = get_latest_alert_marker(classroom_id)
+    etag = _alerts_etag(marker, request.query_string)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    alerts = get_alerts(classroom_id=classroom_id, limit=limit, since=since, before=before)
+    response = jsonify(alerts)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Poll-Cursor'] = _poll_cursor(marker, alerts, since)
+    if limit and len(alerts) == limit and not is_seq_cursor(since):
+        response.headers['X-Next-Cursor'] = encode_alert_cursor(alerts[-1])
+    return response
@@ -1,7 +1,8 @@
-"""Classrooms API: GET list, GET by id."""
-from flask import Blueprint, jsonify
+"""Classrooms API: GET list, GET by id, PUT detection settings."""
+from flask import Blueprint, Response, request, jsonify
 
-from app.db.store import get_all_classrooms, get_classroom_by_id
+from app.db.store import get_all_classrooms_json, get_classroom_json, set_classroom_detection
+from app.sentinel.roi import validate_roi, validate_imgsz, remember_detection_settings
 
 bp = Blueprint('classrooms', __name__, url_prefix='/api/classrooms')
 
@@ -10,14 +11,31 @@ bp = Blueprint('classrooms', __name__, url_prefix='/api/classrooms')
 @bp.route('/', methods=['GET'])
 def list_classrooms():
     """GET /api/classrooms — return all classrooms."""
-    classrooms = get_all_classrooms()
-    return jsonify(classrooms)
+    return Response(get_all_classrooms_json(), mimetype='application/json')
 
 
 @bp.route('/<classroom_id>', methods=['GET'])
 def get_classroom(classroom_id):
     """GET /api/classrooms/<id> — return one classroom or 404."""
-    classroom = get_classroom_by_id(classroom_id)
+    body = get_classroom_json(classroom_id)
+    if body is None:
+        return jsonify({'error': 'Classroom not found'}), 404
+    return Response(body, mimetype='application/json')
+
+
+@bp.route('/<classroom_id>/detection', methods=['PUT'])
+def update_detection(classroom_id):
+    """PUT /api/classrooms/<id>/detection — set the person-detection crop and model input size.
+    Body: { "roi": [x, y, width, height] (fractions of the frame) | null, "imgsz": 320 | null }
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        roi = validate_roi(data.get('roi'))
+        imgsz = validate_imgsz(data.get('imgsz'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    classroom = set_classroom_detection(classroom_id, roi=roi, imgsz=imgsz)
     if classroom is None:
         return jsonify({'error': 'Classroom not found'}), 404
+    remember_detection_settings(classroom)
     return jsonify(classroom)
@@ -0,0 +1,28 @@
+"""Events API: Server-Sent Events stream of new alerts and classroom status changes."""
+from flask import Blueprint, Response, request, stream_with_context
+
+from app.services.events import get_broker
+
+bp = Blueprint('events', __name__, url_prefix='/api/events')
+
+
+@bp.route('', methods=['GET'])
+@bp.route('/', methods=['GET'])
+def stream_events():
+    """GET /api/events — text/event-stream of "alert" and "classroom_status" events.
+    Resumes after the Last-Event-ID header (or ?last_event_id=) from the in-process buffer.
+    Optional ?types=alert,classroom_status filter.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    types = request.args.get('types')
+    event_types = {t.strip() for t in types.split(',') if t.strip()} if types else None
+
+    stream = get_broker().stream(last_event_id=last_event_id, event_types=event_types)
+    return Response(stream_with_context(stream), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # disable proxy buffering (nginx)
+    })
@@ -0,0 +1,41 @@
+"""Ingest API: start/stop server-side frame ingestion per classroom."""
+from flask import Blueprint, request, jsonify
+
+from app.services.ingest import get_ingest_manager, resolve_source
+
+bp = Blueprint('ingest', __name__, url_prefix='/api/ingest')
+
+
+@bp.route('', methods=['GET'])
+@bp.route('/', methods=['GET'])
+def list_ingest():
+    """GET /api/ingest — return running ingest workers and their metrics."""
+    return jsonify({'workers': get_ingest_manager().stats()})
+
+
+@bp.route('', methods=['POST'])
+@bp.route('/', methods=['POST'])
+def start_ingest():
+    """POST /api/ingest — start (or restart) ingestion for a classroom.
+    Body: { "classroom_id": "1", "source": "normal_class.mp4" | "rtsp://...", "sample_fps": 1 }
+    File sources must be in mock-media; stream URLs only for hosts in INGEST_ALLOWED_HOSTS.
+    """
+    data = request.get_json(silent=True) or {}
+    classroom_id = data.get('classroom_id')
+    if not classroom_id:
+        return jsonify({'error': 'classroom_id is required'}), 400
+    try:
+        source = resolve_source(data.get('source'))
+        sample_fps = float(data['sample_fps']) if data.get('sample_fps') is not None else None
+        worker = get_ingest_manager().start(str(classroom_id), source, sample_fps)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(worker.stats()), 201
+
+
+@bp.route('/<classroom_id>', methods=['DELETE'])
+def stop_ingest(classroom_id):
+    """DELETE /api/ingest/<classroom_id> — stop ingestion for a classroom."""
+    if not get_ingest_manager().stop(classroom_id):
+        return jsonify({'error': 'No ingest worker for this classroom'}), 404
+    return jsonify({'message': 'Ingest stopped'})
@@ -0,0 +1,42 @@
+"""Metrics API: Prometheus text exposition of hot-path timers and counters (see app/services/metrics.py)."""
+from flask import Blueprint, Response, jsonify
+
+from app.config import Config
+from app.db.store import store_cache_stats
+from app.db.writer import writer_stats
+from app.services import metrics
+from app.services.events import get_broker
+from app.services.ingest import ingest_stats
+from app.sentinel.gate import gate_stats
+from app.sentinel.rules import rule_state_stats
+from app.sentinel.scheduler import scheduler_stats
+
+bp = Blueprint('metrics', __name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _gauges() -> list:
+    """(name, help, value) gauges sampled from the existing stats at scrape time."""
+    return [
+        ('sentinel_inference_queue_depth', 'Frames waiting in the batching scheduler',
+         scheduler_stats().get('queue_depth', 0)),
+        ('sentinel_inference_gate_skip_ratio', 'Share of frames whose person count was reused',
+         gate_stats().get('skip_ratio')),
+        ('sentinel_rule_state_classrooms', 'Classrooms held in the rule state store',
+         rule_state_stats().get('classrooms')),
+        ('sentinel_persistence_queue_depth', 'Mutations waiting in the write-behind queue',
+         writer_stats().get('queue_depth', 0)),
+        ('sentinel_store_cache_hit_ratio', 'Classroom/video read cache hit ratio',
+         store_cache_stats().get('hit_ratio')),
+        ('sentinel_event_subscribers', 'Open event stream connections', get_broker().stats().get('subscribers')),
+        ('sentinel_ingest_workers', 'Server-side ingest workers', ingest_stats().get('workers')),
+    ]
+
+
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """GET /metrics — Prometheus text format (404 when METRICS_ENABLED=false)."""
+    if not Config.METRICS_ENABLED:
+        return jsonify({'error': 'metrics are disabled (METRICS_ENABLED=false)'}), 404
+    return Response(metrics.render(_gauges()), mimetype=None, content_type=CONTENT_TYPE)
@@ -0,0 +1,44 @@
+"""Reports API: alert summaries per classroom and time range (from pre-aggregated rollups),
+and streamed CSV / NDJSON / PDF exports."""
+from flask import Blueprint, Response, request, jsonify
+
+from app.services.report_generator import (EXPORT_FORMATS, build_summary, export_filename, export_report,
+                                           report_range)
+
+bp = Blueprint('reports', __name__, url_prefix='/api/reports')
+
+
+@bp.route('/summary', methods=['GET'])
+def get_summary():
+    """GET /api/reports/summary — alert counts per type (total and per classroom) for a time range.
+    Query: classroom_id (default all), from / to (ISO 8601, to exclusive; default the last 24 hours),
+    interval (optional "hour" or "day": adds a per-bucket series).
+    """
+    try:
+        start, end = report_range(request.args.get('from'), request.args.get('to'))
+        summary = build_summary(request.args.get('classroom_id'), start, end,
+                                interval=request.args.get('interval'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(summary)
+
+
+@bp.route('/export', methods=['GET'])
+def export():
+    """GET /api/reports/export — download alerts for a time range, streamed from the database.
+    Query: classroom_id, from, to (as /summary), format ("csv", "ndjson" or "pdf"; default csv),
+    dataset ("alerts": raw alerts still stored; "daily": per-classroom daily counts over all history).
+    """
+    classroom_id = request.args.get('classroom_id')
+    fmt = request.args.get('format', 'csv')
+    dataset = request.args.get('dataset', 'alerts')
+    try:
+        start, end = report_range(request.args.get('from'), request.args.get('to'))
+        chunks = export_report(fmt, dataset, classroom_id, start, end)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = Response(chunks, mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename="{export_filename(fmt, dataset, classroom_id, start, end)}"')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
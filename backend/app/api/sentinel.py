@@ -1,17 +1,49 @@
-"""Sentinel API: frame analysis (Empty Class detection)."""
+"""Sentinel API: frame analysis (Empty Class detection) and audio levels.
+
+Vision dependencies (cv2, numpy, the inference backend) are imported on the
+first frame request, not when the blueprint is registered, so cold starts
+serving only classrooms/alerts/videos never load them.
+"""
 import base64
+import io
+import json
+import math
+import time
 
-import cv2
-import numpy as np
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 
-from app.sentinel.vision import count_persons, compute_motion_score
-from app.sentinel.rules import process_empty_class_rule, process_mischief_rule, process_loud_noise_rule
+from app.config import Config
+from app.services.metrics import STAGE_JSON_PARSE, STAGE_BASE64_DECODE, STAGE_IMAGE_DECODE, stage_timer
+from app.sentinel.rules import process_loud_noise_rule, process_loud_noise_batch
 
 bp = Blueprint("sentinel", __name__, url_prefix="/api/sentinel")
 
+# Header carrying the classroom id for binary frame uploads
+CLASSROOM_ID_HEADER = "X-Classroom-Id"
+
+
+def _preflight_response(methods: str = "POST, OPTIONS") -> Response:
+    """CORS preflight response for sentinel routes."""
+    r = Response()
+    r.headers["Access-Control-Allow-Origin"] = Config.CORS_ORIGIN
+    r.headers["Access-Control-Allow-Headers"] = f"Content-Type, {CLASSROOM_ID_HEADER}"
+    r.headers["Access-Control-Allow-Methods"] = methods
+    return r
+
+
+def _decode_frame_bytes(raw) -> "np.ndarray | None":
+    """Decode encoded image bytes (JPEG/PNG; bytes or any buffer) to a BGR numpy array.
+    np.frombuffer wraps the buffer without copying it."""
+    if raw is None or len(raw) == 0:
+        return None
+    import cv2
+    import numpy as np
+    with stage_timer(STAGE_IMAGE_DECODE):
+        buf = np.frombuffer(raw, dtype=np.uint8)
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
 
-def _decode_frame(frame_b64: str) -> np.ndarray | None:
+def _decode_frame(frame_b64: str) -> "np.ndarray | None":
     """Decode base64 image string to BGR numpy array. Handles data URL prefix."""
     if not frame_b64:
         return None
@@ -19,65 +51,260 @@ def _decode_frame(frame_b64: str) -> np.ndarray | None:
     if "," in frame_b64:
         frame_b64 = frame_b64.split(",", 1)[1]
     try:
-        raw = base64.b64decode(frame_b64)
+        with stage_timer(STAGE_BASE64_DECODE):
+            raw = base64.b64decode(frame_b64)
     except Exception:
         return None
-    buf = np.frombuffer(raw, dtype=np.uint8)
-    image = cv2.imdecode(buf, cv2.IMREAD_COLOR)
-    return image
+    return _decode_frame_bytes(raw)
 
 
-@bp.route("/analyze-frame", methods=["POST", "OPTIONS"])
-def analyze_frame():
+def _parse_timestamp(value, now: float) -> float:
     """
-    POST /api/sentinel/analyze-frame
-    Body: { "classroom_id": "8A", "frame": "data:image/jpeg;base64,..." }
-    Runs YOLOv8 person count, applies empty-class rule (2 min empty → alert).
-    Also computes motion and applies mischief rule (high motion → alert).
+    Client sample time -> epoch seconds. Missing = now; values above 1e11 are
+    taken as milliseconds (Date.now()); future times are clamped to now so a
+    skewed client clock can't push cooldowns ahead. Raises ValueError.
     """
-    if request.method == "OPTIONS":
-        from flask import Response
-        from app.config import Config
-        r = Response()
-        r.headers["Access-Control-Allow-Origin"] = Config.CORS_ORIGIN
-        r.headers["Access-Control-Allow-Headers"] = "Content-Type"
-        r.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
-        return r
-
-    data = request.get_json(silent=True) or {}
+    if value is None:
+        return now
+    if isinstance(value, bool):
+        raise ValueError("timestamp must be a number (epoch seconds)")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("timestamp must be a number (epoch seconds)")
+    if not math.isfinite(value) or value < 0:
+        raise ValueError("timestamp must be a non-negative number (epoch seconds)")
+    if value > 1e11:
+        value /= 1000.0
+    return min(value, now)
+
+
+def _parse_level(value) -> float:
+    """Audio level in [0, 1]; raises ValueError."""
+    if value is None:
+        raise ValueError("level is required (0.0 to 1.0)")
+    try:
+        level = float(value)
+    except (ValueError, TypeError):
+        raise ValueError("level must be a number")
+    if not (0.0 <= level <= 1.0):
+        raise ValueError("level must be between 0.0 and 1.0")
+    return level
+
+
+def _read_upload(file_storage):
+    """Return the bytes of a multipart upload, reusing the in-memory buffer when possible."""
+    stream = file_storage.stream
+    if isinstance(stream, io.BytesIO):
+        return stream.getbuffer()
+    return stream.read()
+
+
+# Request-independent handlers: parsed body in, (JSON payload, status) out.
+# Shared by the Flask routes below and the ASGI app (app/asgi.py).
+
+def handle_analyze_frame(data: dict) -> tuple:
+    """Validate, decode and analyze one base64 frame ({classroom_id, frame})."""
     classroom_id = data.get("classroom_id")
     frame_b64 = data.get("frame")
 
     if not classroom_id:
-        return jsonify({"error": "classroom_id is required"}), 400
+        return {"error": "classroom_id is required"}, 400
     if not frame_b64:
-        return jsonify({"error": "frame is required (base64 image)"}), 400
+        return {"error": "frame is required (base64 image)"}, 400
 
     image = _decode_frame(frame_b64)
     if image is None:
-        return jsonify({"error": "Invalid frame: could not decode base64 image"}), 400
+        return {"error": "Invalid frame: could not decode base64 image"}, 400
 
-    # Get previous frame from state for motion detection
-    from app.sentinel.rules import _get_state, _get_lock
-    lock = _get_lock(classroom_id)
-    with lock:
-        state = _get_state(classroom_id)
-        prev_frame = state.get("prev_frame")
+    from app.sentinel.pipeline import analyze_image
+    return analyze_image(classroom_id, image), 200
 
-    # Compute person count and motion score
-    person_count = count_persons(image)
-    motion_score = compute_motion_score(image, prev_frame)
 
-    # Apply rules
-    empty_result = process_empty_class_rule(classroom_id, person_count)
-    mischief_result = process_mischief_rule(classroom_id, motion_score, image)
+def handle_analyze_frame_raw(classroom_id: str, raw) -> tuple:
+    """Validate, decode and analyze one encoded frame (JPEG/PNG bytes)."""
+    if not classroom_id:
+        return {"error": f"classroom_id is required ({CLASSROOM_ID_HEADER} header or query)"}, 400
+    if raw is None or len(raw) == 0:
+        return {"error": "frame is required (JPEG bytes)"}, 400
+
+    image = _decode_frame_bytes(raw)
+    if image is None:
+        return {"error": "Invalid frame: could not decode image bytes"}, 400
+
+    from app.sentinel.pipeline import analyze_image
+    return analyze_image(classroom_id, image), 200
+
+
+def frame_items_from_json(data: dict) -> list:
+    """(metadata, base64 frame) pairs of a JSON analyze-frames body, or raise ValueError."""
+    meta = data.get("frames")
+    if not isinstance(meta, list) or not meta:
+        raise ValueError("frames is required (non-empty list)")
+    for i, m in enumerate(meta):
+        if isinstance(m, dict) and not (isinstance(m.get("frame"), str) and m["frame"]):
+            raise ValueError(f"frames[{i}]: frame is required (base64 image string)")
+    return [(m, m.get("frame") if isinstance(m, dict) else None) for m in meta]
+
+
+def frame_items_from_form(frames_field: str, uploads: list) -> list:
+    """(metadata, frame bytes) pairs of a multipart analyze-frames body, or raise ValueError.
+    :param frames_field: The "frames" form field (JSON metadata list)
+    :param uploads: Bytes of the "frame" file parts, in order
+    """
+    try:
+        meta = json.loads(frames_field or "null")
+    except ValueError:
+        raise ValueError("frames must be a JSON list")
+    if not isinstance(meta, list) or not meta:
+        raise ValueError("frames is required (non-empty JSON list)")
+    if len(uploads) != len(meta):
+        raise ValueError(f"expected {len(meta)} frame file parts, got {len(uploads)}")
+    return list(zip(meta, uploads))
+
+
+def handle_analyze_frames(items: list) -> tuple:
+    """Validate, decode and analyze a batch of (metadata, encoded frame) pairs."""
+    if len(items) > Config.FRAME_BATCH_MAX_FRAMES:
+        return {"error": f"at most {Config.FRAME_BATCH_MAX_FRAMES} frames per request"}, 400
+
+    now = time.time()
+    frames = []
+    for i, (meta, encoded) in enumerate(items):
+        if not isinstance(meta, dict) or not meta.get("classroom_id"):
+            return {"error": f"frames[{i}]: classroom_id is required"}, 400
+        try:
+            timestamp = _parse_timestamp(meta.get("timestamp"), now)
+        except ValueError as e:
+            return {"error": f"frames[{i}]: {e}"}, 400
+        image = _decode_frame(encoded) if isinstance(encoded, str) else _decode_frame_bytes(encoded)
+        if image is None:
+            return {"error": f"frames[{i}]: could not decode image"}, 400
+        frames.append((str(meta["classroom_id"]), timestamp, image))
+
+    from app.sentinel.pipeline import analyze_frames as run_analysis
+    return {"frames": run_analysis(frames)}, 200
+
+
+def handle_audio_level(data: dict) -> tuple:
+    """Apply the loud noise rule to one level ({classroom_id, level})."""
+    classroom_id = data.get("classroom_id")
+    audio_level = data.get("level")
+
+    if not classroom_id:
+        return {"error": "classroom_id is required"}, 400
+    try:
+        audio_level = _parse_level(audio_level)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    result = process_loud_noise_rule(classroom_id, audio_level)
 
-    return jsonify({
+    return {
         "classroom_id": classroom_id,
-        "person_count": empty_result["person_count"],
-        "motion_score": round(mischief_result["motion_score"], 3),
-        "alert_created": empty_result["alert_created"] or mischief_result["alert_created"],
-    })
+        "audio_level": result["audio_level"],
+        "alert_created": result["alert_created"],
+    }, 200
+
+
+def handle_audio_levels(data: dict) -> tuple:
+    """Apply the loud noise rule to a batch of samples ({samples: [...]})."""
+    samples = data.get("samples")
+    if not isinstance(samples, list) or not samples:
+        return {"error": "samples is required (non-empty list)"}, 400
+    if len(samples) > Config.AUDIO_BATCH_MAX_SAMPLES:
+        return {"error": f"at most {Config.AUDIO_BATCH_MAX_SAMPLES} samples per request"}, 400
+
+    now = time.time()
+    by_classroom = {}
+    for i, sample in enumerate(samples):
+        if not isinstance(sample, dict) or not sample.get("classroom_id"):
+            return {"error": f"samples[{i}]: classroom_id is required"}, 400
+        try:
+            timestamp = _parse_timestamp(sample.get("timestamp"), now)
+            level = _parse_level(sample.get("level"))
+        except ValueError as e:
+            return {"error": f"samples[{i}]: {e}"}, 400
+        by_classroom.setdefault(str(sample["classroom_id"]), []).append((timestamp, level))
+
+    results = []
+    for classroom_id, pairs in by_classroom.items():
+        result = process_loud_noise_batch(classroom_id, pairs)
+        results.append({"classroom_id": classroom_id, **result})
+    return {"samples": len(samples), "classrooms": results}, 200
+
+
+def _json_body() -> dict:
+    with stage_timer(STAGE_JSON_PARSE):
+        return request.get_json(silent=True) or {}
+
+
+@bp.route("/analyze-frame", methods=["POST", "OPTIONS"])
+def analyze_frame():
+    """
+    POST /api/sentinel/analyze-frame
+    Body: { "classroom_id": "8A", "frame": "data:image/jpeg;base64,..." }
+    Runs YOLOv8 person count, applies empty-class rule (2 min empty → alert).
+    Also computes motion and applies mischief rule (high motion → alert).
+    """
+    if request.method == "OPTIONS":
+        return _preflight_response()
+
+    body, status = handle_analyze_frame(_json_body())
+    return jsonify(body), status
+
+
+@bp.route("/analyze-frame/raw", methods=["POST", "OPTIONS"])
+def analyze_frame_raw():
+    """
+    POST /api/sentinel/analyze-frame/raw
+    Body: raw JPEG bytes (Content-Type: image/jpeg or application/octet-stream),
+          or multipart/form-data with a "frame" file part.
+    classroom_id: X-Classroom-Id header, ?classroom_id= query, or multipart form field.
+    Same analysis and response as /analyze-frame, without base64/JSON overhead.
+    """
+    if request.method == "OPTIONS":
+        return _preflight_response()
+
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("frame")
+        raw = _read_upload(upload) if upload is not None else None
+        classroom_id = (request.headers.get(CLASSROOM_ID_HEADER)
+                        or request.args.get("classroom_id")
+                        or request.form.get("classroom_id"))
+    else:
+        raw = request.get_data(cache=False)
+        classroom_id = request.headers.get(CLASSROOM_ID_HEADER) or request.args.get("classroom_id")
+
+    body, status = handle_analyze_frame_raw(classroom_id, raw)
+    return jsonify(body), status
+
+
+@bp.route("/analyze-frames", methods=["POST", "OPTIONS"])
+def analyze_frames():
+    """
+    POST /api/sentinel/analyze-frames
+    Body: { "frames": [ { "classroom_id": "8A", "timestamp": 1718000000.0, "frame": "data:image/jpeg;base64,..." }, ... ] }
+          or multipart/form-data: "frames" = JSON list of { classroom_id, timestamp } plus one
+          "frame" JPEG part per entry, in order.
+    For buffered clients (backlog after a connectivity loss): frames of one or more
+    classrooms are analyzed in timestamp order (epoch seconds or ms, default now),
+    with one batched inference pass and the rules evaluated at the frame times.
+    """
+    if request.method == "OPTIONS":
+        return _preflight_response()
+
+    try:
+        if request.mimetype == "multipart/form-data":
+            items = frame_items_from_form(request.form.get("frames"),
+                                          [_read_upload(u) for u in request.files.getlist("frame")])
+        else:
+            items = frame_items_from_json(_json_body())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    body, status = handle_analyze_frames(items)
+    return jsonify(body), status
 
 
 @bp.route("/audio-level", methods=["POST", "OPTIONS"])
@@ -88,34 +315,23 @@ def audio_level():
     Processes audio level and applies loud noise rule (high level for 5 consecutive requests → alert).
     """
     if request.method == "OPTIONS":
-        from flask import Response
-        from app.config import Config
-        r = Response()
-        r.headers["Access-Control-Allow-Origin"] = Config.CORS_ORIGIN
-        r.headers["Access-Control-Allow-Headers"] = "Content-Type"
-        r.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
-        return r
-
-    data = request.get_json(silent=True) or {}
-    classroom_id = data.get("classroom_id")
-    audio_level = data.get("level")
+        return _preflight_response()
 
-    if not classroom_id:
-        return jsonify({"error": "classroom_id is required"}), 400
-    if audio_level is None:
-        return jsonify({"error": "level is required (0.0 to 1.0)"}), 400
+    body, status = handle_audio_level(_json_body())
+    return jsonify(body), status
 
-    try:
-        audio_level = float(audio_level)
-        if not (0.0 <= audio_level <= 1.0):
-            return jsonify({"error": "level must be between 0.0 and 1.0"}), 400
-    except (ValueError, TypeError):
-        return jsonify({"error": "level must be a number"}), 400
 
-    result = process_loud_noise_rule(classroom_id, audio_level)
+@bp.route("/audio-levels", methods=["POST", "OPTIONS"])
+def audio_levels():
+    """
+    POST /api/sentinel/audio-levels
+    Body: { "samples": [ { "classroom_id": "8A", "timestamp": 1718000000.0, "level": 0.85 }, ... ] }
+    Many samples, across classrooms and/or time, in one request (timestamp: epoch
+    seconds or ms, default now). Each classroom's samples are evaluated in time
+    order under one lock, with the same alerts as one /audio-level call per sample.
+    """
+    if request.method == "OPTIONS":
+        return _preflight_response()
 
-    return jsonify({
-        "classroom_id": classroom_id,
-        "audio_level": result["audio_level"],
-        "alert_created": result["alert_created"],
-    })
+    body, status = handle_audio_levels(_json_body())
+    return jsonify(body), status
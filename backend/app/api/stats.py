@@ -0,0 +1,32 @@
+"""Stats API: runtime metrics for tuning (inference batching, worker pool, skip gate, motion/rule state, event stream, write-behind queue, store cache, MongoDB pool, ingest, ...)."""
+from flask import Blueprint, jsonify
+
+from app.db.connection import connection_stats
+from app.db.store import store_cache_stats
+from app.db.writer import writer_stats
+from app.services.ingest import ingest_stats
+from app.sentinel.rules import motion_memory_report, rule_state_stats
+from app.services.events import get_broker
+from app.sentinel.gate import gate_stats
+from app.sentinel.scheduler import scheduler_stats
+from app.sentinel.worker_pool import worker_pool_stats
+
+bp = Blueprint('stats', __name__, url_prefix='/api/stats')
+
+
+@bp.route('', methods=['GET'])
+@bp.route('/', methods=['GET'])
+def get_stats():
+    """GET /api/stats — return in-process runtime metrics."""
+    return jsonify({
+        'inference_scheduler': scheduler_stats(),
+        'inference_workers': worker_pool_stats(),
+        'inference_gate': gate_stats(),
+        'motion_state': motion_memory_report(),
+        'rule_state': rule_state_stats(),
+        'events': get_broker().stats(),
+        'persistence': writer_stats(),
+        'store_cache': store_cache_stats(),
+        'mongo': connection_stats(),
+        'ingest': ingest_stats(),
+    })
@@ -1,7 +1,7 @@
 """Videos API: GET list, GET by id, POST to create/update."""
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 
-from app.db.store import get_all_videos, get_video_by_id, upsert_video, delete_video
+from app.db.store import get_all_videos_json, get_video_by_id, upsert_video, delete_video
 
 bp = Blueprint('videos', __name__, url_prefix='/api/videos')
 
@@ -11,8 +11,7 @@ bp = Blueprint('videos', __name__, url_prefix='/api/videos')
 def list_videos():
     """GET /api/videos — return all videos, optionally filtered by classroom_id."""
     classroom_id = request.args.get('classroom_id')
-    videos = get_all_videos(classroom_id=classroom_id)
-    return jsonify(videos)
+    return Response(get_all_videos_json(classroom_id=classroom_id), mimetype='application/json')
 
 
 @bp.route('/<video_id>', methods=['GET'])
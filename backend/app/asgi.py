@@ -0,0 +1,265 @@
+"""ASGI serving mode: the sentinel, alerts and classrooms routes on an event loop.
+
+Run from backend directory:
+    uvicorn app.asgi:app --host 0.0.0.0 --port 5000     (or: python run_asgi.py)
+
+- Request bodies are read and responses written on the event loop, so slow
+  uploads and idle poll connections don't hold a thread each.
+- Classroom/alert store calls use the async Mongo driver (app/db/async_store.py).
+- Frame decode, inference and rule evaluation (which may wait on rule-state
+  locks) run on a thread pool of ASGI_EXECUTOR_WORKERS, through the same
+  handlers as the Flask routes, so request/response JSON is identical.
+- Every other route (videos, stats, events, ingest, metrics) is served by the
+  Flask app, mounted through a2wsgi.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from app.config import Config
+from app.main import create_app
+from app.db import async_store
+from app.api import sentinel
+from app.api.alerts import _alerts_etag, _poll_cursor
+from app.db.store import encode_alert_cursor, is_seq_cursor
+from app.sentinel.roi import validate_roi, validate_imgsz, remember_detection_settings
+from app.services.metrics import STAGE_JSON_PARSE, stage_timer
+
+_executor = ThreadPoolExecutor(max_workers=max(1, Config.ASGI_EXECUTOR_WORKERS), thread_name_prefix="asgi-worker")
+
+
+def _json_response(payload, status: int = 200, headers: dict = None) -> Response:
+    return Response(json.dumps(payload, default=str, sort_keys=True, separators=(",", ":")) + "\n",
+                    status_code=status, headers=headers, media_type="application/json")
+
+
+def _mimetype(request: Request) -> str:
+    return request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+
+
+def _parse_json(body: bytes, mimetype: str) -> dict:
+    """Request JSON like Flask's get_json(silent=True) or {}: only for JSON content types."""
+    if mimetype != "application/json" and not (mimetype.startswith("application/") and mimetype.endswith("+json")):
+        return {}
+    with stage_timer(STAGE_JSON_PARSE):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def _run(func, *args):
+    """Run blocking work (decode, inference, rules) on the executor."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+
+async def _run_json_handler(request: Request, handler) -> Response:
+    """Parse the JSON body and run a sentinel handler on the executor."""
+    body = await request.body()
+    mimetype = _mimetype(request)
+    payload, status = await _run(lambda: handler(_parse_json(body, mimetype)))
+    return _json_response(payload, status)
+
+
+def _preflight_response() -> Response:
+    """CORS preflight response for sentinel routes (same as the Flask blueprint's)."""
+    return Response(headers={
+        "Access-Control-Allow-Origin": Config.CORS_ORIGIN,
+        "Access-Control-Allow-Headers": f"Content-Type, {sentinel.CLASSROOM_ID_HEADER}",
+        "Access-Control-Allow-Methods": "POST, OPTIONS",
+    })
+
+
+# Sentinel
+
+async def analyze_frame(request: Request):
+    """POST /api/sentinel/analyze-frame (see app/api/sentinel.py)."""
+    if request.method == "OPTIONS":
+        return _preflight_response()
+    return await _run_json_handler(request, sentinel.handle_analyze_frame)
+
+
+async def analyze_frame_raw(request: Request):
+    """POST /api/sentinel/analyze-frame/raw (see app/api/sentinel.py)."""
+    if request.method == "OPTIONS":
+        return _preflight_response()
+    classroom_id = (request.headers.get(sentinel.CLASSROOM_ID_HEADER)
+                    or request.query_params.get("classroom_id"))
+    if _mimetype(request) == "multipart/form-data":
+        async with request.form() as form:
+            upload = form.get("frame")
+            raw = await upload.read() if hasattr(upload, "read") else None
+            classroom_id = classroom_id or form.get("classroom_id")
+    else:
+        raw = await request.body()
+    payload, status = await _run(sentinel.handle_analyze_frame_raw, classroom_id, raw)
+    return _json_response(payload, status)
+
+
+async def analyze_frames(request: Request):
+    """POST /api/sentinel/analyze-frames (see app/api/sentinel.py)."""
+    if request.method == "OPTIONS":
+        return _preflight_response()
+    if _mimetype(request) == "multipart/form-data":
+        async with request.form(max_files=Config.FRAME_BATCH_MAX_FRAMES + 1) as form:
+            uploads = [await u.read() for u in form.getlist("frame") if hasattr(u, "read")]
+            frames_field = form.get("frames")
+        try:
+            items = sentinel.frame_items_from_form(frames_field if isinstance(frames_field, str) else None, uploads)
+        except ValueError as e:
+            return _json_response({"error": str(e)}, 400)
+        payload, status = await _run(sentinel.handle_analyze_frames, items)
+        return _json_response(payload, status)
+
+    body = await request.body()
+    mimetype = _mimetype(request)
+
+    def handle():
+        try:
+            items = sentinel.frame_items_from_json(_parse_json(body, mimetype))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        return sentinel.handle_analyze_frames(items)
+
+    payload, status = await _run(handle)
+    return _json_response(payload, status)
+
+
+async def audio_level(request: Request):
+    """POST /api/sentinel/audio-level (see app/api/sentinel.py)."""
+    if request.method == "OPTIONS":
+        return _preflight_response()
+    return await _run_json_handler(request, sentinel.handle_audio_level)
+
+
+async def audio_levels(request: Request):
+    """POST /api/sentinel/audio-levels (see app/api/sentinel.py)."""
+    if request.method == "OPTIONS":
+        return _preflight_response()
+    return await _run_json_handler(request, sentinel.handle_audio_levels)
+
+
+# Alerts
+
+def _int_arg(value):
+    """Query int like Flask's args.get(type=int): None when missing or invalid."""
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Strong comparison of an If-None-Match header against an ETag (as werkzeug's contains())."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or f'"{etag}"' in tags
+
+
+async def list_alerts(request: Request):
+    """GET /api/alerts (see app/api/alerts.py): since/before cursors, ETag / 304, X-Poll-Cursor, X-Next-Cursor."""
+    args = request.query_params
+    classroom_id = args.get("classroom_id")
+    limit = _int_arg(args.get("limit"))
+
+    marker = await async_store.get_latest_alert_marker(classroom_id)
+    etag = _alerts_etag(marker, request.scope.get("query_string", b""))
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": f'"{etag}"'})
+
+    since = args.get("since")
+    alerts = await async_store.get_alerts(classroom_id=classroom_id, limit=limit, since=since, before=args.get("before"))
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache",
+               "X-Poll-Cursor": _poll_cursor(marker, alerts, since)}
+    if limit and len(alerts) == limit and not is_seq_cursor(since):
+        headers["X-Next-Cursor"] = encode_alert_cursor(alerts[-1])
+    return _json_response(alerts, headers=headers)
+
+
+# Classrooms
+
+async def list_classrooms(request: Request):
+    """GET /api/classrooms — return all classrooms."""
+    return Response(await async_store.get_all_classrooms_json(), media_type="application/json")
+
+
+async def get_classroom(request: Request):
+    """GET /api/classrooms/<id> — return one classroom or 404."""
+    body = await async_store.get_classroom_json(request.path_params["classroom_id"])
+    if body is None:
+        return _json_response({"error": "Classroom not found"}, 404)
+    return Response(body, media_type="application/json")
+
+
+async def update_detection(request: Request):
+    """PUT /api/classrooms/<id>/detection — set the person-detection crop and model input size."""
+    data = _parse_json(await request.body(), _mimetype(request))
+    try:
+        roi = validate_roi(data.get("roi"))
+        imgsz = validate_imgsz(data.get("imgsz"))
+    except ValueError as e:
+        return _json_response({"error": str(e)}, 400)
+    classroom = await async_store.set_classroom_detection(request.path_params["classroom_id"], roi=roi, imgsz=imgsz)
+    if classroom is None:
+        return _json_response({"error": "Classroom not found"}, 404)
+    remember_detection_settings(classroom)
+    return _json_response(classroom)
+
+
+def _flask_fallback():
+    """The Flask app (remaining routes) as an ASGI app, or None without a2wsgi."""
+    try:
+        from a2wsgi import WSGIMiddleware
+    except ImportError:
+        print("⚠️ a2wsgi not installed: the ASGI app serves only the sentinel, alerts and classrooms routes")
+        return None
+    return WSGIMiddleware(create_app(), workers=Config.ASGI_EXECUTOR_WORKERS)
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    yield
+    await async_store.close_async_db()
+    _executor.shutdown(wait=True)
+
+
+def create_asgi_app() -> Starlette:
+    """Create the ASGI app (native sentinel/alerts/classrooms routes + Flask for the rest)."""
+    sentinel_methods = ["POST", "OPTIONS"]
+    routes = [
+        Route("/api/sentinel/analyze-frame", analyze_frame, methods=sentinel_methods),
+        Route("/api/sentinel/analyze-frame/raw", analyze_frame_raw, methods=sentinel_methods),
+        Route("/api/sentinel/analyze-frames", analyze_frames, methods=sentinel_methods),
+        Route("/api/sentinel/audio-level", audio_level, methods=sentinel_methods),
+        Route("/api/sentinel/audio-levels", audio_levels, methods=sentinel_methods),
+        Route("/api/alerts", list_alerts, methods=["GET"]),
+        Route("/api/alerts/", list_alerts, methods=["GET"]),
+        Route("/api/classrooms", list_classrooms, methods=["GET"]),
+        Route("/api/classrooms/", list_classrooms, methods=["GET"]),
+        Route("/api/classrooms/{classroom_id}", get_classroom, methods=["GET"]),
+        Route("/api/classrooms/{classroom_id}/detection", update_detection, methods=["PUT"]),
+    ]
+    fallback = _flask_fallback()
+    if fallback is not None:
+        routes.append(Mount("/", app=fallback))
+    middleware = [Middleware(
+        CORSMiddleware,
+        allow_origins=[Config.CORS_ORIGIN],
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["Content-Type", sentinel.CLASSROOM_ID_HEADER, "If-None-Match"],
+        expose_headers=["ETag", "X-Poll-Cursor", "X-Next-Cursor"],
+    )]
+    return Starlette(routes=routes, middleware=middleware, lifespan=_lifespan)
+
+
+app = create_asgi_app()
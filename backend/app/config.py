@@ -1,5 +1,6 @@
 """Configuration for Vision X Sentinel backend."""
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -40,5 +41,114 @@ class Config:
             UserWarning
         )
     
+    # Connection pool and timeouts (see app/db/connection.py); 0 = driver default
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 0))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 0))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 0))
+
     # mock-media at repo root (parent of backend)
     MOCK_MEDIA_DIR = os.path.join(BACKEND_ROOT, '..', 'mock-media')
+
+    # Inference backend: "ultralytics" (PyTorch), "onnx" (ONNX Runtime) or "openvino"
+    # Non-ultralytics backends fall back to ultralytics if their runtime/model is missing
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'ultralytics').lower()
+    INFERENCE_MODEL_PATH = os.getenv('INFERENCE_MODEL_PATH', '')  # empty = backend default (yolov8n.*)
+    INFERENCE_IMGSZ = int(os.getenv('INFERENCE_IMGSZ', 640))  # model input size (static exports override)
+    INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', 0))  # intra-op threads, 0 = library default
+    INFERENCE_CONF = float(os.getenv('INFERENCE_CONF', 0.25))
+    INFERENCE_IOU = float(os.getenv('INFERENCE_IOU', 0.7))
+
+    # Load the model and run a dummy inference in the background at startup
+    # (long-running servers; leave off for serverless cold starts)
+    VISION_WARMUP = os.getenv('VISION_WARMUP', 'false').lower() == 'true'
+
+    # Inference micro-batching: queue frames from all classrooms and run one
+    # batched YOLOv8 call per window (see app/sentinel/scheduler.py)
+    INFERENCE_BATCH_ENABLED = os.getenv('INFERENCE_BATCH_ENABLED', 'false').lower() == 'true'
+    INFERENCE_BATCH_MAX_SIZE = int(os.getenv('INFERENCE_BATCH_MAX_SIZE', 8))
+    INFERENCE_BATCH_MAX_WAIT_MS = float(os.getenv('INFERENCE_BATCH_MAX_WAIT_MS', 30))
+
+    # Inference worker processes (see app/sentinel/worker_pool.py), 0 = infer in the request process
+    # Each worker uses INFERENCE_THREADS threads (0 = CPUs / workers)
+    INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', 0))
+    INFERENCE_WORKER_CPUS = os.getenv('INFERENCE_WORKER_CPUS', '')  # "", "auto" or "0,1;2,3" (CPU set per worker)
+    INFERENCE_WORKER_SLOT_MB = float(os.getenv('INFERENCE_WORKER_SLOT_MB', 8))  # largest frame via shared memory
+
+    # Motion engine: per-classroom reference is a downscaled grayscale frame
+    MOTION_FRAME_WIDTH = int(os.getenv('MOTION_FRAME_WIDTH', 160))  # pixels; height keeps aspect
+    MOTION_BLUR_KSIZE = int(os.getenv('MOTION_BLUR_KSIZE', 0))  # Gaussian kernel, 0 = no blur (blur lowers scores)
+
+    # Prometheus metrics at GET /metrics (stage timers, per-classroom counters); off = near-zero overhead
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+    # Max frames per POST /api/sentinel/analyze-frames request (decoded frames are held in memory)
+    FRAME_BATCH_MAX_FRAMES = int(os.getenv('FRAME_BATCH_MAX_FRAMES', 64))
+
+    # Max samples per POST /api/sentinel/audio-levels request
+    AUDIO_BATCH_MAX_SAMPLES = int(os.getenv('AUDIO_BATCH_MAX_SAMPLES', 10000))
+
+    # Per-classroom rule state (see app/sentinel/state.py): "memory" (per process) or "redis"
+    # (shared by all workers/replicas via REDIS_URL; "fakeredis://" = in-process fake)
+    RULE_STATE_BACKEND = os.getenv('RULE_STATE_BACKEND', 'memory').lower()
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    RULE_STATE_LOCK_TIMEOUT_SEC = float(os.getenv('RULE_STATE_LOCK_TIMEOUT_SEC', 5))
+    # Memory backend: lock stripes, capacity; both: idle eviction
+    RULE_STATE_LOCK_STRIPES = int(os.getenv('RULE_STATE_LOCK_STRIPES', 64))
+    RULE_STATE_MAX_CLASSROOMS = int(os.getenv('RULE_STATE_MAX_CLASSROOMS', 10000))
+    RULE_STATE_IDLE_TTL_SEC = float(os.getenv('RULE_STATE_IDLE_TTL_SEC', 3600))
+
+    # Skip gate (see app/sentinel/gate.py): reuse the last person count while the frame's
+    # motion score vs. the last inferred frame stays below the threshold, for at most
+    # INFERENCE_GATE_MAX_STALENESS_SEC (capped at half the empty-class duration)
+    INFERENCE_GATE_ENABLED = os.getenv('INFERENCE_GATE_ENABLED', 'true').lower() == 'true'
+    INFERENCE_GATE_THRESHOLD = float(os.getenv('INFERENCE_GATE_THRESHOLD', 0.02))
+    INFERENCE_GATE_MAX_STALENESS_SEC = float(os.getenv('INFERENCE_GATE_MAX_STALENESS_SEC', 5))
+
+    # Write-behind persistence of alerts/classroom status (see app/db/writer.py)
+    # Off by default on Vercel, where background threads don't outlive the request
+    PERSISTENCE_WRITE_BEHIND = os.getenv(
+        'PERSISTENCE_WRITE_BEHIND', 'false' if os.getenv('VERCEL') else 'true').lower() == 'true'
+    PERSISTENCE_QUEUE_SIZE = int(os.getenv('PERSISTENCE_QUEUE_SIZE', 10000))
+    PERSISTENCE_BATCH_SIZE = int(os.getenv('PERSISTENCE_BATCH_SIZE', 500))
+    PERSISTENCE_FLUSH_INTERVAL_MS = float(os.getenv('PERSISTENCE_FLUSH_INTERVAL_MS', 200))
+    PERSISTENCE_MAX_RETRIES = int(os.getenv('PERSISTENCE_MAX_RETRIES', 5))
+    PERSISTENCE_RETRY_BACKOFF_MS = float(os.getenv('PERSISTENCE_RETRY_BACKOFF_MS', 100))
+
+    # Read-through cache for classrooms/videos (see app/db/cache.py), 0 = disabled
+    STORE_CACHE_TTL_SEC = float(os.getenv('STORE_CACHE_TTL_SEC', 30))
+    # Per-classroom detection settings (ROI, imgsz) kept in process; refreshed after this, replaced on PUT
+    DETECTION_SETTINGS_TTL_SEC = float(os.getenv('DETECTION_SETTINGS_TTL_SEC', 60))
+
+    # Server-side frame ingestion (see app/services/ingest.py)
+    # "<classroom_id>=<file in mock-media, path or stream URL>,..." or "db" (video assigned to each classroom)
+    INGEST_SOURCES = os.getenv('INGEST_SOURCES', '')
+    INGEST_SAMPLE_FPS = float(os.getenv('INGEST_SAMPLE_FPS', 0.67))  # dashboard uploads every 1.5 s
+    INGEST_FRAME_WIDTH = int(os.getenv('INGEST_FRAME_WIDTH', 640))  # same as the dashboard canvas, 0 = source size
+    # Host-wide lock: only the server process holding it runs INGEST_SOURCES (one per host, not per worker)
+    INGEST_LOCK_FILE = os.getenv('INGEST_LOCK_FILE') or os.path.join(tempfile.gettempdir(), 'vision-x-ingest.lock')
+    # Stream hosts POST /api/ingest and INGEST_SOURCES=db may open (comma-separated); INGEST_SOURCES itself is trusted
+    INGEST_ALLOWED_HOSTS = {h.strip().lower() for h in os.getenv('INGEST_ALLOWED_HOSTS', '').split(',') if h.strip()}
+
+    # ASGI serving mode (app/asgi.py): threads for decode/inference/rule work, async Mongo pool size
+    ASGI_EXECUTOR_WORKERS = int(os.getenv('ASGI_EXECUTOR_WORKERS', 8))
+    ASGI_MONGO_POOL_SIZE = int(os.getenv('ASGI_MONGO_POOL_SIZE', 100))
+
+    # Alert retention (see app/db/retention.py): raw alerts expire via a TTL index on created_at
+    # after ALERT_RETENTION_DAYS (0 = keep forever); scripts/compact_alerts.py rolls alerts older
+    # than ALERT_COMPACT_AFTER_DAYS into per-classroom daily summaries and deletes them
+    ALERT_RETENTION_DAYS = float(os.getenv('ALERT_RETENTION_DAYS', 180))
+    ALERT_COMPACT_AFTER_DAYS = float(os.getenv('ALERT_COMPACT_AFTER_DAYS', 30))
+
+    # Alert rollups (see app/db/rollups.py): per-classroom counts per minute/hour/day, updated on insert
+    # and read by GET /api/reports/summary. Minute rollups expire after ALERT_ROLLUP_MINUTE_RETENTION_DAYS
+    # (older report bounds are rounded to the hour); hour/day rollups are kept
+    ALERT_ROLLUP_MINUTE_RETENTION_DAYS = float(os.getenv('ALERT_ROLLUP_MINUTE_RETENTION_DAYS', 31))
+    REPORT_MAX_SERIES_POINTS = int(os.getenv('REPORT_MAX_SERIES_POINTS', 2000))
+
+    # GET /api/reports/export: documents per Mongo cursor batch, bytes per streamed response chunk
+    REPORT_EXPORT_BATCH_SIZE = int(os.getenv('REPORT_EXPORT_BATCH_SIZE', 1000))
+    REPORT_EXPORT_CHUNK_BYTES = int(os.getenv('REPORT_EXPORT_CHUNK_BYTES', 65536))
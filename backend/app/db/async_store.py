@@ -0,0 +1,119 @@
+"""Async MongoDB store for the ASGI app (app/asgi.py): the classroom and alert
+reads/writes of the HTTP routes, without holding a thread per round trip.
+
+Uses pymongo's AsyncMongoClient (pymongo >= 4.13), or Motor when an older
+pymongo is installed. Queries, projections and sort orders are the ones of
+app.db.store, and the classroom read cache is shared with it, so invalidations
+from synchronous writers (write-behind status updates, seeding) apply here too.
+"""
+import asyncio
+
+from app.config import Config
+from app.db.cache import NAMESPACE_CLASSROOMS
+from app.db.connection import client_options
+from app.db.schema import TABLE_CLASSROOMS, TABLE_ALERTS
+from app.db.store import (_cache, _alerts_query, _detection_update, alerts_sort, ALERT_PROJECTION,
+                          ALERT_MARKER_SORT)
+
+_client = None
+_db = None
+_db_lock = asyncio.Lock()
+
+
+def _client_class():
+    """Async client class: pymongo's own, else Motor's."""
+    try:
+        from pymongo import AsyncMongoClient
+        return AsyncMongoClient
+    except ImportError:
+        pass
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient
+    except ImportError:
+        raise ImportError("The ASGI app needs pymongo>=4.13 (AsyncMongoClient) or motor")
+
+
+async def get_async_db():
+    """Get or create the async MongoDB database handle (one client per process)."""
+    global _client, _db
+    if _db is not None:
+        return _db
+    async with _db_lock:
+        if _db is None:
+            try:
+                client = _client_class()(Config.MONGO_URI, **client_options(maxPoolSize=Config.ASGI_MONGO_POOL_SIZE))
+                await client.admin.command('ping')
+            except Exception as e:
+                print(f"❌ MongoDB (async) connection failed: {e}")
+                raise ConnectionError(
+                    f"Failed to connect to MongoDB. "
+                    f"Check MONGO_URI environment variable. Error: {str(e)}"
+                )
+            _client = client
+            _db = client[Config.MONGO_DB_NAME]
+            print(f"✅ Connected to MongoDB (async): {Config.MONGO_DB_NAME}")
+    return _db
+
+
+async def close_async_db():
+    """Close the async client (ASGI shutdown)."""
+    global _client, _db
+    client, _client, _db = _client, None, None
+    if client is not None:
+        result = client.close()
+        if asyncio.iscoroutine(result):
+            await result
+
+
+async def _load_all_classrooms():
+    db = await get_async_db()
+    return await db[TABLE_CLASSROOMS].find({}, {"_id": 0}).to_list(None)
+
+
+async def _load_classroom(classroom_id: str):
+    db = await get_async_db()
+    return await db[TABLE_CLASSROOMS].find_one({"id": classroom_id}, {"_id": 0})
+
+
+async def get_all_classrooms_json() -> str:
+    """Return all classrooms as a pre-serialized JSON body (cached)."""
+    return (await _cache.aget(NAMESPACE_CLASSROOMS, "all", _load_all_classrooms)).body
+
+
+async def get_classroom_json(classroom_id: str):
+    """Return one classroom as a pre-serialized JSON body, or None if not found (cached)."""
+    entry = await _cache.aget(NAMESPACE_CLASSROOMS, classroom_id, lambda: _load_classroom(classroom_id))
+    return entry.body if entry.value is not None else None
+
+
+async def set_classroom_detection(classroom_id: str, roi: list = None, imgsz: int = None):
+    """Set a classroom's person-detection ROI and model input size.
+    Returns the updated document, or None if the classroom does not exist."""
+    from pymongo import ReturnDocument
+    db = await get_async_db()
+    doc = await db[TABLE_CLASSROOMS].find_one_and_update(
+        {"id": classroom_id},
+        _detection_update(roi, imgsz),
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    _cache.invalidate(NAMESPACE_CLASSROOMS)
+    return doc
+
+
+async def get_alerts(classroom_id: str = None, limit: int = None, since: str = None, before: str = None):
+    """Return alerts, optionally filtered by classroom_id. Newest first (see store.get_alerts)."""
+    db = await get_async_db()
+    query = _alerts_query(classroom_id, since, before)
+    cursor = db[TABLE_ALERTS].find(query, ALERT_PROJECTION).sort(alerts_sort(since))
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return await cursor.to_list(None)
+
+
+async def get_latest_alert_marker(classroom_id: str = None):
+    """Return {created_seq, id} of the last inserted alert (optionally per classroom), or None."""
+    db = await get_async_db()
+    query = {"classroom_id": classroom_id} if classroom_id else {}
+    return await db[TABLE_ALERTS].find_one(query, {"_id": 0, "created_seq": 1, "id": 1}, sort=ALERT_MARKER_SORT)
@@ -0,0 +1,135 @@
+"""Process-local read-through cache for rarely changing store reads (classrooms, videos).
+
+Entries live for STORE_CACHE_TTL_SEC and are dropped per namespace when the
+store mutates that collection. Each entry keeps the documents and their
+serialized JSON body, so list endpoints can return the body without
+re-encoding. Invalidation is per process: with several workers, other
+processes see a change once their entry expires (the TTL bounds staleness).
+"""
+import json
+import threading
+import time
+
+NAMESPACE_CLASSROOMS = "classrooms"
+NAMESPACE_VIDEOS = "videos"
+
+
+class _Entry:
+    __slots__ = ("expires_at", "value", "body")
+
+    def __init__(self, expires_at: float, value, body: str):
+        self.expires_at = expires_at
+        self.value = value
+        self.body = body
+
+
+class ReadThroughCache:
+    """TTL cache keyed by (namespace, key); values are loaded on a miss."""
+
+    def __init__(self, ttl_sec: float):
+        self.ttl_sec = ttl_sec
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Bumped on invalidation so a load that raced with a write is not cached
+        self._generations = {}
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_sec > 0
+
+    def get(self, namespace: str, key, loader) -> _Entry:
+        """
+        Return the cached entry for (namespace, key), calling loader() on a miss.
+        :param loader: Zero-arg function returning JSON-serializable documents
+        :return: Entry with .value (documents) and .body (JSON text)
+        """
+        cache_key = (namespace, key)
+        now = time.monotonic()
+        entry, generation = self._lookup(cache_key, now)
+        if entry is not None:
+            return entry
+        return self._fill(cache_key, now, generation, loader())
+
+    async def aget(self, namespace: str, key, loader) -> _Entry:
+        """
+        Same as get() for async loaders (the ASGI app's async store).
+        :param loader: Zero-arg coroutine function returning JSON-serializable documents
+        """
+        cache_key = (namespace, key)
+        now = time.monotonic()
+        entry, generation = self._lookup(cache_key, now)
+        if entry is not None:
+            return entry
+        return self._fill(cache_key, now, generation, await loader())
+
+    def get_many(self, namespace: str, keys, loader) -> dict:
+        """
+        Entries for several keys of a namespace, loading all misses with one loader call.
+        :param loader: Function of the list of missing keys returning {key: value};
+            keys it leaves out are cached as None (not found)
+        :return: {key: entry}
+        """
+        now = time.monotonic()
+        entries, missing = {}, {}
+        for key in keys:
+            if key in entries or key in missing:
+                continue
+            entry, generation = self._lookup((namespace, key), now)
+            if entry is not None:
+                entries[key] = entry
+            else:
+                missing[key] = generation
+        if missing:
+            loaded = loader(list(missing))
+            for key, generation in missing.items():
+                entries[key] = self._fill((namespace, key), now, generation, loaded.get(key))
+        return entries
+
+    def _lookup(self, cache_key: tuple, now: float) -> tuple:
+        """(live entry or None, namespace generation at lookup time)."""
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry.expires_at > now:
+                self._hits += 1
+                return entry, None
+            self._misses += 1
+            return None, self._generations.get(cache_key[0], 0)
+
+    def _fill(self, cache_key: tuple, now: float, generation: int, value) -> _Entry:
+        entry = _Entry(now + self.ttl_sec, value, json.dumps(value, default=str))
+        if self.enabled:
+            with self._lock:
+                if self._generations.get(cache_key[0], 0) == generation:
+                    self._entries[cache_key] = entry
+        return entry
+
+    def invalidate(self, namespace: str):
+        """Drop every entry of a namespace (called after writes to its collection)."""
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            stale = [k for k in self._entries if k[0] == namespace]
+            for k in stale:
+                del self._entries[k]
+            self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for namespace in {k[0] for k in self._entries}:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "ttl_sec": self.ttl_sec,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self._invalidations,
+            }
@@ -0,0 +1,183 @@
+"""MongoDB connection manager: one pooled client per process.
+
+- Pool size and timeouts come from Config (MONGO_MAX_POOL_SIZE, MONGO_*_TIMEOUT_MS, ...).
+- The client is created lazily, pinged once, and indexes are created once per
+  process before the database handle is handed out.
+- Fork safety: MongoClient is not fork-safe, so a child process (pre-fork
+  servers such as gunicorn, multiprocessing with fork) drops the inherited
+  client and builds its own on first use. Indexes already ensured by the
+  parent are not re-created.
+"""
+import os
+import threading
+
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.errors import OperationFailure
+
+from app.config import Config
+from app.db.schema import (TABLE_CLASSROOMS, TABLE_ALERTS, TABLE_VIDEOS, TABLE_ALERT_DAILY_SUMMARIES,
+                           TABLE_ALERT_ROLLUPS)
+
+# Raw alerts expire on created_at (native datetime) after ALERT_RETENTION_DAYS; 0 = plain index
+_ALERT_TTL = ({"expireAfterSeconds": int(Config.ALERT_RETENTION_DAYS * 86400)}
+              if Config.ALERT_RETENTION_DAYS > 0 else {})
+
+# (collection, keys, options) created once per process on first connect
+INDEXES = [
+    (TABLE_CLASSROOMS, [("id", ASCENDING)], {"unique": True}),
+    # get_alerts(classroom_id=...): filter and newest-first sort from one index
+    (TABLE_ALERTS, [("classroom_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)], {}),
+    # Unfiltered keyset pagination order; also the day ranges scanned by compaction
+    (TABLE_ALERTS, [("timestamp", DESCENDING), ("id", DESCENDING)], {}),
+    (TABLE_ALERTS, [("created_at", ASCENDING)], _ALERT_TTL),
+    # Incremental polling (?since=<created_seq>) and the ETag marker, in insertion order
+    (TABLE_ALERTS, [("classroom_id", ASCENDING), ("created_seq", ASCENDING)], {}),
+    (TABLE_ALERTS, [("created_seq", ASCENDING)], {}),
+    (TABLE_ALERT_DAILY_SUMMARIES, [("classroom_id", ASCENDING), ("date", ASCENDING)], {"unique": True}),
+    (TABLE_ALERT_DAILY_SUMMARIES, [("date", ASCENDING)], {}),
+    # Report range reads: one classroom, or all classrooms, per bucket size and start
+    (TABLE_ALERT_ROLLUPS, [("classroom_id", ASCENDING), ("granularity", ASCENDING), ("start", ASCENDING)],
+     {"unique": True}),
+    (TABLE_ALERT_ROLLUPS, [("granularity", ASCENDING), ("start", ASCENDING)], {}),
+    # Only minute rollups carry expire_at (ALERT_ROLLUP_MINUTE_RETENTION_DAYS after the bucket)
+    (TABLE_ALERT_ROLLUPS, [("expire_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    (TABLE_VIDEOS, [("id", ASCENDING)], {"unique": True}),
+    (TABLE_VIDEOS, [("classroom_id", ASCENDING)], {}),
+]
+
+# Indexes made redundant by the compound ones above (dropped if present)
+OBSOLETE_INDEXES = [
+    (TABLE_ALERTS, "classroom_id_1"),
+    (TABLE_ALERTS, "timestamp_1"),
+]
+
+# Server error codes for an existing index with the same name/keys but other options
+_INDEX_CONFLICT_CODES = (85, 86)  # IndexOptionsConflict, IndexKeySpecsConflict
+
+_client = None
+_db = None
+_pid = None
+_indexes_ensured = False
+_lock = threading.Lock()
+
+
+def client_options(**overrides) -> dict:
+    """MongoClient keyword arguments from Config (0 = driver default for the optional limits)."""
+    options = {
+        "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": Config.MONGO_CONNECT_TIMEOUT_MS,
+        "appname": "vision-x-sentinel",
+    }
+    for name, value in (("socketTimeoutMS", Config.MONGO_SOCKET_TIMEOUT_MS),
+                        ("maxIdleTimeMS", Config.MONGO_MAX_IDLE_TIME_MS),
+                        ("waitQueueTimeoutMS", Config.MONGO_WAIT_QUEUE_TIMEOUT_MS)):
+        if value > 0:
+            options[name] = value
+    options.update(overrides)
+    return options
+
+
+def _create_index(collection, keys: list, options: dict):
+    """Create an index; an existing one on the same keys with other options (e.g. a changed
+    TTL) is dropped and rebuilt."""
+    try:
+        collection.create_index(keys, **options)
+    except OperationFailure as e:
+        if e.code not in _INDEX_CONFLICT_CODES:
+            raise
+        for name, info in collection.index_information().items():
+            if [(k, int(d)) for k, d in info["key"]] == [(k, int(d)) for k, d in keys]:
+                print(f"⚠️ Rebuilding index {collection.name}.{name} with options {options}")
+                collection.drop_index(name)
+        collection.create_index(keys, **options)
+
+
+def ensure_indexes(db):
+    """Create the INDEXES on db (idempotent on the server side) and drop OBSOLETE_INDEXES."""
+    for collection, keys, options in INDEXES:
+        _create_index(db[collection], keys, options)
+    for collection, name in OBSOLETE_INDEXES:
+        if name in db[collection].index_information():
+            db[collection].drop_index(name)
+
+
+def _connect():
+    """Create and ping a client; called with _lock held."""
+    global _client, _db, _pid, _indexes_ensured
+    try:
+        # Connect to MongoDB (works for both local and Atlas)
+        client = MongoClient(Config.MONGO_URI, **client_options())
+        client.admin.command('ping')
+        db = client[Config.MONGO_DB_NAME]
+        if not _indexes_ensured:
+            ensure_indexes(db)
+            _indexes_ensured = True
+    except Exception as e:
+        print(f"❌ MongoDB connection failed: {e}")
+        print(f"   URI: {Config.MONGO_URI[:50]}...")  # Show first 50 chars
+        raise ConnectionError(
+            f"Failed to connect to MongoDB. "
+            f"Check MONGO_URI environment variable. Error: {str(e)}"
+        )
+    _client, _db, _pid = client, db, os.getpid()
+    print(f"✅ Connected to MongoDB: {Config.MONGO_DB_NAME} (pool {Config.MONGO_MAX_POOL_SIZE}, pid {_pid})")
+
+
+def get_db():
+    """Database handle of this process's client (connects on first use, and again after a fork)."""
+    db = _db
+    if db is not None and _pid == os.getpid():
+        return db
+    with _lock:
+        if _db is None or _pid != os.getpid():
+            _connect()
+        return _db
+
+
+def get_client() -> MongoClient:
+    """This process's MongoClient (connects on first use)."""
+    get_db()
+    return _client
+
+
+def use_client(client, db_name: str = None):
+    """Serve get_db() from an existing client (benchmarks: scratch databases, instrumented clients).
+    Indexes are not created."""
+    global _client, _db, _pid, _indexes_ensured
+    with _lock:
+        _client, _pid = client, os.getpid()
+        _db = client[db_name or Config.MONGO_DB_NAME]
+        _indexes_ensured = True
+
+
+def close():
+    """Close this process's client; the next get_db() reconnects."""
+    global _client, _db, _pid
+    with _lock:
+        client, _client, _db, _pid = _client, None, None, None
+    if client is not None:
+        client.close()
+
+
+def _after_fork_in_child():
+    """Drop the parent's client without closing it (its sockets belong to the parent)."""
+    global _client, _db, _pid, _lock
+    _client, _db, _pid = None, None, None
+    _lock = threading.Lock()  # may have been held by another parent thread at fork time
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def connection_stats() -> dict:
+    """Pool settings and connection state of this process."""
+    return {
+        "connected": _db is not None and _pid == os.getpid(),
+        "pid": os.getpid(),
+        "indexes_ensured": _indexes_ensured,
+        "max_pool_size": Config.MONGO_MAX_POOL_SIZE,
+        "min_pool_size": Config.MONGO_MIN_POOL_SIZE,
+    }
@@ -0,0 +1,157 @@
+"""Alert retention: TTL expiry of raw alerts and compaction into daily summaries.
+
+- Every stored alert carries created_at, a native datetime copied from its ISO
+  "timestamp" (store.insert_alert(s)); a TTL index expires raw alerts after
+  ALERT_RETENTION_DAYS (see app/db/connection.py). backfill_created_at() adds
+  the field to alerts stored before it existed, so they expire too.
+- compact_alerts() rolls alerts older than ALERT_COMPACT_AFTER_DAYS into one
+  document per classroom and UTC day in alert_daily_summaries, then deletes them:
+    { classroom_id, date: "YYYY-MM-DD", day: datetime, total, counts: {type: n},
+      first_timestamp, last_timestamp, compacted_at }
+  Days are processed oldest first, one aggregation + one bulk upsert + one
+  delete_many each. The delete is bounded by the highest created_seq the
+  aggregation saw, so alerts backdated into the day meanwhile are kept for the
+  next run instead of being deleted uncounted. Summaries are marked
+  pending_delete (with that bound, pending_seq) until that day's alerts are
+  gone, so a rerun after a crash finishes the delete instead of counting the
+  day twice. Run it from one process at a time (cron: scripts/compact_alerts.py).
+"""
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+from app.config import Config
+from app.db.connection import get_db
+from app.db.schema import TABLE_ALERTS, TABLE_ALERT_DAILY_SUMMARIES, alert_created_at
+
+
+def _next_date(date: str) -> str:
+    return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def backfill_created_at(batch_size: int = 1000) -> int:
+    """Set created_at on alerts that lack it (stored before retention existed). Returns the count.
+    Alerts whose timestamp can't be parsed get created_at = None (never expire)."""
+    alerts = get_db()[TABLE_ALERTS]
+    updated = 0
+    while True:
+        docs = list(alerts.find({"created_at": {"$exists": False}}, {"_id": 1, "timestamp": 1}).limit(batch_size))
+        if not docs:
+            return updated
+        alerts.bulk_write([UpdateOne({"_id": doc["_id"]},
+                                     {"$set": {"created_at": alert_created_at(doc.get("timestamp"))}})
+                           for doc in docs], ordered=False)
+        updated += len(docs)
+
+
+def _delete_filter(match: dict, max_seq: int = None) -> dict:
+    """The alerts of match that an aggregation seeing created_seq up to max_seq counted (alerts stored
+    before created_seq existed have none; alerts inserted after the aggregation have a higher one)."""
+    seen = [{"created_seq": {"$exists": False}}]
+    if max_seq is not None:
+        seen.append({"created_seq": {"$lte": max_seq}})
+    return {**match, "$or": seen}
+
+
+def _summary_updates(date: str, groups: list, compacted_at: str, max_seq: int = None) -> list:
+    """Bulk upserts folding one day's (classroom_id, type) groups into per-classroom summaries."""
+    by_classroom = {}
+    for group in groups:
+        classroom_id = group["_id"]["classroom_id"]
+        summary = by_classroom.setdefault(classroom_id, {"total": 0, "counts": {}, "first": None, "last": None})
+        summary["total"] += group["count"]
+        summary["counts"][group["_id"]["type"]] = group["count"]
+        summary["first"] = min(filter(None, (summary["first"], group["first"])), default=None)
+        summary["last"] = max(filter(None, (summary["last"], group["last"])), default=None)
+
+    ops = []
+    for classroom_id, summary in by_classroom.items():
+        inc = {"total": summary["total"]}
+        inc.update({f"counts.{alert_type}": n for alert_type, n in summary["counts"].items()})
+        ops.append(UpdateOne(
+            {"classroom_id": classroom_id, "date": date},
+            {"$inc": inc,
+             "$min": {"first_timestamp": summary["first"]},
+             "$max": {"last_timestamp": summary["last"]},
+             "$set": {"pending_delete": True, "pending_seq": max_seq, "compacted_at": compacted_at},
+             "$setOnInsert": {"day": datetime.strptime(date, "%Y-%m-%d")}},
+            upsert=True,
+        ))
+    return ops
+
+
+def compact_day(date: str, dry_run: bool = False) -> dict:
+    """Roll one UTC day ("YYYY-MM-DD") of alerts into alert_daily_summaries and delete them."""
+    db = get_db()
+    alerts = db[TABLE_ALERTS]
+    summaries = db[TABLE_ALERT_DAILY_SUMMARIES]
+    # ISO timestamps sort as strings: the day is [date, next date)
+    match = {"timestamp": {"$gte": date, "$lt": _next_date(date)}}
+
+    pending = summaries.find_one({"date": date, "pending_delete": True}, {"_id": 0, "pending_seq": 1})
+    resumed = pending is not None
+    summarized = 0
+    classrooms = 0
+    if resumed:
+        if dry_run:
+            return {"date": date, "alerts": 0, "classrooms": 0, "deleted": 0, "resumed": True}
+        # Summaries written before pending_seq existed: delete the whole day, as they did
+        delete_filter = _delete_filter(match, pending["pending_seq"]) if "pending_seq" in pending else match
+    else:
+        groups = list(alerts.aggregate([
+            {"$match": match},
+            {"$group": {"_id": {"classroom_id": "$classroom_id", "type": "$type"}, "count": {"$sum": 1},
+                        "first": {"$min": "$timestamp"}, "last": {"$max": "$timestamp"},
+                        "max_seq": {"$max": "$created_seq"}}},
+        ]))
+        summarized = sum(group["count"] for group in groups)
+        max_seq = max((group["max_seq"] for group in groups if group.get("max_seq") is not None), default=None)
+        delete_filter = _delete_filter(match, max_seq)
+        ops = _summary_updates(date, groups, datetime.utcnow().isoformat(timespec="microseconds") + "Z", max_seq)
+        classrooms = len(ops)
+        if dry_run:
+            return {"date": date, "alerts": summarized, "classrooms": classrooms, "deleted": 0, "resumed": False}
+        if ops:
+            summaries.bulk_write(ops, ordered=False)
+
+    deleted = alerts.delete_many(delete_filter).deleted_count
+    summaries.update_many({"date": date, "pending_delete": True}, {"$unset": {"pending_delete": "", "pending_seq": ""}})
+    return {"date": date, "alerts": summarized, "classrooms": classrooms, "deleted": deleted, "resumed": resumed}
+
+
+def compact_alerts(older_than_days: float = None, max_days: int = None, dry_run: bool = False,
+                   now: datetime = None, on_day=None) -> dict:
+    """
+    Compact every whole UTC day older than older_than_days, oldest first.
+    :param older_than_days: Age in days (default ALERT_COMPACT_AFTER_DAYS)
+    :param max_days: Stop after this many days (None = all)
+    :param dry_run: Only report what would be summarized
+    :param on_day: Optional callback receiving each day's result
+    :return: {"cutoff", "days", "alerts", "deleted"}
+    """
+    older_than_days = Config.ALERT_COMPACT_AFTER_DAYS if older_than_days is None else older_than_days
+    if 0 < Config.ALERT_RETENTION_DAYS <= older_than_days:
+        print(f"⚠️ ALERT_RETENTION_DAYS ({Config.ALERT_RETENTION_DAYS:g}) <= compaction age "
+              f"({older_than_days:g}): the TTL index deletes alerts before they are summarized")
+    now = now or datetime.utcnow()
+    cutoff = (now - timedelta(days=older_than_days)).strftime("%Y-%m-%d")
+    alerts = get_db()[TABLE_ALERTS]
+
+    totals = {"cutoff": cutoff, "days": 0, "alerts": 0, "deleted": 0}
+    lower = None
+    while max_days is None or totals["days"] < max_days:
+        bounds = {"$lt": cutoff}
+        if lower is not None:
+            bounds["$gte"] = lower
+        oldest = alerts.find_one({"timestamp": bounds}, {"_id": 0, "timestamp": 1},
+                                 sort=[("timestamp", 1), ("id", 1)])
+        if oldest is None or not isinstance(oldest.get("timestamp"), str):
+            break
+        result = compact_day(oldest["timestamp"][:10], dry_run=dry_run)
+        totals["days"] += 1
+        totals["alerts"] += result["alerts"]
+        totals["deleted"] += result["deleted"]
+        if on_day is not None:
+            on_day(result)
+        lower = _next_date(result["date"])
+    return totals
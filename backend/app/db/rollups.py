@@ -0,0 +1,200 @@
+"""Alert rollups: per-classroom alert counts per minute, hour and day.
+
+Documents in alert_rollups:
+    { classroom_id, granularity: "minute" | "hour" | "day", start: datetime (UTC bucket start),
+      total, counts: {type: n}, expire_at: datetime (minute buckets only) }
+- record_alerts() adds newly inserted alerts with one bulk $inc upsert per
+  touched bucket (store.insert_alert(s) calls it), so reports read a few
+  hundred rollup documents instead of the alert history.
+- A range [start, end) is read as minute buckets up to the first whole hour,
+  hour buckets up to the first whole day, day buckets, and the same back down
+  at the other edge (_cover), i.e. at most ~2*(60+24) documents + one per day
+  per classroom.
+- Minute rollups expire ALERT_ROLLUP_MINUTE_RETENTION_DAYS after their bucket
+  (TTL index on expire_at); compaction (app/db/retention.py) deletes raw
+  alerts but not rollups.
+- rebuild_rollups() recomputes everything from stored alerts plus the daily
+  summaries of compacted days (day buckets only), for data written before
+  rollups existed or after a failed rollup write. The minute/hour buckets of a
+  compacted day are then gone, so report bounds inside one are widened to the
+  whole day (compacted_dates, report_generator._resolution) and hour series
+  show such a day as empty.
+"""
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+from app.config import Config
+from app.db.connection import get_db
+from app.db.schema import (TABLE_ALERTS, TABLE_ALERT_ROLLUPS, TABLE_ALERT_DAILY_SUMMARIES, ROLLUP_GRANULARITIES,
+                           alert_created_at)
+
+# Buckets accumulated in memory by rebuild_rollups() before they are written
+_REBUILD_FLUSH_KEYS = 5000
+
+
+def floor_time(when: datetime, granularity: str) -> datetime:
+    """Start of the minute/hour/day bucket containing when."""
+    when = when.replace(second=0, microsecond=0)
+    if granularity in ("hour", "day"):
+        when = when.replace(minute=0)
+    if granularity == "day":
+        when = when.replace(hour=0)
+    return when
+
+
+def _step(granularity: str) -> timedelta:
+    return {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}[granularity]
+
+
+def _ceil_time(when: datetime, granularity: str) -> datetime:
+    floor = floor_time(when, granularity)
+    return floor if floor == when else floor + _step(granularity)
+
+
+def _cover(start: datetime, end: datetime) -> list:
+    """(granularity, lo, hi) ranges of whole buckets covering [start, end) with the fewest documents.
+    start and end must be minute-aligned."""
+    h0, h1 = _ceil_time(start, "hour"), floor_time(end, "hour")
+    if h0 >= h1:
+        return [("minute", start, end)] if start < end else []
+    d0, d1 = _ceil_time(h0, "day"), floor_time(h1, "day")
+    if d0 >= d1:
+        middle = [("hour", h0, h1)]
+    else:
+        middle = [("hour", h0, d0), ("day", d0, d1), ("hour", d1, h1)]
+    ranges = [("minute", start, h0)] + middle + [("minute", h1, end)]
+    return [(g, lo, hi) for g, lo, hi in ranges if lo < hi]
+
+
+def _add(buckets: dict, key: tuple, alert_type: str, n: int = 1):
+    counts = buckets.setdefault(key, {})
+    counts[alert_type] = counts.get(alert_type, 0) + n
+
+
+def _bucket_updates(buckets: dict) -> list:
+    """{(classroom_id, granularity, start): {type: n}} -> bulk $inc upserts."""
+    minute_retention = timedelta(days=Config.ALERT_ROLLUP_MINUTE_RETENTION_DAYS)
+    ops = []
+    for (classroom_id, granularity, start), counts in buckets.items():
+        inc = {"total": sum(counts.values())}
+        inc.update({f"counts.{alert_type}": n for alert_type, n in counts.items()})
+        update = {"$inc": inc}
+        if granularity == "minute" and minute_retention:
+            update["$setOnInsert"] = {"expire_at": start + minute_retention}
+        ops.append(UpdateOne({"classroom_id": classroom_id, "granularity": granularity, "start": start},
+                             update, upsert=True))
+    return ops
+
+
+def _add_alert(buckets: dict, doc: dict):
+    created_at = doc.get("created_at") or alert_created_at(doc.get("timestamp"))
+    if created_at is None:
+        return
+    for granularity in ROLLUP_GRANULARITIES:
+        _add(buckets, (doc.get("classroom_id"), granularity, floor_time(created_at, granularity)),
+             doc.get("type", "unknown"))
+
+
+def record_alerts(docs: list) -> int:
+    """Add inserted alert documents to their minute/hour/day rollups (one bulk_write). Returns buckets touched."""
+    buckets = {}
+    for doc in docs:
+        _add_alert(buckets, doc)
+    ops = _bucket_updates(buckets)
+    if ops:
+        get_db()[TABLE_ALERT_ROLLUPS].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def rollup_counts(classroom_id: str, start: datetime, end: datetime) -> dict:
+    """
+    Alert counts in [start, end) (minute-aligned) from rollups.
+    :param classroom_id: One classroom, or None for all
+    :return: {classroom_id: {type: n}}
+    """
+    ranges = _cover(start, end)
+    if not ranges:
+        return {}
+    query = {"$or": [{"granularity": g, "start": {"$gte": lo, "$lt": hi}} for g, lo, hi in ranges]}
+    if classroom_id:
+        query["classroom_id"] = classroom_id
+    by_classroom = {}
+    for doc in get_db()[TABLE_ALERT_ROLLUPS].find(query, {"_id": 0, "classroom_id": 1, "counts": 1}):
+        counts = by_classroom.setdefault(doc["classroom_id"], {})
+        for alert_type, n in doc.get("counts", {}).items():
+            counts[alert_type] = counts.get(alert_type, 0) + n
+    return by_classroom
+
+
+def rollup_series(classroom_id: str, start: datetime, end: datetime, granularity: str) -> list:
+    """Per-bucket counts (summed over classrooms) for the granularity buckets starting in
+    [floor(start), end), oldest first: [{"start": datetime, "counts": {type: n}}]."""
+    query = {"granularity": granularity, "start": {"$gte": floor_time(start, granularity), "$lt": end}}
+    if classroom_id:
+        query["classroom_id"] = classroom_id
+    series = {}
+    for doc in get_db()[TABLE_ALERT_ROLLUPS].find(query, {"_id": 0, "start": 1, "counts": 1}):
+        counts = series.setdefault(doc["start"], {})
+        for alert_type, n in doc.get("counts", {}).items():
+            counts[alert_type] = counts.get(alert_type, 0) + n
+    return [{"start": bucket, "counts": series[bucket]} for bucket in sorted(series)]
+
+
+def iter_rollups(classroom_id: str, start: datetime, end: datetime, granularity: str, batch_size: int = 1000):
+    """Yield the granularity's rollup documents (one per classroom and bucket) for buckets starting in
+    [floor(start), end), oldest first, straight from the cursor."""
+    query = {"granularity": granularity, "start": {"$gte": floor_time(start, granularity), "$lt": end}}
+    if classroom_id:
+        query["classroom_id"] = classroom_id
+    cursor = get_db()[TABLE_ALERT_ROLLUPS].find(query, {"_id": 0, "classroom_id": 1, "start": 1, "total": 1,
+                                                        "counts": 1}, batch_size=batch_size).sort("start", 1)
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+
+def compacted_dates(classroom_id: str, dates: list) -> set:
+    """Those of the UTC dates ("YYYY-MM-DD") compacted into daily summaries, for one classroom or any."""
+    query = {"date": {"$in": list(dates)}}
+    if classroom_id:
+        query["classroom_id"] = classroom_id
+    return {doc["date"] for doc in get_db()[TABLE_ALERT_DAILY_SUMMARIES].find(query, {"_id": 0, "date": 1})}
+
+
+def rebuild_rollups(batch_size: int = 1000) -> dict:
+    """Recompute all rollups from the alerts collection and the daily summaries of compacted days.
+    Alerts inserted while this runs may be counted twice or not at all; run it while ingestion is idle."""
+    db = get_db()
+    rollups = db[TABLE_ALERT_ROLLUPS]
+    rollups.delete_many({})
+
+    stats = {"alerts": 0, "summaries": 0, "buckets": 0}
+
+    def flush(buckets):
+        ops = _bucket_updates(buckets)
+        if ops:
+            rollups.bulk_write(ops, ordered=False)
+        stats["buckets"] += len(ops)
+        buckets.clear()
+
+    buckets = {}
+    cursor = db[TABLE_ALERTS].find({}, {"_id": 0, "classroom_id": 1, "type": 1, "timestamp": 1, "created_at": 1},
+                                   batch_size=batch_size)
+    for doc in cursor:
+        _add_alert(buckets, doc)
+        stats["alerts"] += 1
+        if len(buckets) >= _REBUILD_FLUSH_KEYS:
+            flush(buckets)
+    # Compacted days only exist as daily summaries (pending_delete: raw alerts still present, counted above)
+    summaries = db[TABLE_ALERT_DAILY_SUMMARIES].find({"pending_delete": {"$ne": True}},
+                                                      {"_id": 0, "classroom_id": 1, "day": 1, "counts": 1})
+    for summary in summaries:
+        for alert_type, n in summary.get("counts", {}).items():
+            _add(buckets, (summary["classroom_id"], "day", summary["day"]), alert_type, n)
+        stats["summaries"] += 1
+        if len(buckets) >= _REBUILD_FLUSH_KEYS:
+            flush(buckets)
+    flush(buckets)
+    return stats
@@ -4,6 +4,12 @@
 TABLE_CLASSROOMS = "classrooms"
 TABLE_ALERTS = "alerts"
 TABLE_VIDEOS = "videos"
+TABLE_ALERT_DAILY_SUMMARIES = "alert_daily_summaries"
+TABLE_ALERT_ROLLUPS = "alert_rollups"
+TABLE_COUNTERS = "counters"
+
+# Alert rollup bucket sizes, finest first (see app/db/rollups.py)
+ROLLUP_GRANULARITIES = ("minute", "hour", "day")
 
 # Default document shapes (for reference / validation)
 
@@ -16,19 +22,32 @@ def default_classroom(classroom_id: str, name: str, video_id: str = None) -> dic
         "name": name,
         "current_status": "active",
         "video_id": video_id,
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "detection_roi": None,  # [x, y, w, h] fractions of the frame, None = full frame
+        "detection_imgsz": None,  # model input size, None = INFERENCE_IMGSZ
+        "updated_at": datetime.utcnow().isoformat(timespec="microseconds") + "Z",
     }
 
 
-def default_alert(classroom_id: str, alert_type: str, image_snapshot_path: str = None, metadata: dict = None) -> dict:
-    """Default alert document shape."""
+def alert_created_at(timestamp: str):
+    """Native (naive UTC) datetime of an alert's ISO "timestamp", for the TTL index; None if unparseable."""
+    from datetime import datetime
+    try:
+        return datetime.fromisoformat(timestamp[:-1] if timestamp.endswith("Z") else timestamp)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def default_alert(classroom_id: str, alert_type: str, image_snapshot_path: str = None, metadata: dict = None,
+                  at: float = None) -> dict:
+    """Default alert document shape. at: event time (epoch seconds), default now."""
     from datetime import datetime
     import uuid
+    when = datetime.utcnow() if at is None else datetime.utcfromtimestamp(at)
     return {
         "id": str(uuid.uuid4()),
         "classroom_id": classroom_id,
         "type": alert_type,
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "timestamp": when.isoformat(timespec="microseconds") + "Z",
         "image_snapshot_path": image_snapshot_path,
         "metadata": metadata or {},
     }
@@ -42,7 +61,7 @@ def default_video(video_id: str, filename: str, url: str, classroom_id: str = No
         "filename": filename,
         "url": url,  # Public URL (cloud storage or static file)
         "classroom_id": classroom_id,  # Which classroom this video is assigned to
-        "created_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": datetime.utcnow().isoformat(timespec="microseconds") + "Z",
     }
 
 
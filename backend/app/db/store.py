@@ -1,114 +1,356 @@
 """MongoDB store: get/insert classrooms, alerts, and videos."""
-from pymongo import MongoClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from app.config import Config
-from app.db.schema import TABLE_CLASSROOMS, TABLE_ALERTS, TABLE_VIDEOS, default_classroom, default_alert, default_video
+from app.db.cache import ReadThroughCache, NAMESPACE_CLASSROOMS, NAMESPACE_VIDEOS
+from app.db.connection import get_db
+from app.db.rollups import record_alerts
+from app.db.schema import (TABLE_CLASSROOMS, TABLE_ALERTS, TABLE_VIDEOS, TABLE_COUNTERS, default_classroom,
+                           default_alert, default_video, alert_created_at)
 
-_client = None
-_db = None
+_cache = ReadThroughCache(Config.STORE_CACHE_TTL_SEC)
+
+# Alert list order: newest first (keyset pagination on timestamp, then id)
+ALERT_SORT = [("timestamp", -1), ("id", -1)]
+# Incremental polling order (?since=<created_seq>): insertion order, so backdated alerts are not missed
+ALERT_POLL_SORT = [("created_seq", 1)]
+# Last inserted alert first (ETag marker)
+ALERT_MARKER_SORT = [("created_seq", -1)]
+# Alerts as returned by the API: created_at is a storage-only field (TTL index, see app/db/retention.py)
+ALERT_PROJECTION = {"_id": 0, "created_at": 0}
 
 
 def get_mongo_db():
-    """Get or create MongoDB database connection.
+    """Get the MongoDB database of this process's pooled client (see app/db/connection.py).
     Supports both local MongoDB and MongoDB Atlas (cloud).
     """
-    global _client, _db
-    if _client is None:
-        try:
-            # Connect to MongoDB (works for both local and Atlas)
-            _client = MongoClient(
-                Config.MONGO_URI,
-                serverSelectionTimeoutMS=5000,  # 5 second timeout
-                connectTimeoutMS=5000
-            )
-            # Test connection
-            _client.admin.command('ping')
-            _db = _client[Config.MONGO_DB_NAME]
-            # Ensure indexes for better performance
-            _ensure_indexes()
-            print(f"✅ Connected to MongoDB: {Config.MONGO_DB_NAME}")
-        except Exception as e:
-            print(f"❌ MongoDB connection failed: {e}")
-            print(f"   URI: {Config.MONGO_URI[:50]}...")  # Show first 50 chars
-            raise ConnectionError(
-                f"Failed to connect to MongoDB. "
-                f"Check MONGO_URI environment variable. Error: {str(e)}"
-            )
-    return _db
-
-
-def _ensure_indexes():
-    """Create indexes for better query performance."""
-    db = get_mongo_db()
-    db[TABLE_CLASSROOMS].create_index("id", unique=True)
-    db[TABLE_ALERTS].create_index("classroom_id")
-    db[TABLE_ALERTS].create_index("timestamp")
-    db[TABLE_VIDEOS].create_index("id", unique=True)
-    db[TABLE_VIDEOS].create_index("classroom_id")
+    return get_db()
 
 
-def get_all_classrooms():
-    """Return all classrooms."""
+def _load_all_classrooms():
     db = get_mongo_db()
     collection = db[TABLE_CLASSROOMS]
     return list(collection.find({}, {"_id": 0}))
 
 
-def get_classroom_by_id(classroom_id: str):
-    """Return one classroom by id or None."""
+def _load_classroom(classroom_id: str):
     db = get_mongo_db()
     collection = db[TABLE_CLASSROOMS]
-    result = collection.find_one({"id": classroom_id}, {"_id": 0})
-    return result
+    return collection.find_one({"id": classroom_id}, {"_id": 0})
+
+
+def get_all_classrooms():
+    """Return all classrooms (cached)."""
+    return [dict(doc) for doc in _cache.get(NAMESPACE_CLASSROOMS, "all", _load_all_classrooms).value]
+
+
+def get_all_classrooms_json() -> str:
+    """Return all classrooms as a pre-serialized JSON body (cached)."""
+    return _cache.get(NAMESPACE_CLASSROOMS, "all", _load_all_classrooms).body
+
+
+def get_classroom_by_id(classroom_id: str):
+    """Return one classroom by id or None (cached)."""
+    doc = _cache.get(NAMESPACE_CLASSROOMS, classroom_id, lambda: _load_classroom(classroom_id)).value
+    return dict(doc) if doc is not None else None
+
+
+def _projection(fields) -> dict:
+    """Projection returning only the given fields (plus "id"), never _id."""
+    projection = {"_id": 0, "id": 1}
+    projection.update({field: 1 for field in fields})
+    return projection
+
+
+def _load_by_ids(table: str, ids: list, projection: dict) -> dict:
+    """{id: document} for the given ids, in one $in query."""
+    if not ids:
+        return {}
+    db = get_mongo_db()
+    return {doc["id"]: doc for doc in db[table].find({"id": {"$in": ids}}, projection)}
+
+
+def get_classrooms_by_ids(classroom_ids, fields=None) -> dict:
+    """Return {classroom_id: document} for many classrooms; unknown ids are left out.
+    :param fields: only these fields (plus "id"), read straight from MongoDB with a projection;
+        None = full documents through the read cache, with one $in query for the misses
+    """
+    ids = list(dict.fromkeys(classroom_ids))
+    if fields is not None:
+        return _load_by_ids(TABLE_CLASSROOMS, ids, _projection(fields))
+    entries = _cache.get_many(NAMESPACE_CLASSROOMS, ids,
+                              lambda missing: _load_by_ids(TABLE_CLASSROOMS, missing, {"_id": 0}))
+    return {cid: dict(entry.value) for cid, entry in entries.items() if entry.value is not None}
+
+
+def get_classroom_json(classroom_id: str):
+    """Return one classroom as a pre-serialized JSON body, or None if not found (cached)."""
+    entry = _cache.get(NAMESPACE_CLASSROOMS, classroom_id, lambda: _load_classroom(classroom_id))
+    return entry.body if entry.value is not None else None
+
+
+def _classroom_update(classroom_id: str, name: str = None, current_status: str = None,
+                      video_id: str = None, updated_at: str = None) -> dict:
+    """Update document for a classroom upsert: given fields go to $set, defaults
+    for the others to $setOnInsert (so an existing document keeps them)."""
+    from datetime import datetime
+    fields = {"name": name, "current_status": current_status, "video_id": video_id}
+    defaults = {"name": f"Class {classroom_id}", "current_status": "active", "video_id": None}
+    to_set = {k: v for k, v in fields.items() if v is not None}
+    to_set["updated_at"] = updated_at or datetime.utcnow().isoformat(timespec="microseconds") + "Z"
+    on_insert = {k: v for k, v in defaults.items() if k not in to_set}
+    update = {"$set": to_set}
+    if on_insert:
+        update["$setOnInsert"] = on_insert
+    return update
+
+
+def _classroom_filter(classroom_id: str, updated_at: str = None) -> dict:
+    """Filter for a classroom upsert. With an explicit updated_at (the time of the frame or alert behind
+    the change) it only matches if the stored document is older, so a backlog frame or late write-behind
+    flush cannot overwrite a newer status; the upsert then hits the unique id index (11000) and is skipped."""
+    query = {"id": classroom_id}
+    if updated_at:
+        query["$or"] = [{"updated_at": {"$lt": updated_at}}, {"updated_at": {"$exists": False}}]
+    return query
 
 
 def upsert_classroom(classroom_id: str, name: str = None, current_status: str = None,
                      video_id: str = None, updated_at: str = None):
-    """Insert or update a classroom. Returns the document.
+    """Insert or update a classroom in one atomic round trip. Returns the document.
+    Fields left as None keep their stored value (or the default on insert).
+    An update with an updated_at older than the stored one is not applied (the stored document is returned).
     Note: video_id references a video in the videos collection.
     """
+    db = get_mongo_db()
+    collection = db[TABLE_CLASSROOMS]
+    try:
+        doc = collection.find_one_and_update(
+            _classroom_filter(classroom_id, updated_at),
+            _classroom_update(classroom_id, name, current_status, video_id, updated_at),
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # Stored document is newer than this update
+        return collection.find_one({"id": classroom_id}, {"_id": 0})
+    _cache.invalidate(NAMESPACE_CLASSROOMS)
+    return doc
+
+
+def bulk_upsert_classrooms(updates: list) -> None:
+    """Insert or update many classrooms in one bulk write.
+    :param updates: List of dicts with "id" and any of name, current_status, video_id, updated_at.
+        Several updates for the same id are merged (later values win, except that an older updated_at
+        does not replace a newer one's status). Updates older than the stored updated_at are skipped.
+    """
+    if not updates:
+        return
+    merged = {}
+    for update in updates:
+        fields = {k: v for k, v in update.items() if v is not None}
+        current = merged.setdefault(update["id"], {})
+        if fields.get("updated_at") and fields["updated_at"] < current.get("updated_at", ""):
+            fields.pop("updated_at")
+            fields.pop("current_status", None)
+        current.update(fields)
+    ops = [
+        UpdateOne(
+            _classroom_filter(classroom_id, fields.get("updated_at")),
+            _classroom_update(classroom_id, fields.get("name"), fields.get("current_status"),
+                              fields.get("video_id"), fields.get("updated_at")),
+            upsert=True,
+        )
+        for classroom_id, fields in merged.items()
+    ]
+    db = get_mongo_db()
+    try:
+        db[TABLE_CLASSROOMS].bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        # 11000 = duplicate key: the stored document is newer than the update (see _classroom_filter)
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+    _cache.invalidate(NAMESPACE_CLASSROOMS)
+
+
+def _detection_update(roi: list = None, imgsz: int = None) -> dict:
+    """Update document setting a classroom's detection ROI and model input size."""
     from datetime import datetime
+    return {"$set": {"detection_roi": roi, "detection_imgsz": imgsz,
+                     "updated_at": datetime.utcnow().isoformat(timespec="microseconds") + "Z"}}
+
+
+def set_classroom_detection(classroom_id: str, roi: list = None, imgsz: int = None):
+    """Set a classroom's person-detection ROI and model input size (None = full frame / default).
+    Returns the updated document, or None if the classroom does not exist."""
     db = get_mongo_db()
     collection = db[TABLE_CLASSROOMS]
-    existing = collection.find_one({"id": classroom_id})
-    now = (updated_at or datetime.utcnow().isoformat() + "Z")
-    doc = {
-        "id": classroom_id,
-        "name": name or (existing.get("name") if existing else f"Class {classroom_id}"),
-        "current_status": current_status or (existing.get("current_status") if existing else "active"),
-        "video_id": video_id if video_id is not None else (existing.get("video_id") if existing else None),
-        "updated_at": now,
-    }
-    collection.replace_one({"id": classroom_id}, doc, upsert=True)
+    doc = collection.find_one_and_update(
+        {"id": classroom_id},
+        _detection_update(roi, imgsz),
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    _cache.invalidate(NAMESPACE_CLASSROOMS)
     return doc
 
 
-def get_alerts(classroom_id: str = None, limit: int = None):
-    """Return alerts, optionally filtered by classroom_id. Newest first."""
+def encode_alert_cursor(alert: dict) -> str:
+    """Keyset cursor for an alert: "<timestamp>|<id>" (alerts are ordered by timestamp, then id)."""
+    return f"{alert.get('timestamp', '')}|{alert.get('id', '')}"
+
+
+def is_seq_cursor(since: str) -> bool:
+    """True if since is an insertion sequence number (created_seq) rather than a timestamp cursor."""
+    return bool(since) and since.isdigit()
+
+
+def alerts_sort(since: str = None) -> list:
+    """Sort for get_alerts: insertion order for created_seq polls (a limited page never skips an alert),
+    newest first otherwise."""
+    return ALERT_POLL_SORT if is_seq_cursor(since) else ALERT_SORT
+
+
+def _cursor_query(cursor: str, newer: bool) -> dict:
+    """Query matching alerts strictly newer/older than a cursor.
+    A bare timestamp (no "|id") compares on timestamp only."""
+    op = "$gt" if newer else "$lt"
+    timestamp, sep, alert_id = cursor.partition("|")
+    if not sep:
+        return {"timestamp": {op: timestamp}}
+    return {"$or": [
+        {"timestamp": {op: timestamp}},
+        {"timestamp": timestamp, "id": {op: alert_id}},
+    ]}
+
+
+def _alerts_query(classroom_id: str = None, since: str = None, before: str = None) -> dict:
+    """Query for get_alerts: classroom filter plus since/before cursor bounds."""
+    clauses = []
+    if classroom_id:
+        clauses.append({"classroom_id": classroom_id})
+    if is_seq_cursor(since):
+        clauses.append({"created_seq": {"$gt": int(since)}})
+    elif since:
+        clauses.append(_cursor_query(since, newer=True))
+    if before:
+        clauses.append(_cursor_query(before, newer=False))
+    return clauses[0] if len(clauses) == 1 else ({"$and": clauses} if clauses else {})
+
+
+def get_alerts(classroom_id: str = None, limit: int = None, since: str = None, before: str = None):
+    """Return alerts, optionally filtered by classroom_id. Newest first.
+    :param since: incremental polling: a created_seq (only alerts inserted after it, in insertion order,
+        including backdated ones), or a cursor / timestamp (only alerts with a newer timestamp)
+    :param before: only alerts older than this cursor (keyset pagination: pass the last alert's cursor)
+    """
     db = get_mongo_db()
     collection = db[TABLE_ALERTS]
-    query = {}
-    if classroom_id:
-        query["classroom_id"] = classroom_id
-    cursor = collection.find(query, {"_id": 0}).sort("timestamp", -1)
+    cursor = collection.find(_alerts_query(classroom_id, since, before), ALERT_PROJECTION).sort(alerts_sort(since))
     if limit is not None:
         cursor = cursor.limit(limit)
     return list(cursor)
 
 
+def iter_alerts(classroom_id: str = None, start: str = None, end: str = None, batch_size: int = 1000):
+    """Yield alerts with start <= timestamp < end (ISO strings), oldest first, straight from the cursor,
+    so memory stays at one cursor batch whatever the range (exports). Same projection as get_alerts."""
+    query = {"classroom_id": classroom_id} if classroom_id else {}
+    bounds = {}
+    if start:
+        bounds["$gte"] = start
+    if end:
+        bounds["$lt"] = end
+    if bounds:
+        query["timestamp"] = bounds
+    cursor = get_mongo_db()[TABLE_ALERTS].find(query, ALERT_PROJECTION, batch_size=batch_size)
+    cursor = cursor.sort([(field, 1) for field, _ in ALERT_SORT])
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+
+def get_latest_alert_marker(classroom_id: str = None):
+    """Return {created_seq, id} of the last inserted alert (optionally per classroom), or None.
+    One indexed read; used to answer conditional alert polls without fetching the list."""
+    db = get_mongo_db()
+    collection = db[TABLE_ALERTS]
+    query = {"classroom_id": classroom_id} if classroom_id else {}
+    return collection.find_one(query, {"_id": 0, "created_seq": 1, "id": 1}, sort=ALERT_MARKER_SORT)
+
+
+def _with_created_seq(docs: list) -> list:
+    """Number alerts in insertion order (created_seq) from one counter increment per call; documents
+    that already have one (a retried write-behind batch) keep it."""
+    pending = [doc for doc in docs if "created_seq" not in doc]
+    if pending:
+        counter = get_mongo_db()[TABLE_COUNTERS].find_one_and_update(
+            {"_id": TABLE_ALERTS}, {"$inc": {"seq": len(pending)}}, upsert=True, return_document=ReturnDocument.AFTER)
+        for seq, doc in enumerate(pending, start=counter["seq"] - len(pending) + 1):
+            doc["created_seq"] = seq
+    return docs
+
+
+def _with_created_at(doc: dict) -> dict:
+    """Add the native created_at datetime (from the ISO timestamp) that the TTL index expires on."""
+    if "created_at" not in doc:
+        created_at = alert_created_at(doc.get("timestamp"))
+        if created_at is not None:
+            doc["created_at"] = created_at
+    return doc
+
+
+def _record_rollups(docs: list):
+    """Count newly inserted alerts in their rollups (app/db/rollups.py). Rollups are derived data:
+    a failure is logged, not raised, so alert writes aren't retried (and double-counted) because of it."""
+    try:
+        record_alerts(docs)
+    except Exception as e:
+        print(f"⚠️ Alert rollup update failed for {len(docs)} alerts "
+              f"(python scripts/rebuild_alert_rollups.py recomputes them): {e}")
+
+
 def insert_alert(classroom_id: str, alert_type: str, image_snapshot_path: str = None, metadata: dict = None):
     """Insert an alert and return the document."""
     doc = default_alert(classroom_id, alert_type, image_snapshot_path, metadata)
     db = get_mongo_db()
     collection = db[TABLE_ALERTS]
-    result = collection.insert_one(doc)
-    # Remove MongoDB _id from returned doc to match TinyDB behavior
+    _with_created_seq([doc])
+    result = collection.insert_one(_with_created_at(doc))
+    _record_rollups([doc])
+    # Remove MongoDB _id (and storage-only fields) from returned doc to match TinyDB behavior
     doc.pop("_id", None)
+    doc.pop("created_at", None)
     return doc
 
 
+def insert_alerts(docs: list) -> int:
+    """Insert many alert documents in one round trip (unordered). Returns the number inserted.
+    Documents already inserted by an earlier attempt (same _id) are skipped, so retries are safe."""
+    if not docs:
+        return 0
+    db = get_mongo_db()
+    collection = db[TABLE_ALERTS]
+    _with_created_seq(docs)
+    try:
+        inserted = len(collection.insert_many([_with_created_at(doc) for doc in docs], ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        # Unordered: every document without a write error was inserted; 11000 = duplicate key, i.e.
+        # already written (and rolled up) by a previous attempt
+        errors = e.details.get("writeErrors", [])
+        failed = {err.get("index") for err in errors}
+        _record_rollups([doc for i, doc in enumerate(docs) if i not in failed])
+        if any(err.get("code") != 11000 for err in errors):
+            raise
+        return e.details.get("nInserted", 0)
+    _record_rollups(docs)
+    return inserted
+
+
 # Video functions
-def get_all_videos(classroom_id: str = None):
-    """Return all videos, optionally filtered by classroom_id."""
+def _load_videos(classroom_id: str = None):
     db = get_mongo_db()
     collection = db[TABLE_VIDEOS]
     query = {}
@@ -117,6 +359,17 @@ def get_all_videos(classroom_id: str = None):
     return list(collection.find(query, {"_id": 0}))
 
 
+def get_all_videos(classroom_id: str = None):
+    """Return all videos, optionally filtered by classroom_id (cached)."""
+    entry = _cache.get(NAMESPACE_VIDEOS, classroom_id or "", lambda: _load_videos(classroom_id))
+    return [dict(doc) for doc in entry.value]
+
+
+def get_all_videos_json(classroom_id: str = None) -> str:
+    """Return all videos (optionally filtered by classroom_id) as a pre-serialized JSON body (cached)."""
+    return _cache.get(NAMESPACE_VIDEOS, classroom_id or "", lambda: _load_videos(classroom_id)).body
+
+
 def get_video_by_id(video_id: str):
     """Return one video by id or None."""
     db = get_mongo_db()
@@ -125,12 +378,21 @@ def get_video_by_id(video_id: str):
     return result
 
 
+def get_videos_by_ids(video_ids, fields=None) -> dict:
+    """Return {video_id: document} for many videos in one $in query; unknown ids are left out.
+    :param fields: only these fields (plus "id"); None = full documents
+    """
+    ids = list(dict.fromkeys(video_ids))
+    return _load_by_ids(TABLE_VIDEOS, ids, _projection(fields) if fields is not None else {"_id": 0})
+
+
 def upsert_video(video_id: str, filename: str, url: str, classroom_id: str = None):
     """Insert or update a video. Returns the document."""
     doc = default_video(video_id, filename, url, classroom_id)
     db = get_mongo_db()
     collection = db[TABLE_VIDEOS]
     collection.replace_one({"id": video_id}, doc, upsert=True)
+    _cache.invalidate(NAMESPACE_VIDEOS)
     return doc
 
 
@@ -139,4 +401,11 @@ def delete_video(video_id: str):
     db = get_mongo_db()
     collection = db[TABLE_VIDEOS]
     result = collection.delete_one({"id": video_id})
+    if result.deleted_count > 0:
+        _cache.invalidate(NAMESPACE_VIDEOS)
     return result.deleted_count > 0
+
+
+def store_cache_stats() -> dict:
+    """Hit/miss counters of the classroom/video read cache."""
+    return _cache.stats()
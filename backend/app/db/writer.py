@@ -0,0 +1,242 @@
+"""Write-behind persistence for rule output (alerts and classroom status).
+
+Rule evaluation enqueues mutations instead of writing to MongoDB on the
+request path; a background thread flushes them in bulk (insert_many for
+alerts, one bulk_write for status updates, coalesced per classroom).
+- Bounded queue: when full, the caller writes synchronously (backpressure, nothing dropped).
+- Retries with exponential backoff; a batch is dropped (and counted) only after
+  PERSISTENCE_MAX_RETRIES failures.
+- Flushed on interpreter shutdown (atexit).
+
+Disabled with PERSISTENCE_WRITE_BEHIND=false (default on Vercel, where background
+threads don't outlive the request); mutations are then written synchronously.
+"""
+import atexit
+import queue
+import threading
+import time
+
+from app.config import Config
+from app.db.store import insert_alerts, bulk_upsert_classrooms
+from app.services.latency import LatencyWindow
+from app.services.metrics import STAGE_DB_WRITE, stage_timer
+
+# Longest backoff between retries of one batch
+MAX_BACKOFF_SEC = 5.0
+
+_KIND_ALERT = "alert"
+_KIND_STATUS = "status"
+_STOP = object()
+
+
+def _status_updates(statuses: list) -> list:
+    """(classroom_id, status, updated_at) tuples -> bulk_upsert_classrooms updates."""
+    return [{"id": cid, "current_status": status, "updated_at": updated_at}
+            for cid, status, updated_at in statuses]
+
+
+def _write_now(alerts: list, statuses: list):
+    """Synchronous write of alert documents and (classroom_id, status, updated_at) updates."""
+    with stage_timer(STAGE_DB_WRITE):
+        if alerts:
+            # Copies: insert_many adds _id to the documents it is given
+            insert_alerts([dict(doc) for doc in alerts])
+        if statuses:
+            bulk_upsert_classrooms(_status_updates(statuses))
+
+
+class WriteBehindQueue:
+    """Bounded queue of alert/status mutations flushed in bulk by a background thread."""
+
+    def __init__(self, max_size: int = 10000, batch_size: int = 500, flush_interval_ms: float = 200,
+                 max_retries: int = 5, retry_backoff_ms: float = 100):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_sec = max(0.001, flush_interval_ms / 1000.0)
+        self.max_retries = max(0, int(max_retries))
+        self.retry_backoff_sec = max(0.0, retry_backoff_ms / 1000.0)
+        self._queue = queue.Queue(maxsize=max(1, int(max_size)))
+        self._closed = False
+
+        # Metrics
+        self._lock = threading.Lock()
+        self._enqueued = 0
+        self._flushes = 0
+        self._flushed_alerts = 0
+        self._flushed_statuses = 0
+        self._retries = 0
+        self._dropped = 0
+        self._overflow_sync_writes = 0
+        self._flush_ms = LatencyWindow()
+
+        self._thread = threading.Thread(target=self._loop, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def submit_alert(self, doc: dict):
+        """Queue an alert document for insertion."""
+        self._submit((_KIND_ALERT, doc))
+
+    def submit_classroom_status(self, classroom_id: str, status: str, updated_at: str):
+        """Queue a classroom status change."""
+        self._submit((_KIND_STATUS, (classroom_id, status, updated_at)))
+
+    def _submit(self, op):
+        if not self._closed:
+            try:
+                self._queue.put_nowait(op)
+                with self._lock:
+                    self._enqueued += 1
+                return
+            except queue.Full:
+                pass
+        # Queue full (or shutting down): write on the caller's thread instead of dropping
+        with self._lock:
+            self._overflow_sync_writes += 1
+        kind, payload = op
+        _write_now([payload] if kind == _KIND_ALERT else [], [payload] if kind == _KIND_STATUS else [])
+
+    def _loop(self):
+        while True:
+            batch = []
+            stop = False
+            deadline = None
+            while len(batch) < self.batch_size:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    op = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if op is _STOP:
+                    stop = True
+                    break
+                batch.append(op)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval_sec
+            if batch:
+                self._flush(batch)
+            if stop:
+                # Drain whatever is left, then exit
+                rest = []
+                while True:
+                    try:
+                        op = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if op is not _STOP:
+                        rest.append(op)
+                for i in range(0, len(rest), self.batch_size):
+                    self._flush(rest[i:i + self.batch_size])
+                return
+
+    def _flush(self, batch: list):
+        alerts = [payload for kind, payload in batch if kind == _KIND_ALERT]
+        # Coalesce status updates: the newest change per classroom wins (ties: the later one)
+        latest = {}
+        for kind, payload in batch:
+            if kind == _KIND_STATUS and (payload[2] or "") >= (latest.get(payload[0], (None, None, ""))[2] or ""):
+                latest[payload[0]] = payload
+        statuses = list(latest.values())
+
+        alert_copies = [dict(doc) for doc in alerts]
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            try:
+                with stage_timer(STAGE_DB_WRITE):
+                    if alert_copies:
+                        insert_alerts(alert_copies)
+                        alert_copies = []
+                    if statuses:
+                        bulk_upsert_classrooms(_status_updates(statuses))
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"❌ Write-behind flush failed after {attempt + 1} attempts, "
+                          f"dropping {len(alert_copies)} alerts / {len(statuses)} status updates: {e}")
+                    with self._lock:
+                        self._dropped += len(alert_copies) + len(statuses)
+                    return
+                with self._lock:
+                    self._retries += 1
+                time.sleep(min(MAX_BACKOFF_SEC, self.retry_backoff_sec * (2 ** attempt)))
+
+        self._flush_ms.add((time.monotonic() - started) * 1000.0)
+        with self._lock:
+            self._flushes += 1
+            self._flushed_alerts += len(alerts)
+            self._flushed_statuses += len(statuses)
+
+    def close(self, timeout: float = 10.0):
+        """Stop accepting mutations and flush everything queued (called at shutdown)."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": True,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "enqueued": self._enqueued,
+                "flushes": self._flushes,
+                "flushed_alerts": self._flushed_alerts,
+                "flushed_statuses": self._flushed_statuses,
+                "retries": self._retries,
+                "dropped": self._dropped,
+                "overflow_sync_writes": self._overflow_sync_writes,
+                "flush_latency_ms": self._flush_ms.summary(),
+            }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> WriteBehindQueue | None:
+    """Process-wide write-behind queue, or None when write-behind is disabled."""
+    global _writer
+    if not Config.PERSISTENCE_WRITE_BEHIND:
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = WriteBehindQueue(
+                    max_size=Config.PERSISTENCE_QUEUE_SIZE,
+                    batch_size=Config.PERSISTENCE_BATCH_SIZE,
+                    flush_interval_ms=Config.PERSISTENCE_FLUSH_INTERVAL_MS,
+                    max_retries=Config.PERSISTENCE_MAX_RETRIES,
+                    retry_backoff_ms=Config.PERSISTENCE_RETRY_BACKOFF_MS,
+                )
+                atexit.register(_writer.close)
+    return _writer
+
+
+def persist_alert(doc: dict):
+    """Persist an alert document (queued when write-behind is on, else written now)."""
+    writer = get_writer()
+    if writer is None:
+        _write_now([doc], [])
+    else:
+        writer.submit_alert(doc)
+
+
+def persist_classroom_status(classroom_id: str, status: str, updated_at: str):
+    """Persist a classroom status change (queued when write-behind is on, else written now)."""
+    writer = get_writer()
+    if writer is None:
+        _write_now([], [(classroom_id, status, updated_at)])
+    else:
+        writer.submit_classroom_status(classroom_id, status, updated_at)
+
+
+def writer_stats() -> dict:
+    """Queue depth / flush metrics, or a disabled marker."""
+    if _writer is None:
+        return {"enabled": Config.PERSISTENCE_WRITE_BEHIND, "queue_depth": 0}
+    return _writer.stats()
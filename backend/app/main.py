@@ -28,7 +28,7 @@ def create_app():
     
     # Enable CORS
     if HAS_FLASK_CORS:
-        CORS(app, origins=[Config.CORS_ORIGIN])
+        CORS(app, origins=[Config.CORS_ORIGIN], expose_headers=['ETag', 'X-Poll-Cursor', 'X-Next-Cursor'])
     else:
         @app.before_request
         def handle_preflight():
@@ -36,24 +36,50 @@ def create_app():
             if request.method == 'OPTIONS':
                 response = Response()
                 response.headers['Access-Control-Allow-Origin'] = Config.CORS_ORIGIN
-                response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
-                response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+                response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-Classroom-Id, If-None-Match'
+                response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
                 return response
         
         @app.after_request
         def add_cors_headers(response):
             response.headers['Access-Control-Allow-Origin'] = Config.CORS_ORIGIN
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
-            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-Classroom-Id, If-None-Match'
+            response.headers['Access-Control-Expose-Headers'] = 'ETag, X-Poll-Cursor, X-Next-Cursor'
+            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
             return response
     
     # Register API blueprints
-    from app.api import classrooms, alerts, sentinel, videos
+    from app.api import classrooms, alerts, sentinel, videos, stats, events, ingest, metrics, reports
     app.register_blueprint(classrooms.bp)
     app.register_blueprint(alerts.bp)
     app.register_blueprint(sentinel.bp)
     app.register_blueprint(videos.bp)
+    app.register_blueprint(stats.bp)
+    app.register_blueprint(events.bp)
+    app.register_blueprint(ingest.bp)
+    app.register_blueprint(metrics.bp)
+    app.register_blueprint(reports.bp)
     
+    # Inference worker processes re-import the main module (spawn); skip server startup work there
+    from app.sentinel.worker_pool import is_worker_process
+    if is_worker_process():
+        return app
+
+    # Inference worker processes load their models in the background (frames are inferred here until then)
+    if Config.INFERENCE_WORKERS > 0:
+        from app.sentinel.worker_pool import start_worker_pool
+        start_worker_pool()
+
+    # Optional: load torch/ultralytics/cv2 now instead of on the first frame request
+    if Config.VISION_WARMUP:
+        from app.sentinel.vision import start_background_warmup
+        start_background_warmup()
+
+    # Optional: pull frames server-side for INGEST_SOURCES instead of waiting for dashboard uploads
+    if Config.INGEST_SOURCES:
+        from app.services.ingest import start_configured_sources_async
+        start_configured_sources_async()
+
     @app.route('/')
     def hello():
         return {'message': 'Vision X Sentinel API is running', 'status': 'ok'}
@@ -0,0 +1,238 @@
+"""Inference backends for person detection.
+
+count_persons() in app/sentinel/vision.py stays the public API; it delegates
+to the backend selected by Config.INFERENCE_BACKEND:
+- "ultralytics": YOLOv8 through PyTorch (default, always available as fallback)
+- "onnx": exported YOLOv8n ONNX model on ONNX Runtime (CPU)
+- "openvino": exported YOLOv8n OpenVINO IR on the OpenVINO CPU plugin
+
+Export the models once with Ultralytics, e.g.
+    yolo export model=yolov8n.pt format=onnx imgsz=640
+    yolo export model=yolov8n.pt format=openvino imgsz=640
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from app.config import Config
+from app.services.metrics import observe_inference
+
+# COCO class index for "person"
+PERSON_CLASS_ID = 0
+
+# Default model path per backend (relative paths resolve against the working directory)
+DEFAULT_MODEL_PATHS = {
+    "ultralytics": "yolov8n.pt",
+    "onnx": "yolov8n.onnx",
+    "openvino": "yolov8n_openvino_model/yolov8n.xml",
+}
+
+# Letterbox padding value used by Ultralytics
+_PAD_VALUE = 114
+
+
+class InferenceBackend:
+    """Base class: counts persons in a batch of BGR images."""
+    name = "base"
+
+    def count_persons_batch(self, images: list, imgsz: int = None) -> list:
+        """
+        Return the person count for each image (None/empty images count as 0).
+        :param imgsz: Model input size for this call (None = the backend's default)
+        """
+        counts = [0] * len(images)
+        valid = [i for i, image in enumerate(images) if image is not None and image.size > 0]
+        if valid:
+            started = time.perf_counter()
+            valid_counts = self._count_valid([images[i] for i in valid], imgsz or self.imgsz)
+            observe_inference(self.name, len(valid), time.perf_counter() - started)
+            for i, count in zip(valid, valid_counts):
+                counts[i] = count
+        return counts
+
+    def _count_valid(self, images: list, imgsz: int) -> list:
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Run one dummy inference so the first real request doesn't pay for lazy init."""
+        self.count_persons_batch([np.zeros((Config.INFERENCE_IMGSZ, Config.INFERENCE_IMGSZ, 3), dtype=np.uint8)])
+
+
+class UltralyticsBackend(InferenceBackend):
+    """YOLOv8 through Ultralytics / PyTorch."""
+    name = "ultralytics"
+
+    def __init__(self, model_path: str = None, imgsz: int = None, threads: int = None, conf: float = None):
+        import torch
+        _patch_torch_load(torch)
+        if threads:
+            torch.set_num_threads(threads)
+        from ultralytics import YOLO
+        self.model = YOLO(model_path or DEFAULT_MODEL_PATHS[self.name])  # nano model for speed
+        self.imgsz = imgsz or Config.INFERENCE_IMGSZ
+        self.conf = Config.INFERENCE_CONF if conf is None else conf
+
+    def _count_valid(self, images: list, imgsz: int) -> list:
+        results = self.model(images, imgsz=imgsz, conf=self.conf, classes=[PERSON_CLASS_ID], verbose=False)
+        counts = []
+        for r in results:
+            if r.boxes is None:
+                counts.append(0)
+            else:
+                counts.append(sum(1 for cls in r.boxes.cls if int(cls) == PERSON_CLASS_ID))
+        return counts
+
+
+class _ExportedYoloBackend(InferenceBackend):
+    """Shared pre/post-processing for exported YOLOv8 models (output: B x (4 + classes) x anchors)."""
+
+    def __init__(self, imgsz: int = None, conf: float = None, iou: float = None):
+        self.imgsz = imgsz or Config.INFERENCE_IMGSZ
+        self.conf = Config.INFERENCE_CONF if conf is None else conf
+        self.iou = Config.INFERENCE_IOU if iou is None else iou
+        self.dynamic_batch = False
+        # Static exports only accept their export size; per-call imgsz is then ignored
+        self.static_imgsz = False
+
+    def _letterbox(self, image: np.ndarray, size: int) -> np.ndarray:
+        """Resize keeping aspect ratio and pad to size x size; returns CHW float32 RGB in 0-1."""
+        h, w = image.shape[:2]
+        scale = min(size / h, size / w)
+        nh, nw = round(h * scale), round(w * scale)
+        canvas = np.full((size, size, 3), _PAD_VALUE, dtype=np.uint8)
+        top, left = (size - nh) // 2, (size - nw) // 2
+        canvas[top:top + nh, left:left + nw] = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        blob = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32)
+        blob *= 1.0 / 255.0
+        return blob
+
+    def _count_in_output(self, preds: np.ndarray) -> int:
+        """Count persons in one image's raw predictions (4 + classes, anchors), with NMS."""
+        class_scores = preds[4:]
+        best = class_scores.argmax(axis=0)
+        scores = class_scores.max(axis=0)
+        keep = (best == PERSON_CLASS_ID) & (scores > self.conf)
+        if not keep.any():
+            return 0
+        cx, cy, w, h = preds[0, keep], preds[1, keep], preds[2, keep], preds[3, keep]
+        boxes = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1)
+        kept = cv2.dnn.NMSBoxes(boxes.tolist(), scores[keep].tolist(), self.conf, self.iou)
+        return len(kept)
+
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _count_valid(self, images: list, imgsz: int) -> list:
+        size = self.imgsz if self.static_imgsz else imgsz
+        blobs = [self._letterbox(image, size) for image in images]
+        if self.dynamic_batch:
+            outputs = [self._infer(np.stack(blobs))]
+        else:
+            outputs = [self._infer(blob[None]) for blob in blobs]
+        return [self._count_in_output(preds) for out in outputs for preds in out]
+
+
+class OnnxRuntimeBackend(_ExportedYoloBackend):
+    """Exported YOLOv8 ONNX model on ONNX Runtime's CPU execution provider."""
+    name = "onnx"
+
+    def __init__(self, model_path: str = None, imgsz: int = None, threads: int = None, conf: float = None):
+        import onnxruntime as ort
+        super().__init__(imgsz=imgsz, conf=conf)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path or DEFAULT_MODEL_PATHS[self.name],
+                                            sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim, _, height, _ = model_input.shape
+        # Static exports fix the input size; dynamic ones accept batches
+        if isinstance(height, int):
+            self.imgsz = height
+            self.static_imgsz = True
+        self.dynamic_batch = not isinstance(batch_dim, int)
+
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoBackend(_ExportedYoloBackend):
+    """Exported YOLOv8 OpenVINO IR model on the OpenVINO CPU plugin."""
+    name = "openvino"
+
+    def __init__(self, model_path: str = None, imgsz: int = None, threads: int = None, conf: float = None):
+        import openvino as ov
+        super().__init__(imgsz=imgsz, conf=conf)
+        core = ov.Core()
+        model = core.read_model(model_path or DEFAULT_MODEL_PATHS[self.name])
+        shape = model.inputs[0].get_partial_shape()
+        if shape[2].is_static:
+            self.imgsz = shape[2].get_length()
+            self.static_imgsz = True
+        self.dynamic_batch = shape[0].is_dynamic
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.output = self.compiled.output(0)
+
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        return self.compiled([batch])[self.output]
+
+
+BACKENDS = {
+    UltralyticsBackend.name: UltralyticsBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    OpenVinoBackend.name: OpenVinoBackend,
+}
+
+
+def _patch_torch_load(torch):
+    """Patch torch.load for PyTorch 2.6+ compatibility with Ultralytics checkpoints.
+    Official Ultralytics models are trusted, so weights_only=False is safe."""
+    if getattr(torch.load, "_sentinel_patched", False):
+        return
+    orig_torch_load = torch.load
+
+    def _patched_torch_load(*args, **kwargs):
+        kwargs.setdefault("weights_only", False)
+        return orig_torch_load(*args, **kwargs)
+
+    _patched_torch_load._sentinel_patched = True
+    torch.load = _patched_torch_load
+
+
+def create_backend(name: str, model_path: str = None, imgsz: int = None, threads: int = None) -> InferenceBackend:
+    """Create a backend by name; raises if its runtime or model is unavailable."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name} (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[name](model_path=model_path, imgsz=imgsz, threads=threads)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> InferenceBackend:
+    """Get or create the configured backend, falling back to Ultralytics if it can't load."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = Config.INFERENCE_BACKEND
+                threads = Config.INFERENCE_THREADS or None
+                try:
+                    _backend = create_backend(name, Config.INFERENCE_MODEL_PATH or None, threads=threads)
+                except Exception as e:
+                    if name == UltralyticsBackend.name:
+                        raise
+                    print(f"⚠️ Inference backend '{name}' unavailable ({e}); falling back to ultralytics")
+                    _backend = create_backend(UltralyticsBackend.name, threads=threads)
+                print(f"✅ Inference backend: {_backend.name} (imgsz={_backend.imgsz})")
+    return _backend
@@ -0,0 +1,72 @@
+"""Skip-inference gate: settings and metrics (the decision itself runs in app/sentinel/pipeline.py).
+
+When a frame barely differs from the one that last ran inference (motion score
+below INFERENCE_GATE_THRESHOLD), the pipeline reuses the last person count
+instead of running YOLO again, for at most INFERENCE_GATE_MAX_STALENESS_SEC
+(capped at half the empty-class duration, so that rule always sees a fresh
+count before it can fire). No cv2/numpy here: /api/stats imports this module.
+"""
+import threading
+
+from app.config import Config
+from app.sentinel.rules import EMPTY_CLASS_DURATION_SEC
+
+# Smoothing factor for the running average inference time (savings estimate)
+INFERENCE_MS_ALPHA = 0.1
+
+_lock = threading.Lock()
+_frames = 0
+_inferences = 0
+_skipped = 0
+_stale_refreshes = 0
+_avg_inference_ms = 0.0
+_saved_ms = 0.0
+
+
+def max_staleness_sec() -> float:
+    """Longest time a person count may be reused."""
+    return min(Config.INFERENCE_GATE_MAX_STALENESS_SEC, EMPTY_CLASS_DURATION_SEC / 2.0)
+
+
+def record_skip():
+    """A frame reused the last count; credit the average inference time as saved."""
+    global _frames, _skipped, _saved_ms
+    with _lock:
+        _frames += 1
+        _skipped += 1
+        _saved_ms += _avg_inference_ms
+
+
+def record_inference(elapsed_ms: float, stale: bool = False):
+    """
+    A frame ran inference.
+    :param elapsed_ms: Wall time of the person count (includes queueing when batched / pooled)
+    :param stale: Gate would have skipped, but the count was older than max_staleness_sec()
+    """
+    global _frames, _inferences, _stale_refreshes, _avg_inference_ms
+    with _lock:
+        _frames += 1
+        _inferences += 1
+        if stale:
+            _stale_refreshes += 1
+        if _avg_inference_ms == 0.0:
+            _avg_inference_ms = elapsed_ms
+        else:
+            _avg_inference_ms += INFERENCE_MS_ALPHA * (elapsed_ms - _avg_inference_ms)
+
+
+def gate_stats() -> dict:
+    """Skip ratio and the inference time it saved (estimated from the running average)."""
+    with _lock:
+        return {
+            "enabled": Config.INFERENCE_GATE_ENABLED,
+            "threshold": Config.INFERENCE_GATE_THRESHOLD,
+            "max_staleness_sec": max_staleness_sec(),
+            "frames": _frames,
+            "inferences": _inferences,
+            "skipped": _skipped,
+            "skip_ratio": round(_skipped / _frames, 3) if _frames else 0.0,
+            "stale_refreshes": _stale_refreshes,
+            "avg_inference_ms": round(_avg_inference_ms, 3),
+            "inference_ms_saved": round(_saved_ms, 1),
+        }
@@ -0,0 +1,52 @@
+"""Motion engine: compact grayscale references and frame differencing.
+
+Each classroom keeps only a small, downscaled, already-grayscale (optionally
+blurred) reference of its previous frame instead of the full BGR image, so
+every new frame costs one resize + one cvtColor and the difference runs on a
+few thousand pixels.
+"""
+import cv2
+import numpy as np
+
+from app.config import Config
+
+
+def prepare_motion_frame(image: np.ndarray, width: int = None, blur_ksize: int = None) -> np.ndarray | None:
+    """
+    Build the compact motion reference for a frame.
+    :param image: BGR numpy array (full resolution)
+    :param width: Reference width in pixels (height keeps aspect ratio); default Config.MOTION_FRAME_WIDTH
+    :param blur_ksize: Gaussian blur kernel (odd, 0 = no blur); default Config.MOTION_BLUR_KSIZE
+    :return: uint8 grayscale array, or None for an empty image
+    """
+    if image is None or image.size == 0:
+        return None
+    width = Config.MOTION_FRAME_WIDTH if width is None else width
+    blur_ksize = Config.MOTION_BLUR_KSIZE if blur_ksize is None else blur_ksize
+
+    h, w = image.shape[:2]
+    if width and w > width:
+        # Downscale first so the color conversion runs on the small image
+        image = cv2.resize(image, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    if blur_ksize and blur_ksize > 1:
+        gray = cv2.GaussianBlur(gray, (blur_ksize | 1, blur_ksize | 1), 0)
+    return gray
+
+
+def motion_score(current_ref: np.ndarray, prev_ref: np.ndarray) -> float:
+    """
+    Motion intensity between two references from prepare_motion_frame().
+    :return: Mean absolute pixel difference normalized to 0.0-1.0 (higher = more motion)
+    """
+    if current_ref is None or prev_ref is None:
+        return 0.0
+    if current_ref.shape != prev_ref.shape:
+        return 0.0
+    diff = cv2.absdiff(current_ref, prev_ref)
+    return float(diff.mean()) / 255.0
+
+
+def reference_nbytes(ref) -> int:
+    """Bytes held by a stored motion reference (0 if none)."""
+    return int(getattr(ref, "nbytes", 0))
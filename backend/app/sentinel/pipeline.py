@@ -0,0 +1,197 @@
+"""Frame analysis pipeline shared by every frame-ingestion route.
+
+decoded frame -> motion reference -> person count on the classroom's ROI
+(or reused, see app/sentinel/gate.py)
+-> motion score -> empty-class / mischief rules
+
+analyze_frames() runs the same steps over a timestamped batch (client
+backlogs): one chunked inference pass for all frames that need it, then the
+rules per classroom in time order with the frame timestamps as "now".
+"""
+import time
+
+from app.config import Config
+from app.sentinel import gate
+from app.sentinel.motion import prepare_motion_frame, motion_score
+from app.sentinel.roi import crop_to_roi, detection_settings, detection_settings_many
+from app.sentinel.scheduler import scheduled_count_persons, count_persons_chunked
+from app.sentinel.rules import process_empty_class_rule, process_mischief_rule, classroom_state
+from app.services.metrics import (STAGE_MOTION_PREPARE, STAGE_INFERENCE, STAGE_MOTION_SCORE, STAGE_RULES,
+                                  count_frame, observe_stage, stage_timer)
+
+_REUSE = "reuse"
+_STALE = "stale"
+
+
+def _gate_decision(motion_ref, now: float, inference_ref, inference_time: float):
+    """
+    Return _REUSE, _STALE (unchanged scene but count too old) or None.
+    inference_ref / inference_time: motion reference and time of the frame whose
+    count would be reused (None if there is no count to reuse).
+    """
+    if not Config.INFERENCE_GATE_ENABLED or inference_ref is None or inference_time is None:
+        return None
+    if inference_ref.shape != motion_ref.shape:
+        return None
+    if motion_score(motion_ref, inference_ref) >= Config.INFERENCE_GATE_THRESHOLD:
+        return None
+    age = now - inference_time
+    if age < 0:
+        # Frame older than the counted one (backlog replay): don't reuse a later count
+        return None
+    if age >= gate.max_staleness_sec():
+        return _STALE
+    return _REUSE
+
+
+def _reusable_ref(state):
+    """(inference_ref, last_inference_time) of a state, or (None, None) without a count to reuse."""
+    if state.last_person_count is None:
+        return None, None
+    return state.inference_ref, state.last_inference_time
+
+
+def analyze_image(classroom_id: str, image) -> dict:
+    """
+    Run person detection (unless the skip gate reuses the last count), motion
+    scoring and the frame rules on one decoded frame.
+    :param classroom_id: Classroom ID
+    :param image: BGR numpy array
+    :return: { classroom_id, person_count, motion_score, alert_created, inference_skipped }
+    """
+    with stage_timer(STAGE_MOTION_PREPARE):
+        motion_ref = prepare_motion_frame(image)
+    now = time.time()
+
+    # Previous motion reference (for the motion score) and skip-gate decision
+    with classroom_state(classroom_id) as state:
+        prev_ref = state.prev_frame
+        decision = _gate_decision(motion_ref, now, *_reusable_ref(state))
+        person_count = state.last_person_count if decision == _REUSE else None
+
+    skipped = decision == _REUSE
+    if skipped:
+        gate.record_skip()
+    else:
+        started = time.perf_counter()
+        roi, imgsz = detection_settings(classroom_id)
+        person_count = scheduled_count_persons(crop_to_roi(image, roi), imgsz)
+        elapsed = time.perf_counter() - started
+        gate.record_inference(elapsed * 1000.0, stale=decision == _STALE)
+        observe_stage(STAGE_INFERENCE, elapsed)
+        with classroom_state(classroom_id) as state:
+            state.inference_ref = motion_ref
+            state.last_person_count = person_count
+            state.last_inference_time = now
+
+    with stage_timer(STAGE_MOTION_SCORE):
+        score = motion_score(motion_ref, prev_ref)
+
+    # Apply rules
+    with stage_timer(STAGE_RULES):
+        empty_result = process_empty_class_rule(classroom_id, person_count, now=now)
+        mischief_result = process_mischief_rule(classroom_id, score, motion_ref, now=now)
+    count_frame(classroom_id, skipped)
+
+    return {
+        "classroom_id": classroom_id,
+        "person_count": empty_result["person_count"],
+        "motion_score": round(mischief_result["motion_score"], 3),
+        "alert_created": empty_result["alert_created"] or mischief_result["alert_created"],
+        "inference_skipped": skipped,
+    }
+
+
+def analyze_frames(frames: list) -> list:
+    """
+    Analyze a batch of timestamped frames for one or more classrooms.
+    Each classroom's frames are processed in timestamp order with the skip gate,
+    motion score and rules evaluated as if they had arrived one by one at those
+    times; person counts for all frames that need inference come from one
+    chunked batch pass (grouped by model input size).
+    :param frames: (classroom_id, timestamp in epoch seconds, BGR numpy array) tuples
+    :return: One result per frame, in input order (analyze_image fields plus "timestamp")
+    """
+    with stage_timer(STAGE_MOTION_PREPARE):
+        refs = [prepare_motion_frame(image) for _, _, image in frames]
+    by_classroom = {}
+    for i, (classroom_id, _, _) in enumerate(frames):
+        by_classroom.setdefault(classroom_id, []).append(i)
+    for indices in by_classroom.values():
+        indices.sort(key=lambda i: frames[i][1])
+
+    counts = [None] * len(frames)
+    reuses = {}  # frame index -> index of the batch frame whose count it reuses
+    skipped, stale = set(), set()
+    pending = {}  # imgsz -> [(frame index, cropped image)]
+    prev_refs = {}
+    last_inferred = {}  # classroom_id -> index of its latest frame that ran inference
+
+    # Skip-gate decisions, walking each classroom's frames in time order
+    settings = detection_settings_many(by_classroom)
+    for classroom_id, indices in by_classroom.items():
+        with classroom_state(classroom_id) as state:
+            prev_refs[classroom_id] = state.prev_frame
+            ref, ref_time = _reusable_ref(state)
+            ref_count, ref_index = state.last_person_count, None
+        roi, imgsz = settings[classroom_id]
+        for i in indices:
+            now = frames[i][1]
+            decision = _gate_decision(refs[i], now, ref, ref_time)
+            if decision == _REUSE:
+                gate.record_skip()
+                skipped.add(i)
+                if ref_index is None:
+                    counts[i] = ref_count
+                else:
+                    reuses[i] = ref_index
+                continue
+            if decision == _STALE:
+                stale.add(i)
+            pending.setdefault(imgsz, []).append((i, crop_to_roi(frames[i][2], roi)))
+            ref, ref_time, ref_index = refs[i], now, i
+            last_inferred[classroom_id] = i
+
+    # One chunked inference pass per model input size
+    for imgsz, items in pending.items():
+        started = time.perf_counter()
+        batch_counts = count_persons_chunked([image for _, image in items], imgsz)
+        elapsed = time.perf_counter() - started
+        observe_stage(STAGE_INFERENCE, elapsed)
+        per_frame_ms = elapsed * 1000.0 / len(items)
+        for (i, _), count in zip(items, batch_counts):
+            counts[i] = count
+            gate.record_inference(per_frame_ms, stale=i in stale)
+    for i, j in reuses.items():
+        counts[i] = counts[j]
+
+    # Latest inferred frame becomes the skip-gate reference (unless newer live frames already moved it)
+    for classroom_id, i in last_inferred.items():
+        with classroom_state(classroom_id) as state:
+            if state.last_inference_time is None or frames[i][1] >= state.last_inference_time:
+                state.inference_ref = refs[i]
+                state.last_person_count = counts[i]
+                state.last_inference_time = frames[i][1]
+
+    # Rules, per classroom in time order, with the frame timestamps
+    results = [None] * len(frames)
+    for classroom_id, indices in by_classroom.items():
+        prev_ref = prev_refs[classroom_id]
+        for i in indices:
+            now = frames[i][1]
+            with stage_timer(STAGE_MOTION_SCORE):
+                score = motion_score(refs[i], prev_ref)
+            with stage_timer(STAGE_RULES):
+                empty_result = process_empty_class_rule(classroom_id, counts[i], now=now)
+                mischief_result = process_mischief_rule(classroom_id, score, refs[i], now=now)
+            count_frame(classroom_id, i in skipped)
+            prev_ref = refs[i]
+            results[i] = {
+                "classroom_id": classroom_id,
+                "timestamp": now,
+                "person_count": empty_result["person_count"],
+                "motion_score": round(mischief_result["motion_score"], 3),
+                "alert_created": empty_result["alert_created"] or mischief_result["alert_created"],
+                "inference_skipped": i in skipped,
+            }
+    return results
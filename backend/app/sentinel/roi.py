@@ -0,0 +1,141 @@
+"""Per-classroom detection settings: crop region of interest and model input size.
+
+Stored on the classroom document:
+- detection_roi: [x, y, width, height] as fractions of the frame (0-1), or None for the full frame
+- detection_imgsz: model input size (e.g. 320 or 640), or None for INFERENCE_IMGSZ
+Person detection runs on the cropped region at that size; motion still uses the full frame.
+
+The pipeline reads the settings on every frame, so each process keeps them per
+classroom: refreshed after DETECTION_SETTINGS_TTL_SEC, replaced straight away
+by PUT /api/classrooms/<id>/detection (other processes pick it up on refresh).
+When the classroom cannot be read, the last known settings (or the defaults)
+are used for SETTINGS_RETRY_SEC before the next attempt, and the error is logged.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import Config
+
+# Accepted model input sizes (YOLOv8 strides need multiples of 32)
+IMGSZ_MIN = 160
+IMGSZ_MAX = 1280
+IMGSZ_STRIDE = 32
+
+# After a failed read, keep the last known settings this long before reading again
+SETTINGS_RETRY_SEC = 5.0
+# At most one read-failure warning per this interval
+_ERROR_LOG_INTERVAL_SEC = 60.0
+# Classrooms kept (least recently refreshed dropped first)
+_MAX_CLASSROOMS = 10000
+
+_settings_cache = OrderedDict()  # classroom_id -> ((roi, imgsz), refresh after (monotonic))
+_settings_lock = threading.Lock()
+_last_error_log = 0.0
+
+
+def validate_roi(roi):
+    """Return roi as [x, y, w, h] floats, or None for the full frame. Raises ValueError if invalid."""
+    if roi is None:
+        return None
+    if not isinstance(roi, (list, tuple)) or len(roi) != 4:
+        raise ValueError("roi must be [x, y, width, height] (fractions of the frame)")
+    try:
+        x, y, w, h = (float(v) for v in roi)
+    except (TypeError, ValueError):
+        raise ValueError("roi values must be numbers")
+    if not (0 <= x < 1 and 0 <= y < 1 and w > 0 and h > 0 and x + w <= 1 + 1e-6 and y + h <= 1 + 1e-6):
+        raise ValueError("roi must lie inside the frame: 0 <= x, y and x + width, y + height <= 1")
+    if x == 0 and y == 0 and w >= 1 and h >= 1:
+        return None
+    return [round(x, 4), round(y, 4), round(w, 4), round(h, 4)]
+
+
+def validate_imgsz(imgsz):
+    """Return imgsz as an int, or None for the default. Raises ValueError if invalid."""
+    if imgsz is None:
+        return None
+    try:
+        imgsz = int(imgsz)
+    except (TypeError, ValueError):
+        raise ValueError("imgsz must be an integer")
+    if not IMGSZ_MIN <= imgsz <= IMGSZ_MAX or imgsz % IMGSZ_STRIDE:
+        raise ValueError(f"imgsz must be a multiple of {IMGSZ_STRIDE} between {IMGSZ_MIN} and {IMGSZ_MAX}")
+    return imgsz
+
+
+def crop_to_roi(image, roi):
+    """Return the region of interest of image (a view, no copy); the full image when roi is None."""
+    if roi is None or image is None:
+        return image
+    height, width = image.shape[:2]
+    x, y, w, h = roi
+    left, top = int(x * width), int(y * height)
+    right = max(left + 1, min(width, int(round((x + w) * width))))
+    bottom = max(top + 1, min(height, int(round((y + h) * height))))
+    return image[top:bottom, left:right]
+
+
+def _settings(classroom) -> tuple:
+    if not classroom:
+        return None, None
+    return classroom.get("detection_roi"), classroom.get("detection_imgsz")
+
+
+def _remember(settings: dict, ttl: float):
+    refresh_at = time.monotonic() + ttl
+    with _settings_lock:
+        for classroom_id, value in settings.items():
+            _settings_cache[classroom_id] = (value, refresh_at)
+            _settings_cache.move_to_end(classroom_id)
+        while len(_settings_cache) > _MAX_CLASSROOMS:
+            _settings_cache.popitem(last=False)
+
+
+def remember_detection_settings(classroom: dict):
+    """Keep a classroom's settings from its updated document (PUT .../detection), without a read."""
+    _remember({classroom["id"]: _settings(classroom)}, Config.DETECTION_SETTINGS_TTL_SEC)
+
+
+def _log_read_error(error: Exception, classroom_ids: list):
+    global _last_error_log
+    now = time.monotonic()
+    if now - _last_error_log < _ERROR_LOG_INTERVAL_SEC:
+        return
+    _last_error_log = now
+    print(f"⚠️ Detection settings: cannot read classrooms {classroom_ids[:5]}, using the last known settings "
+          f"(retry in {SETTINGS_RETRY_SEC:g}s): {error}")
+
+
+def detection_settings(classroom_id: str):
+    """(roi, imgsz) for a classroom; defaults if unknown."""
+    return detection_settings_many([classroom_id])[classroom_id]
+
+
+def detection_settings_many(classroom_ids) -> dict:
+    """{classroom_id: (roi, imgsz)} for several classrooms: kept settings, plus one batch read for the
+    classrooms not kept or due for a refresh."""
+    from app.db.store import get_classrooms_by_ids
+    ids = list(classroom_ids)
+    now = time.monotonic()
+    result, stale = {}, {}
+    with _settings_lock:
+        for classroom_id in ids:
+            entry = _settings_cache.get(classroom_id)
+            if entry is not None and entry[1] > now:
+                result[classroom_id] = entry[0]
+            else:
+                stale[classroom_id] = entry[0] if entry is not None else (None, None)
+    if not stale:
+        return result
+    missing = list(stale)
+    try:
+        classrooms = get_classrooms_by_ids(missing)
+        fetched = {classroom_id: _settings(classrooms.get(classroom_id)) for classroom_id in missing}
+        _remember(fetched, Config.DETECTION_SETTINGS_TTL_SEC)
+    except Exception as e:
+        _log_read_error(e, missing)
+        fetched = stale
+        _remember(fetched, SETTINGS_RETRY_SEC)
+    result.update(fetched)
+    return result
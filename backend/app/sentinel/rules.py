@@ -1,7 +1,9 @@
 """Alert rules: time-based empty class detection and per-classroom state."""
-import threading
 import time
 
+from app.sentinel.state import get_state_store
+from app.services.metrics import count_alert, count_audio_samples
+
 # Empty class: alert after this many seconds with zero persons
 EMPTY_CLASS_DURATION_SEC = 10  # 2 minutes
 
@@ -15,130 +17,165 @@ LOUD_NOISE_THRESHOLD = 0.1  # Audio level above this triggers increment
 LOUD_NOISE_CONSECUTIVE_COUNT = 5  # Need this many consecutive high-level requests
 LOUD_NOISE_COOLDOWN_SEC = 60  # Don't alert again for this many seconds after an alert
 
-# Per-classroom state and lock
-_state = {}  # classroom_id -> dict
-_locks = {}  # classroom_id -> threading.Lock()
 
+def classroom_state(classroom_id: str):
+    """Context manager: hold the classroom's lock and get its ClassroomState (see app/sentinel/state.py)."""
+    return get_state_store().locked(classroom_id)
 
-def _get_lock(classroom_id: str) -> threading.Lock:
-    if classroom_id not in _locks:
-        _locks[classroom_id] = threading.Lock()
-    return _locks[classroom_id]
 
+def _record_alert(classroom_id: str, alert_type: str, status: str, metadata: dict, at: float = None):
+    """Persist an alert plus the classroom status it implies, and push both to event subscribers.
+    at: time of the triggering sample (epoch seconds), default now.
+    Called after the classroom lock is released; persistence goes through the
+    write-behind queue (app/db/writer.py), so no MongoDB round trip happens here."""
+    from app.db.schema import default_alert
+    from app.db.writer import persist_alert, persist_classroom_status
+    from app.services.events import publish_event, EVENT_ALERT, EVENT_CLASSROOM_STATUS
 
-def _get_state(classroom_id: str) -> dict:
-    """Get or create state for classroom. Caller must hold lock."""
-    if classroom_id not in _state:
-        _state[classroom_id] = {
-            "first_empty_time": None,  # timestamp when we first saw 0 persons
-            "prev_frame": None,  # for motion detection
-            "consecutive_motion": 0,  # count of consecutive high-motion frames
-            "last_mischief_alert_time": None,  # cooldown for mischief alerts
-            "consecutive_high_audio": 0,  # count of consecutive high audio levels
-            "last_loud_noise_alert_time": None,  # cooldown for loud noise alerts
-        }
-    return _state[classroom_id]
+    alert = default_alert(classroom_id, alert_type, metadata=metadata, at=at)
+    count_alert(classroom_id, alert_type)
+    persist_alert(alert)
+    persist_classroom_status(classroom_id, status, alert["timestamp"])
+    publish_event(EVENT_ALERT, alert)
+    publish_event(EVENT_CLASSROOM_STATUS, {
+        "id": classroom_id,
+        "current_status": status,
+        "updated_at": alert["timestamp"],
+    })
 
 
-def process_empty_class_rule(classroom_id: str, person_count: int) -> dict:
+def process_empty_class_rule(classroom_id: str, person_count: int, now: float = None) -> dict:
     """
     Apply empty-class rule: if 0 persons for >= 2 minutes, create alert and update classroom.
+    now: time of the frame (epoch seconds), default now.
     Returns dict: { "alert_created": bool, "person_count": int }.
     """
-    from app.db.store import get_classroom_by_id, upsert_classroom, insert_alert
-
-    lock = _get_lock(classroom_id)
-    with lock:
-        state = _get_state(classroom_id)
-        now = time.time()
-        alert_created = False
+    now = time.time() if now is None else now
+    alert_metadata = None
+    with classroom_state(classroom_id) as state:
 
         if person_count == 0:
-            if state["first_empty_time"] is None:
-                state["first_empty_time"] = now
+            if state.first_empty_time is None:
+                state.first_empty_time = now
             else:
-                elapsed = now - state["first_empty_time"]
+                elapsed = now - state.first_empty_time
                 if elapsed >= EMPTY_CLASS_DURATION_SEC:
-                    # Create empty_class alert and update classroom status
-                    insert_alert(classroom_id, "empty_class", metadata={"empty_duration_sec": round(elapsed)})
-                    upsert_classroom(classroom_id, current_status="empty")
-                    state["first_empty_time"] = None
-                    alert_created = True
+                    alert_metadata = {"empty_duration_sec": round(elapsed)}
+                    state.first_empty_time = None
         else:
-            state["first_empty_time"] = None
+            state.first_empty_time = None
 
-        return {"alert_created": alert_created, "person_count": person_count}
+    if alert_metadata is not None:
+        # Create empty_class alert and update classroom status
+        _record_alert(classroom_id, "empty_class", "empty", alert_metadata, at=now)
+    return {"alert_created": alert_metadata is not None, "person_count": person_count}
 
 
-def process_mischief_rule(classroom_id: str, motion_score: float, current_frame) -> dict:
+def process_mischief_rule(classroom_id: str, motion_score: float, current_frame, now: float = None) -> dict:
     """
     Apply mischief rule: if motion_score > threshold for consecutive frames, create alert.
+    current_frame is the motion reference to keep for the next comparison
+    (from prepare_motion_frame); it is stored as-is, not copied.
+    now: time of the frame (epoch seconds), default now.
     Returns dict: { "alert_created": bool, "motion_score": float }.
     """
-    from app.db.store import upsert_classroom, insert_alert
-
-    lock = _get_lock(classroom_id)
-    with lock:
-        state = _get_state(classroom_id)
-        now = time.time()
-        alert_created = False
+    now = time.time() if now is None else now
+    alert_metadata = None
+    with classroom_state(classroom_id) as state:
 
         # Check cooldown
-        if state["last_mischief_alert_time"] is not None:
-            elapsed_since_alert = now - state["last_mischief_alert_time"]
-            if elapsed_since_alert < MISCHIEF_COOLDOWN_SEC:
-                # Still in cooldown, don't process
-                state["prev_frame"] = current_frame.copy() if current_frame is not None else None
-                return {"alert_created": False, "motion_score": motion_score}
-
-        if motion_score > MOTION_THRESHOLD:
-            state["consecutive_motion"] += 1
-            if state["consecutive_motion"] >= MISCHIEF_CONSECUTIVE_COUNT:
-                # Create mischief alert and update classroom status
-                insert_alert(classroom_id, "mischief", metadata={"motion_score": round(motion_score, 3)})
-                upsert_classroom(classroom_id, current_status="mischief")
-                state["consecutive_motion"] = 0
-                state["last_mischief_alert_time"] = now
-                alert_created = True
-        else:
-            state["consecutive_motion"] = 0
+        in_cooldown = (state.last_mischief_alert_time is not None
+                       and now - state.last_mischief_alert_time < MISCHIEF_COOLDOWN_SEC)
+
+        # Still in cooldown: don't process, only keep the reference
+        if not in_cooldown:
+            if motion_score > MOTION_THRESHOLD:
+                state.consecutive_motion += 1
+                if state.consecutive_motion >= MISCHIEF_CONSECUTIVE_COUNT:
+                    alert_metadata = {"motion_score": round(motion_score, 3)}
+                    state.consecutive_motion = 0
+                    state.last_mischief_alert_time = now
+            else:
+                state.consecutive_motion = 0
 
         # Update prev_frame for next comparison
-        state["prev_frame"] = current_frame.copy() if current_frame is not None else None
+        state.prev_frame = current_frame
 
-        return {"alert_created": alert_created, "motion_score": motion_score}
+    if alert_metadata is not None:
+        # Create mischief alert and update classroom status
+        _record_alert(classroom_id, "mischief", "mischief", alert_metadata, at=now)
+    return {"alert_created": alert_metadata is not None, "motion_score": motion_score}
 
 
-def process_loud_noise_rule(classroom_id: str, audio_level: float) -> dict:
+def process_loud_noise_rule(classroom_id: str, audio_level: float, now: float = None) -> dict:
     """
     Apply loud noise rule: if audio_level > threshold for consecutive requests, create alert.
+    now: time of the sample (epoch seconds), default now.
     Returns dict: { "alert_created": bool, "audio_level": float }.
     """
-    from app.db.store import upsert_classroom, insert_alert
-
-    lock = _get_lock(classroom_id)
-    with lock:
-        state = _get_state(classroom_id)
-        now = time.time()
-        alert_created = False
+    now = time.time() if now is None else now
+    count_audio_samples(classroom_id)
+    alert_metadata = None
+    with classroom_state(classroom_id) as state:
 
         # Check cooldown
-        if state["last_loud_noise_alert_time"] is not None:
-            elapsed_since_alert = now - state["last_loud_noise_alert_time"]
-            if elapsed_since_alert < LOUD_NOISE_COOLDOWN_SEC:
-                # Still in cooldown, don't process
-                return {"alert_created": False, "audio_level": audio_level}
-
-        if audio_level > LOUD_NOISE_THRESHOLD:
-            state["consecutive_high_audio"] += 1
-            if state["consecutive_high_audio"] >= LOUD_NOISE_CONSECUTIVE_COUNT:
-                # Create loud_noise alert and update classroom status
-                insert_alert(classroom_id, "loud_noise", metadata={"audio_level": round(audio_level, 3)})
-                upsert_classroom(classroom_id, current_status="loud_noise")
-                state["consecutive_high_audio"] = 0
-                state["last_loud_noise_alert_time"] = now
-                alert_created = True
-        else:
-            state["consecutive_high_audio"] = 0
+        in_cooldown = (state.last_loud_noise_alert_time is not None
+                       and now - state.last_loud_noise_alert_time < LOUD_NOISE_COOLDOWN_SEC)
+
+        # Still in cooldown: don't process
+        if not in_cooldown:
+            if audio_level > LOUD_NOISE_THRESHOLD:
+                state.consecutive_high_audio += 1
+                if state.consecutive_high_audio >= LOUD_NOISE_CONSECUTIVE_COUNT:
+                    alert_metadata = {"audio_level": round(audio_level, 3)}
+                    state.consecutive_high_audio = 0
+                    state.last_loud_noise_alert_time = now
+            else:
+                state.consecutive_high_audio = 0
+
+    if alert_metadata is not None:
+        # Create loud_noise alert and update classroom status
+        _record_alert(classroom_id, "loud_noise", "loud_noise", alert_metadata, at=now)
+    return {"alert_created": alert_metadata is not None, "audio_level": audio_level}
 
-        return {"alert_created": alert_created, "audio_level": audio_level}
+
+def process_loud_noise_batch(classroom_id: str, samples: list) -> dict:
+    """
+    Apply the loud noise rule to many samples of one classroom under a single lock.
+    Same alerts as calling process_loud_noise_rule once per sample in time order
+    (see app/sentinel/streaks.py).
+    :param samples: (timestamp, audio_level) pairs, any order (sorted here, stable)
+    :return: { "samples": int, "alerts": [{"timestamp", "audio_level"}], "alert_created": bool }
+    """
+    from app.sentinel.streaks import evaluate_streaks
+
+    samples = sorted(samples, key=lambda s: s[0])
+    count_audio_samples(classroom_id, len(samples))
+    timestamps = [t for t, _ in samples]
+    levels = [level for _, level in samples]
+    with classroom_state(classroom_id) as state:
+        hits, state.consecutive_high_audio, state.last_loud_noise_alert_time = evaluate_streaks(
+            timestamps, levels, LOUD_NOISE_THRESHOLD, LOUD_NOISE_CONSECUTIVE_COUNT, LOUD_NOISE_COOLDOWN_SEC,
+            streak=state.consecutive_high_audio, last_alert_time=state.last_loud_noise_alert_time)
+
+    alerts = []
+    for i in hits:
+        at, level = samples[i]
+        _record_alert(classroom_id, "loud_noise", "loud_noise", {"audio_level": round(level, 3)}, at=at)
+        alerts.append({"timestamp": at, "audio_level": level})
+    return {"samples": len(samples), "alerts": alerts, "alert_created": bool(alerts)}
+
+
+def motion_memory_report() -> dict:
+    """Bytes held by stored motion references, per classroom and in total."""
+    per_classroom = {cid: state.frame_bytes() for cid, state in get_state_store().items()}
+    return {
+        "classrooms": len(per_classroom),
+        "total_bytes": sum(per_classroom.values()),
+        "per_classroom_bytes": per_classroom,
+    }
+
+
+def rule_state_stats() -> dict:
+    """Classroom state store metrics (size and evictions, or Redis loads/writes/locks)."""
+    return get_state_store().stats()
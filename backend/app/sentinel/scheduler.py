@@ -0,0 +1,248 @@
+"""Inference scheduler: micro-batches person-count requests across classrooms.
+
+Frames from all classrooms are queued; a single worker thread collects up to
+INFERENCE_BATCH_MAX_SIZE frames (or whatever arrived within
+INFERENCE_BATCH_MAX_WAIT_MS of the oldest queued frame), runs one batched
+YOLOv8 call and hands each count back to the waiting request.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from app.config import Config
+from app.services.latency import LatencyWindow
+
+# Upper bound on how long a request waits for its batch result
+RESULT_TIMEOUT_SEC = 30
+
+
+class _Pending:
+    """One queued frame waiting for a batch."""
+    __slots__ = ("image", "imgsz", "future", "enqueued_at")
+
+    def __init__(self, image, imgsz: int = None):
+        self.image = image
+        self.imgsz = imgsz
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class InferenceScheduler:
+    """Queue frames from many requests and run them as batched inference calls."""
+
+    def __init__(self, run_batch, max_batch_size: int = 8, max_wait_ms: float = 30.0, submit_batch=None):
+        """
+        :param run_batch: Callable taking a list of images (and the model input size, None = default)
+            and returning a list of counts
+        :param max_batch_size: Largest batch handed to run_batch
+        :param max_wait_ms: Longest time the oldest queued frame waits for companions
+        :param submit_batch: Optional callable taking the same arguments and returning a Future of
+            counts (e.g. the worker pool); batches are then handed off without waiting, so
+            several can be in flight. A None return runs that batch with run_batch instead
+        """
+        self._run_batch = run_batch
+        self._submit_batch = submit_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_sec = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+
+        # Metrics (updated by the worker thread, or by completion callbacks with submit_batch)
+        self._metrics_lock = threading.Lock()
+        self._batches = 0
+        self._frames = 0
+        self._errors = 0
+        self._batch_sizes = {}  # batch size -> number of batches
+        self._queue_wait_ms = LatencyWindow()
+        self._inference_ms = LatencyWindow()
+
+        self._thread = threading.Thread(target=self._loop, name="inference-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, image, imgsz: int = None) -> Future:
+        """Queue an image; the returned future resolves to its person count."""
+        pending = _Pending(image, imgsz)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Inference scheduler is stopped")
+            self._queue.append(pending)
+            self._cond.notify()
+        return pending.future
+
+    def count_persons(self, image, imgsz: int = None) -> int:
+        """Blocking helper: queue an image and wait for its person count."""
+        return self.submit(image, imgsz).result(timeout=RESULT_TIMEOUT_SEC)
+
+    def stop(self):
+        """Stop accepting frames; already queued frames are still processed."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout=RESULT_TIMEOUT_SEC)
+
+    def _next_batch(self) -> list:
+        """Block until a batch is ready (full, or oldest frame hit max wait).
+        A batch only holds frames with the oldest frame's imgsz; others stay queued."""
+        with self._cond:
+            while not self._queue and not self._stopped:
+                self._cond.wait()
+            if not self._queue:
+                return []
+            deadline = self._queue[0].enqueued_at + self.max_wait_sec
+            while len(self._queue) < self.max_batch_size and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            imgsz = self._queue[0].imgsz
+            batch, others = [], []
+            while self._queue and len(batch) < self.max_batch_size:
+                pending = self._queue.popleft()
+                (batch if pending.imgsz == imgsz else others).append(pending)
+            self._queue.extendleft(reversed(others))
+            return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: list):
+        started = time.monotonic()
+        batch = [p for p in batch if p.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        images = [p.image for p in batch]
+        imgsz = batch[0].imgsz
+        if self._submit_batch is not None:
+            try:
+                future = self._submit_batch(images, imgsz)
+            except Exception as e:
+                self._fail(batch, e)
+                return
+            if future is not None:
+                future.add_done_callback(lambda done: self._complete(batch, started, done))
+                return
+        try:
+            counts = self._run_batch(images, imgsz)
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        self._resolve(batch, started, counts)
+
+    def _complete(self, batch: list, started: float, done: Future):
+        if done.exception() is not None:
+            self._fail(batch, done.exception())
+        else:
+            self._resolve(batch, started, done.result())
+
+    def _fail(self, batch: list, error: BaseException):
+        with self._metrics_lock:
+            self._errors += 1
+        for p in batch:
+            p.future.set_exception(error)
+
+    def _resolve(self, batch: list, started: float, counts: list):
+        finished = time.monotonic()
+        for p, count in zip(batch, counts):
+            p.future.set_result(count)
+            self._queue_wait_ms.add((started - p.enqueued_at) * 1000.0)
+        self._inference_ms.add((finished - started) * 1000.0)
+        with self._metrics_lock:
+            self._batches += 1
+            self._frames += len(batch)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+
+    def stats(self) -> dict:
+        """Batch-size and queue-wait metrics for tuning."""
+        with self._cond:
+            queue_depth = len(self._queue)
+        with self._metrics_lock:
+            batch_sizes = dict(self._batch_sizes)
+        return {
+            "enabled": True,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_sec * 1000.0,
+            "queue_depth": queue_depth,
+            "batches": self._batches,
+            "frames": self._frames,
+            "errors": self._errors,
+            "avg_batch_size": round(self._frames / self._batches, 3) if self._batches else 0.0,
+            "batch_size_histogram": {str(k): v for k, v in sorted(batch_sizes.items())},
+            "queue_wait_ms": self._queue_wait_ms.summary(),
+            "batch_inference_ms": self._inference_ms.summary(),
+        }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def _submit_to_pool(images: list, imgsz: int = None):
+    """Hand a batch to the worker pool, or None (run it in this process) while no worker is ready."""
+    from app.sentinel.worker_pool import get_worker_pool
+    pool = get_worker_pool()
+    return pool.submit_batch(images, imgsz) if pool is not None else None
+
+
+def get_scheduler() -> InferenceScheduler:
+    """Get or create the process-wide scheduler (configured from Config)."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from app.sentinel.vision import count_persons_batch
+                _scheduler = InferenceScheduler(
+                    count_persons_batch,
+                    max_batch_size=Config.INFERENCE_BATCH_MAX_SIZE,
+                    max_wait_ms=Config.INFERENCE_BATCH_MAX_WAIT_MS,
+                    submit_batch=_submit_to_pool if Config.INFERENCE_WORKERS > 0 else None,
+                )
+    return _scheduler
+
+
+def scheduled_count_persons(image, imgsz: int = None) -> int:
+    """Person count through the batching scheduler when enabled, else a direct call
+    (to the inference worker pool when INFERENCE_WORKERS > 0, else in this process)."""
+    if not Config.INFERENCE_BATCH_ENABLED:
+        from app.sentinel.worker_pool import get_worker_pool
+        pool = get_worker_pool()
+        if pool is not None:
+            return pool.count_persons(image, imgsz)
+        from app.sentinel.vision import count_persons
+        return count_persons(image, imgsz)
+    return get_scheduler().count_persons(image, imgsz)
+
+
+def count_persons_chunked(images: list, imgsz: int = None) -> list:
+    """
+    Person counts for frames that arrive already batched (e.g. a client backlog):
+    batched calls of up to INFERENCE_BATCH_MAX_SIZE frames (at most one pool job each), bypassing the
+    scheduler queue, on the inference worker pool when INFERENCE_WORKERS > 0.
+    :return: Person count per image, in the same order
+    """
+    from app.sentinel.worker_pool import get_worker_pool
+    pool = get_worker_pool()
+    if pool is not None:
+        run_batch = pool.count_persons_batch
+    else:
+        from app.sentinel.vision import count_persons_batch as run_batch
+    size = max(1, Config.INFERENCE_BATCH_MAX_SIZE)
+    if pool is not None:
+        # One job per chunk: larger chunks would only be split again by the pool
+        size = min(size, pool.max_job_frames)
+    counts = []
+    for start in range(0, len(images), size):
+        counts.extend(run_batch(images[start:start + size], imgsz))
+    return counts
+
+
+def scheduler_stats() -> dict:
+    """Scheduler metrics, or a disabled marker if no batches were scheduled yet."""
+    if _scheduler is None:
+        return {"enabled": Config.INFERENCE_BATCH_ENABLED, "batches": 0, "frames": 0}
+    return _scheduler.stats()
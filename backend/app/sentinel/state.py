@@ -0,0 +1,477 @@
+"""Per-classroom rule state behind a pluggable store (RULE_STATE_BACKEND).
+
+- "memory" (default): in-process, bounded. Slotted records, a fixed set of
+  lock stripes (classroom id hash -> stripe) and eviction when idle for
+  RULE_STATE_IDLE_TTL_SEC or, least recently used first, beyond
+  RULE_STATE_MAX_CLASSROOMS. A record whose stripe another thread holds is
+  not evicted until it is free. Each process keeps its own streaks.
+- "redis": shared by every worker process / replica (REDIS_URL), so requests
+  for one classroom can land anywhere behind a load balancer. One hash per
+  classroom; a Redis lock per classroom makes each read-modify-write atomic and
+  changed fields are written back in one MULTI transaction. Motion references
+  are stored zlib-compressed. Keys expire after RULE_STATE_IDLE_TTL_SEC idle.
+  REDIS_URL=fakeredis:// uses an in-process fake (tests, single-process dev).
+
+An evicted classroom starts with fresh state (streaks and cooldowns reset) on its next frame.
+
+Use: with get_state_store().locked(classroom_id) as state: ...
+"""
+import itertools
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from app.config import Config
+from app.services.metrics import STAGE_LOCK_WAIT, observe_stage
+
+# Run the idle sweep at most this often (it scans from the LRU end only)
+SWEEP_INTERVAL_SEC = 10.0
+
+# Redis key prefix: <prefix><classroom_id> (hash) and <prefix><classroom_id>:lock
+REDIS_KEY_PREFIX = "sentinel:state:"
+
+# Backoff while waiting for another process's classroom lock
+_LOCK_RETRY_MIN_SEC = 0.002
+_LOCK_RETRY_MAX_SEC = 0.05
+
+# Scalar fields persisted by shared backends, by type; frames are encoded separately
+_FLOAT_FIELDS = ("first_empty_time", "last_mischief_alert_time", "last_loud_noise_alert_time", "last_inference_time")
+_INT_FIELDS = ("consecutive_motion", "consecutive_high_audio", "last_person_count")
+_FRAME_FIELDS = ("prev_frame", "inference_ref")
+
+# Stored instead of a second copy when inference_ref is prev_frame
+_SAME_AS_PREV = b"="
+
+# zlib level for motion references (1: fast; grayscale frames still shrink well)
+_FRAME_COMPRESSION_LEVEL = 1
+
+
+def encode_frame(frame) -> bytes:
+    """Motion reference -> compact bytes: header (dtype, shape) + zlib-compressed pixels."""
+    dtype = frame.dtype.str.encode()
+    header = struct.pack("<BB", len(dtype), frame.ndim) + dtype + struct.pack(f"<{frame.ndim}I", *frame.shape)
+    return header + zlib.compress(frame.tobytes(), _FRAME_COMPRESSION_LEVEL)
+
+
+def decode_frame(data: bytes):
+    """Inverse of encode_frame (read-only numpy array)."""
+    import numpy as np
+
+    dtype_len, ndim = struct.unpack_from("<BB", data)
+    offset = 2
+    dtype = data[offset:offset + dtype_len].decode()
+    offset += dtype_len
+    shape = struct.unpack_from(f"<{ndim}I", data, offset)
+    offset += 4 * ndim
+    return np.frombuffer(zlib.decompress(data[offset:]), dtype=dtype).reshape(shape)
+
+
+def _same_frame(a, b) -> bool:
+    """Identical motion references (same object, or equal pixels: the pipeline and the mischief rule store them separately)."""
+    if a is b:
+        return True
+    return b is not None and a.shape == b.shape and a.dtype == b.dtype and a.tobytes() == b.tobytes()
+
+
+class ClassroomState:
+    """Rule state of one classroom."""
+    __slots__ = (
+        "first_empty_time",  # timestamp when we first saw 0 persons
+        "prev_frame",  # compact grayscale motion reference (app/sentinel/motion.py)
+        "consecutive_motion",  # count of consecutive high-motion frames
+        "last_mischief_alert_time",  # cooldown for mischief alerts
+        "consecutive_high_audio",  # count of consecutive high audio levels
+        "last_loud_noise_alert_time",  # cooldown for loud noise alerts
+        "inference_ref",  # motion reference of the last frame that ran inference (skip gate)
+        "last_person_count",  # person count of that frame
+        "last_inference_time",  # when it ran
+        "last_access",  # monotonic time of the last lookup (eviction)
+    )
+
+    def __init__(self):
+        self.first_empty_time = None
+        self.prev_frame = None
+        self.consecutive_motion = 0
+        self.last_mischief_alert_time = None
+        self.consecutive_high_audio = 0
+        self.last_loud_noise_alert_time = None
+        self.inference_ref = None
+        self.last_person_count = None
+        self.last_inference_time = None
+        self.last_access = 0.0
+
+    def scalar_fields(self) -> dict:
+        """Persistable scalar fields (None = absent)."""
+        return {name: getattr(self, name) for name in _FLOAT_FIELDS + _INT_FIELDS}
+
+    def frame_fields(self) -> dict:
+        """Encoded motion references (None = absent; inference_ref deduplicated when it is prev_frame)."""
+        prev_frame = None if self.prev_frame is None else encode_frame(self.prev_frame)
+        if self.inference_ref is None:
+            inference_ref = None
+        elif _same_frame(self.inference_ref, self.prev_frame):
+            inference_ref = _SAME_AS_PREV
+        else:
+            inference_ref = encode_frame(self.inference_ref)
+        return {"prev_frame": prev_frame, "inference_ref": inference_ref}
+
+    @classmethod
+    def from_fields(cls, fields: dict) -> "ClassroomState":
+        """Build a state from stored fields (bytes keys/values, as returned by HGETALL)."""
+        state = cls()
+        fields = {k.decode() if isinstance(k, bytes) else k: v for k, v in fields.items()}
+        for name in _FLOAT_FIELDS:
+            if fields.get(name) is not None:
+                setattr(state, name, float(fields[name]))
+        for name in _INT_FIELDS:
+            if fields.get(name) is not None:
+                setattr(state, name, int(fields[name]))
+        if fields.get("prev_frame"):
+            state.prev_frame = decode_frame(fields["prev_frame"])
+        ref = fields.get("inference_ref")
+        if ref == _SAME_AS_PREV:
+            state.inference_ref = state.prev_frame
+        elif ref:
+            state.inference_ref = decode_frame(ref)
+        return state
+
+    def release_frames(self):
+        self.prev_frame = None
+        self.inference_ref = None
+
+    def frame_bytes(self) -> int:
+        """Bytes held by the stored motion references (inference_ref is often prev_frame itself)."""
+        total = int(getattr(self.prev_frame, "nbytes", 0))
+        if self.inference_ref is not self.prev_frame:
+            total += int(getattr(self.inference_ref, "nbytes", 0))
+        return total
+
+
+class StateStore:
+    """Base class: per-classroom state, one classroom locked at a time per caller."""
+    name = "base"
+
+    def locked(self, classroom_id: str):
+        """Context manager: hold the classroom's lock and yield its ClassroomState; changes are kept on exit."""
+        raise NotImplementedError
+
+    def items(self) -> list:
+        """Snapshot of (classroom_id, state) pairs."""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class MemoryStateStore(StateStore):
+    """In-process classroom state with lock stripes and idle-TTL / LRU eviction."""
+    name = "memory"
+
+    def __init__(self, stripes: int = 64, max_classrooms: int = 10000, idle_ttl_sec: float = 3600.0):
+        self._stripes = [threading.Lock() for _ in range(max(1, int(stripes)))]
+        self.max_classrooms = max(1, int(max_classrooms))
+        self.idle_ttl_sec = idle_ttl_sec
+        self._states = OrderedDict()  # classroom_id -> ClassroomState, least recently used first
+        self._index_lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self._created = 0
+        self._evicted_idle = 0
+        self._evicted_lru = 0
+
+    def lock_for(self, classroom_id: str) -> threading.Lock:
+        return self._stripes[hash(classroom_id) % len(self._stripes)]
+
+    @contextmanager
+    def locked(self, classroom_id: str):
+        """Hold the classroom's stripe lock and yield its state (created on first use)."""
+        lock = self.lock_for(classroom_id)
+        started = time.perf_counter()
+        with lock:
+            observe_stage(STAGE_LOCK_WAIT, time.perf_counter() - started)
+            yield self._get(classroom_id)
+
+    def _get(self, classroom_id: str) -> ClassroomState:
+        now = time.monotonic()
+        with self._index_lock:
+            state = self._states.get(classroom_id)
+            if state is None:
+                state = ClassroomState()
+                self._states[classroom_id] = state
+                self._created += 1
+            else:
+                self._states.move_to_end(classroom_id)
+            state.last_access = now
+            excess = len(self._states) - self.max_classrooms
+            if excess > 0:
+                # Busy records are skipped, so look a stripe count past the excess
+                candidates = [cid for cid in itertools.islice(self._states, excess + len(self._stripes))
+                              if cid != classroom_id]
+                self._evicted_lru += self._evict_locked(candidates, excess, self.lock_for(classroom_id))
+            if now - self._last_sweep >= SWEEP_INTERVAL_SEC:
+                self._sweep_locked(now, self.lock_for(classroom_id))
+        return state
+
+    def _evict_locked(self, classroom_ids: list, limit: int, held: threading.Lock = None) -> int:
+        """
+        Drop up to limit of the given records and release their frames (caller holds the index lock).
+        A record is only evicted under its stripe lock: records whose stripe another thread holds may
+        be in use and are skipped (a later pass evicts them). Non-blocking, so stripe holders waiting
+        for the index lock cannot deadlock with us.
+        :param held: Stripe lock the caller already holds (records on it are not in use by others)
+        :return: Number of records evicted
+        """
+        evicted = 0
+        for classroom_id in classroom_ids:
+            if evicted >= limit:
+                break
+            lock = self.lock_for(classroom_id)
+            if lock is not held and not lock.acquire(blocking=False):
+                continue
+            try:
+                self._states.pop(classroom_id).release_frames()
+            finally:
+                if lock is not held:
+                    lock.release()
+            evicted += 1
+        return evicted
+
+    def _sweep_locked(self, now: float, held: threading.Lock = None):
+        """Evict idle records (caller holds the index lock); the LRU order makes this a prefix scan."""
+        self._last_sweep = now
+        if self.idle_ttl_sec <= 0:
+            return
+        idle = list(itertools.takewhile(lambda classroom_id: now - self._states[classroom_id].last_access
+                                        >= self.idle_ttl_sec, self._states))
+        self._evicted_idle += self._evict_locked(idle, len(idle), held)
+
+    def sweep(self):
+        """Evict idle records now."""
+        with self._index_lock:
+            self._sweep_locked(time.monotonic())
+
+    def items(self) -> list:
+        """Snapshot of (classroom_id, state) pairs."""
+        with self._index_lock:
+            return list(self._states.items())
+
+    def clear(self):
+        with self._index_lock:
+            for state in self._states.values():
+                state.release_frames()
+            self._states.clear()
+
+    def stats(self) -> dict:
+        items = self.items()
+        with self._index_lock:
+            created, idle, lru = self._created, self._evicted_idle, self._evicted_lru
+        return {
+            "backend": self.name,
+            "classrooms": len(items),
+            "capacity": self.max_classrooms,
+            "idle_ttl_sec": self.idle_ttl_sec,
+            "lock_stripes": len(self._stripes),
+            "created": created,
+            "evicted_idle": idle,
+            "evicted_lru": lru,
+            "frame_bytes": sum(state.frame_bytes() for _, state in items),
+        }
+
+
+class RedisStateStore(StateStore):
+    """Classroom state in Redis, shared across processes and hosts."""
+    name = "redis"
+
+    def __init__(self, url: str = None, idle_ttl_sec: float = 3600.0, lock_timeout_sec: float = 5.0,
+                 client=None, key_prefix: str = REDIS_KEY_PREFIX):
+        """
+        :param url: redis://... or fakeredis:// (ignored when client is given)
+        :param lock_timeout_sec: Lock expiry and max wait to acquire it (a crashed holder can't block a classroom forever)
+        :param client: Ready redis.Redis-compatible client (e.g. fakeredis.FakeRedis)
+        """
+        if client is None:
+            client = self._connect(url)
+        self._client = client
+        self.idle_ttl_sec = idle_ttl_sec
+        self.lock_timeout_sec = lock_timeout_sec
+        self._prefix = key_prefix
+
+        # Metrics
+        self._metrics_lock = threading.Lock()
+        self._loads = 0
+        self._writes = 0
+        self._lock_lost = 0
+        self._lock_wait_ms = 0.0
+
+    @staticmethod
+    def _connect(url: str):
+        if url and url.startswith("fakeredis://"):
+            import fakeredis
+            return fakeredis.FakeRedis()
+        import redis
+        return redis.Redis.from_url(url)
+
+    def _key(self, classroom_id: str) -> str:
+        return f"{self._prefix}{classroom_id}"
+
+    @contextmanager
+    def locked(self, classroom_id: str):
+        """Hold the classroom's Redis lock, load its hash, yield the state and write back changed fields."""
+        key = self._key(classroom_id)
+        lock_key = f"{key}:lock"
+        started = time.perf_counter()
+        token = self._acquire(lock_key)
+        waited_ms = (time.perf_counter() - started) * 1000.0
+        observe_stage(STAGE_LOCK_WAIT, waited_ms / 1000.0)
+        try:
+            state = ClassroomState.from_fields(self._client.hgetall(key))
+            scalars = state.scalar_fields()
+            frames = (state.prev_frame, state.inference_ref)
+            yield state
+            self._write_back(key, state, scalars, frames)
+        finally:
+            released = self._release(lock_key, token)
+            with self._metrics_lock:
+                self._loads += 1
+                self._lock_wait_ms += waited_ms
+                if not released:
+                    self._lock_lost += 1
+            if not released:
+                # Expired while held: another process may have overlapped this update
+                print(f"⚠️ Rule state lock for classroom {classroom_id} expired before release")
+
+    def _acquire(self, lock_key: str) -> bytes:
+        """SET NX with expiry, retried with backoff up to lock_timeout_sec; returns the owner token."""
+        token = uuid.uuid4().hex.encode()
+        expire_ms = max(1, int(self.lock_timeout_sec * 1000))
+        deadline = time.monotonic() + self.lock_timeout_sec
+        delay = _LOCK_RETRY_MIN_SEC
+        while not self._client.set(lock_key, token, nx=True, px=expire_ms):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Could not lock rule state ({lock_key})")
+            time.sleep(delay)
+            delay = min(delay * 2, _LOCK_RETRY_MAX_SEC)
+        return token
+
+    def _release(self, lock_key: str, token: bytes) -> bool:
+        """Delete the lock only if we still own it (WATCH/MULTI, no Lua needed). False if it had expired."""
+        from redis.exceptions import WatchError
+
+        with self._client.pipeline(transaction=True) as pipe:
+            try:
+                pipe.watch(lock_key)
+                if pipe.get(lock_key) != token:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.delete(lock_key)
+                pipe.execute()
+                return True
+            except WatchError:
+                # Expired and taken by someone else between GET and EXEC
+                return False
+
+    def _write_back(self, key: str, state: ClassroomState, scalars: dict, frames: tuple):
+        """Write fields changed since load (frames by identity, so untouched ones aren't re-encoded) in one transaction."""
+        after = state.scalar_fields()
+        fields = {name: value for name, value in after.items() if value != scalars[name]}
+        if state.prev_frame is not frames[0] or state.inference_ref is not frames[1]:
+            fields.update(state.frame_fields())
+        changed = {name: value for name, value in fields.items() if value is not None}
+        removed = [name for name, value in fields.items() if value is None]
+        pipe = self._client.pipeline(transaction=True)
+        if changed:
+            pipe.hset(key, mapping=changed)
+        if removed:
+            pipe.hdel(key, *removed)
+        if self.idle_ttl_sec > 0:
+            pipe.expire(key, max(1, int(self.idle_ttl_sec)))
+        pipe.execute()
+        if fields:
+            with self._metrics_lock:
+                self._writes += 1
+
+    def _classroom_keys(self) -> list:
+        return [k for k in self._client.scan_iter(match=f"{self._prefix}*", count=500)
+                if not k.endswith(b":lock")]
+
+    def items(self) -> list:
+        """Snapshot of all stored classrooms (unlocked reads; for reporting)."""
+        keys = self._classroom_keys()
+        pipe = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        prefix_len = len(self._prefix)
+        return [(key.decode()[prefix_len:], ClassroomState.from_fields(fields))
+                for key, fields in zip(keys, pipe.execute()) if fields]
+
+    def clear(self):
+        keys = self._classroom_keys()
+        if keys:
+            self._client.delete(*keys)
+
+    def stats(self) -> dict:
+        classrooms = len(self._classroom_keys())
+        with self._metrics_lock:
+            loads, writes, lost, wait_ms = self._loads, self._writes, self._lock_lost, self._lock_wait_ms
+        return {
+            "backend": self.name,
+            "classrooms": classrooms,
+            "idle_ttl_sec": self.idle_ttl_sec,
+            "lock_timeout_sec": self.lock_timeout_sec,
+            "loads": loads,
+            "writes": writes,
+            "locks_lost": lost,
+            "avg_lock_wait_ms": round(wait_ms / loads, 3) if loads else 0.0,
+        }
+
+
+STATE_BACKENDS = {
+    MemoryStateStore.name: MemoryStateStore,
+    RedisStateStore.name: RedisStateStore,
+}
+
+
+def create_state_store(name: str) -> StateStore:
+    """Create the named store from Config; raises if the backend or its client library is unavailable."""
+    if name == MemoryStateStore.name:
+        return MemoryStateStore(
+            stripes=Config.RULE_STATE_LOCK_STRIPES,
+            max_classrooms=Config.RULE_STATE_MAX_CLASSROOMS,
+            idle_ttl_sec=Config.RULE_STATE_IDLE_TTL_SEC,
+        )
+    if name == RedisStateStore.name:
+        return RedisStateStore(
+            Config.REDIS_URL,
+            idle_ttl_sec=Config.RULE_STATE_IDLE_TTL_SEC,
+            lock_timeout_sec=Config.RULE_STATE_LOCK_TIMEOUT_SEC,
+        )
+    raise ValueError(f"Unknown rule state backend: {name} (expected one of {', '.join(STATE_BACKENDS)})")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """Process-wide classroom state store (RULE_STATE_BACKEND), falling back to memory if it can't be created."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                name = Config.RULE_STATE_BACKEND
+                try:
+                    _store = create_state_store(name)
+                except Exception as e:
+                    if name == MemoryStateStore.name:
+                        raise
+                    print(f"⚠️ Rule state backend '{name}' unavailable ({e}); falling back to memory "
+                          "(streaks are per process)")
+                    _store = create_state_store(MemoryStateStore.name)
+    return _store
@@ -0,0 +1,54 @@
+"""Vectorized evaluation of the "N consecutive samples above a threshold" rules.
+
+Equivalent to feeding the samples one at a time through the per-sample rule
+(process_loud_noise_rule / process_mischief_rule):
+- outside cooldown, a sample above the threshold extends the streak, any other
+  sample resets it to 0;
+- when the streak reaches `count` an alert fires, the streak resets to 0 and
+  samples within `cooldown_sec` of the alert are ignored (they neither extend
+  nor reset the streak).
+
+Streak lengths are computed with a running maximum over the indices of the
+samples that break a streak, so the Python-level loop only runs once per
+alert instead of once per sample.
+"""
+import numpy as np
+
+
+def evaluate_streaks(timestamps, values, threshold: float, count: int, cooldown_sec: float,
+                     streak: int = 0, last_alert_time: float = None) -> tuple:
+    """
+    Run a batch of samples, in time order, through the consecutive-count rule.
+    :param timestamps: Sample times (epoch seconds), non-decreasing
+    :param values: Sample values (audio level, motion score, ...)
+    :param streak: Consecutive count carried in from earlier samples
+    :param last_alert_time: Time of the previous alert (cooldown), or None
+    :return: (alert indices into the batch, streak after the batch, last alert time)
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    high = np.asarray(values, dtype=np.float64) > threshold
+    n = len(high)
+    alerts = []
+    start = 0
+    while start < n:
+        if last_alert_time is not None:
+            # Skip the samples that fall inside the cooldown (same comparison as the per-sample rule)
+            start += int(np.searchsorted(timestamps[start:] - last_alert_time, cooldown_sec, side="left"))
+            if start >= n:
+                break
+        segment = high[start:]
+        index = np.arange(len(segment))
+        # Streak length ending at each sample: distance to the last sample that was not high
+        last_low = np.maximum.accumulate(np.where(segment, -1, index))
+        run = index - last_low
+        run[last_low < 0] += streak  # the leading streak continues the carried-in one
+        hits = np.flatnonzero(run >= count)
+        if len(hits) == 0:
+            streak = int(run[-1])
+            break
+        hit = start + int(hits[0])
+        alerts.append(hit)
+        last_alert_time = float(timestamps[hit])
+        streak = 0
+        start = hit + 1
+    return alerts, streak, last_alert_time
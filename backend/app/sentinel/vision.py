@@ -1,78 +1,82 @@
 """Vision detection: YOLOv8 person count."""
-import numpy as np
-
-# Patch torch.load for PyTorch 2.6+ compatibility with Ultralytics checkpoints
-# Official Ultralytics models are trusted, so weights_only=False is safe
-import torch
-_orig_torch_load = torch.load
-def _patched_torch_load(*args, **kwargs):
-    """Patch torch.load to use weights_only=False for Ultralytics checkpoints."""
-    kwargs.setdefault("weights_only", False)
-    return _orig_torch_load(*args, **kwargs)
-torch.load = _patched_torch_load
-
-# Lazy-load model on first use
-_model = None
-
-# COCO class index for "person"
-PERSON_CLASS_ID = 0
+import threading
+import time
 
+import numpy as np
 
-def _get_model():
-    """Load YOLOv8 model once (Ultralytics downloads on first run)."""
-    global _model
-    if _model is None:
-        from ultralytics import YOLO
-        _model = YOLO("yolov8n.pt")  # nano model for speed
-    return _model
+from app.config import Config
+from app.sentinel.backends import PERSON_CLASS_ID, get_backend
 
 
-def count_persons(image: np.ndarray) -> int:
+def count_persons(image: np.ndarray, imgsz: int = None) -> int:
     """
     Run YOLOv8 on image and return number of persons detected.
+    Uses the inference backend selected by Config.INFERENCE_BACKEND (app/sentinel/backends.py).
     :param image: BGR numpy array (e.g. from cv2.imdecode)
+    :param imgsz: Model input size (None = INFERENCE_IMGSZ)
     :return: Count of persons (class "person" in COCO)
     """
     if image is None or image.size == 0:
         return 0
-    model = _get_model()
-    results = model(image, verbose=False)
-    count = 0
-    for r in results:
-        if r.boxes is None:
-            continue
-        for cls in r.boxes.cls:
-            if int(cls) == PERSON_CLASS_ID:
-                count += 1
-    return count
+    return get_backend().count_persons_batch([image], imgsz=imgsz)[0]
+
+
+def count_persons_batch(images: list, imgsz: int = None) -> list:
+    """
+    Run one batched YOLOv8 forward pass over several images.
+    :param images: List of BGR numpy arrays (None/empty entries count as 0)
+    :param imgsz: Model input size (None = INFERENCE_IMGSZ)
+    :return: Person count per image, in the same order
+    """
+    return get_backend().count_persons_batch(images, imgsz=imgsz)
+
+
+def warm_up() -> float:
+    """
+    Load the inference backend and run one dummy inference plus a motion pass,
+    so the first real frame request doesn't pay for imports and model init.
+    :return: Seconds spent warming up
+    """
+    from app.sentinel.motion import prepare_motion_frame
+
+    start = time.perf_counter()
+    get_backend().warm_up()
+    prepare_motion_frame(np.zeros((360, 640, 3), dtype=np.uint8))
+    return time.perf_counter() - start
+
+
+def start_background_warmup() -> threading.Thread:
+    """Warm up vision in a daemon thread (for long-running servers).
+    With INFERENCE_WORKERS > 0 this starts the worker pool instead (each worker warms up its own model)."""
+    def _run():
+        try:
+            if Config.INFERENCE_WORKERS > 0:
+                from app.sentinel.worker_pool import start_worker_pool
+                start_worker_pool()
+                return
+            print(f"✅ Vision warm-up done in {warm_up():.1f}s")
+        except Exception as e:
+            print(f"⚠️ Vision warm-up failed: {e}")
+
+    thread = threading.Thread(target=_run, name="vision-warmup", daemon=True)
+    thread.start()
+    return thread
 
 
 def compute_motion_score(current_frame: np.ndarray, prev_frame: np.ndarray) -> float:
     """
     Compute motion intensity between two frames.
+    Full frames are reduced to compact grayscale references first (see app/sentinel/motion.py);
+    the pipeline keeps those references per classroom and calls motion_score() directly.
     :param current_frame: BGR numpy array (current frame)
     :param prev_frame: BGR numpy array (previous frame) or None
     :return: Motion score (0.0 to 1.0), higher = more motion
     """
     if prev_frame is None or current_frame is None:
         return 0.0
-    
+
     if current_frame.shape != prev_frame.shape:
         return 0.0
-    
-    import cv2
-    
-    # Convert to grayscale
-    gray_current = cv2.cvtColor(current_frame, cv2.COLOR_BGR2GRAY)
-    gray_prev = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-    
-    # Compute absolute difference
-    diff = cv2.absdiff(gray_current, gray_prev)
-    
-    # Compute motion score: sum of pixel differences normalized by image size
-    # Normalize to 0-1 range (max diff per pixel is 255)
-    total_diff = np.sum(diff)
-    max_possible_diff = diff.size * 255.0
-    motion_score = min(total_diff / max_possible_diff, 1.0) if max_possible_diff > 0 else 0.0
-    
-    return motion_score
+
+    from app.sentinel.motion import prepare_motion_frame, motion_score
+    return motion_score(prepare_motion_frame(current_frame), prepare_motion_frame(prev_frame))
@@ -0,0 +1,559 @@
+"""Multi-process inference pool: person counting outside the Flask process's GIL.
+
+INFERENCE_WORKERS processes each load their own inference backend (with
+INFERENCE_THREADS intra-op threads, or an even share of the CPUs) and can be
+pinned to CPU sets. Decoded frames are not pickled: the parent copies each
+frame into a slot of one shared-memory segment and sends only
+(slot, shape, dtype) to the worker, which runs inference on a view of the
+slot. Counts come back over a result queue and resolve the caller's future.
+
+Each worker owns max(SLOTS_PER_WORKER, max_batch) slots of the ring; a
+batch larger than that is split into several jobs, and a job takes all of
+its slots at once, so callers never hold part of the ring while waiting.
+
+Frames go to the live worker with the fewest outstanding jobs. A job that is
+not answered within RESULT_TIMEOUT_SEC (or whose future the caller cancels)
+is dropped and its slots go back to the ring, so a stuck worker cannot drain
+it; a late result for a dropped job is ignored. If a worker dies, its
+outstanding jobs fail and it is restarted after a backoff; a worker
+that exits before loading its model MAX_START_FAILURES times in a row (e.g. a
+missing model file) is given up on.
+
+The process-wide pool is started in the background (start_worker_pool, at
+server startup); until a worker is ready get_worker_pool returns None and
+frames are inferred in the calling process.
+"""
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+from app.config import Config
+from app.services.latency import LatencyWindow
+
+# Pool processes are named "<prefix><index>" (see is_worker_process)
+WORKER_NAME_PREFIX = "inference-worker-"
+
+# Upper bound on waiting for a free slot or a result (older jobs are dropped)
+RESULT_TIMEOUT_SEC = 30
+
+# How often the result listener checks for dead workers and expired jobs
+CHECK_INTERVAL_SEC = 1.0
+
+# Upper bound on a worker loading its model at start
+START_TIMEOUT_SEC = 300
+
+# Minimum shared-memory slots per worker (one frame being processed, one queued)
+SLOTS_PER_WORKER = 2
+
+# Restart delay after a worker exits: doubles per consecutive failed start, capped
+RESTART_BACKOFF_SEC = 1.0
+RESTART_BACKOFF_MAX_SEC = 60.0
+# Consecutive exits before the model was loaded after which a worker is not restarted
+MAX_START_FAILURES = 5
+
+_MSG_READY = "ready"
+_MSG_RESULT = "result"
+_MSG_ERROR = "error"
+
+
+def is_worker_process() -> bool:
+    """True inside a pool process (spawn re-imports the main module there; skip server startup work)."""
+    return mp.current_process().name.startswith(WORKER_NAME_PREFIX)
+
+
+def parse_cpu_sets(value: str, workers: int) -> list:
+    """
+    CPU sets per worker from INFERENCE_WORKER_CPUS.
+    "" = no pinning, "auto" = split the available CPUs evenly,
+    "0,1;2,3" = explicit sets separated by ";" (reused round-robin).
+    """
+    value = (value or "").strip()
+    if not value or workers <= 0:
+        return [None] * max(0, workers)
+    if value.lower() == "auto":
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        per_worker = max(1, len(cpus) // workers)
+        return [cpus[(i * per_worker) % len(cpus):(i * per_worker) % len(cpus) + per_worker] for i in range(workers)]
+    sets = [[int(c) for c in part.split(",") if c.strip()] for part in value.split(";") if part.strip()]
+    return [sets[i % len(sets)] for i in range(workers)]
+
+
+def _settle(future: Future, result=None, error: BaseException = None):
+    """Resolve a future unless the caller already cancelled it."""
+    if not future.set_running_or_notify_cancel():
+        return
+    if error is None:
+        future.set_result(result)
+    else:
+        future.set_exception(error)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to the parent's segment; the parent owns (and unlinks) it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Spawned children share the parent's resource tracker, which already tracks the name
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(index: int, shm_name: str, slot_bytes: int, tasks, results, threads: int, cpus):
+    """Pool process entry point: load a backend, then count persons in frames from shared memory."""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    # The pool is configured from the same environment; never nest pools
+    Config.INFERENCE_WORKERS = 0
+    Config.INFERENCE_THREADS = threads
+
+    shm = _attach_shared_memory(shm_name)
+    try:
+        from app.sentinel.backends import get_backend
+        backend = get_backend()
+        backend.warm_up()
+        results.put((_MSG_READY, index, None))
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            job_id, frames, imgsz = task
+            try:
+                results.put((_MSG_RESULT, job_id, _count_frames(backend, shm, slot_bytes, frames, imgsz)))
+            except Exception as e:
+                results.put((_MSG_ERROR, job_id, f"{type(e).__name__}: {e}"))
+    finally:
+        shm.close()
+
+
+def _count_frames(backend, shm, slot_bytes: int, frames: list, imgsz: int = None) -> list:
+    """Run inference on views of the shared-memory slots (views are released on return)."""
+    import numpy as np
+
+    images = [np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=slot * slot_bytes)
+              for slot, shape, dtype in frames]
+    return [int(c) for c in backend.count_persons_batch(images, imgsz=imgsz)]
+
+
+class _Worker:
+    __slots__ = ("index", "process", "tasks", "outstanding", "cpus", "ready", "start_failures", "restart_at",
+                 "failed")
+
+    def __init__(self, index: int, cpus):
+        self.index = index
+        self.cpus = cpus
+        self.process = None
+        self.tasks = None
+        self.outstanding = set()
+        self.ready = False
+        self.start_failures = 0  # consecutive exits before ready
+        self.restart_at = None  # monotonic time of the pending restart
+        self.failed = False  # given up after MAX_START_FAILURES
+
+
+class _Job:
+    __slots__ = ("future", "slots", "worker", "submitted_at")
+
+    def __init__(self, slots: list, worker: _Worker):
+        self.future = Future()
+        self.slots = slots
+        self.worker = worker
+        self.submitted_at = time.monotonic()
+
+
+class InferenceWorkerPool:
+    """N inference processes fed through a shared-memory slot ring."""
+
+    def __init__(self, workers: int, threads: int = None, cpu_sets: list = None,
+                 slot_bytes: int = 8 * 1024 * 1024, max_batch: int = 1):
+        """
+        :param workers: Number of processes
+        :param threads: Intra-op threads per process (None = CPUs / workers)
+        :param cpu_sets: Optional CPU list per worker for pinning
+        :param slot_bytes: Largest frame (bytes) handed over through shared memory
+        :param max_batch: Largest batch sent as one job (larger batches are split)
+        """
+        self.num_workers = max(1, int(workers))
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.slot_bytes = int(slot_bytes)
+        self.max_job_frames = max(SLOTS_PER_WORKER, int(max_batch or 1))
+        self._ctx = mp.get_context("spawn")
+        num_slots = self.num_workers * self.max_job_frames
+        self._shm = shared_memory.SharedMemory(create=True, size=num_slots * self.slot_bytes)
+        self._free_slots = list(range(num_slots))
+        self._slots_available = threading.Condition()
+        self._results = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._dropped = {}  # job id -> worker, for dropped jobs the worker may still answer
+        self._job_ids = itertools.count()
+        self._closed = False
+        self._ready = threading.Event()
+
+        # Metrics
+        self._frames = 0
+        self._jobs_done = 0
+        self._errors = 0
+        self._restarts = 0
+        self._slot_wait_ms = LatencyWindow()
+        self._latency_ms = LatencyWindow()
+
+        cpu_sets = cpu_sets or [None] * self.num_workers
+        self._workers = [_Worker(i, cpu_sets[i % len(cpu_sets)]) for i in range(self.num_workers)]
+        for worker in self._workers:
+            self._start_worker(worker)
+        self._listener = threading.Thread(target=self._listen, name="inference-pool-results", daemon=True)
+        self._listener.start()
+
+    def _start_worker(self, worker: _Worker):
+        worker.tasks = self._ctx.Queue()
+        worker.ready = False
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.index, self._shm.name, self.slot_bytes, worker.tasks, self._results,
+                  self.threads, worker.cpus),
+            name=f"{WORKER_NAME_PREFIX}{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+
+    def wait_ready(self, timeout: float = START_TIMEOUT_SEC) -> bool:
+        """Block until every worker has loaded its model (or been given up on).
+        True if at least one worker is ready."""
+        self._ready.wait(timeout)
+        return any(w.ready for w in self._workers)
+
+    def is_ready(self) -> bool:
+        """True while at least one worker has its model loaded."""
+        return any(w.ready for w in self._workers)
+
+    def all_failed(self) -> bool:
+        """True when every worker was given up on (see MAX_START_FAILURES)."""
+        return all(w.failed for w in self._workers)
+
+    def _update_ready(self):
+        """Set _ready once every worker is ready or given up on."""
+        if all(w.ready or w.failed for w in self._workers):
+            self._ready.set()
+
+    def _acquire_slots(self, n: int) -> list:
+        """Take n free slots at once (never a partial set), waiting up to RESULT_TIMEOUT_SEC."""
+        with self._slots_available:
+            if not self._slots_available.wait_for(lambda: len(self._free_slots) >= n or self._closed,
+                                                  timeout=RESULT_TIMEOUT_SEC):
+                raise TimeoutError(f"No {n} free shared-memory slots after {RESULT_TIMEOUT_SEC}s "
+                                   f"(inference workers busy or stalled)")
+            if self._closed:
+                raise RuntimeError("Inference worker pool is closed")
+            slots = self._free_slots[-n:]
+            del self._free_slots[-n:]
+            return slots
+
+    def _release_slots(self, slots: list):
+        with self._slots_available:
+            self._free_slots.extend(slots)
+            self._slots_available.notify_all()
+
+    def _submit_job(self, images: list, imgsz: int = None) -> Future:
+        """Copy up to max_job_frames non-empty images into shared memory and queue them as one job."""
+        import numpy as np
+
+        arrays = [np.ascontiguousarray(image) for image in images]
+        for image in arrays:
+            if image.nbytes > self.slot_bytes:
+                raise ValueError(f"Frame of {image.nbytes} bytes exceeds the shared-memory slot "
+                                 f"({self.slot_bytes} bytes, INFERENCE_WORKER_SLOT_MB)")
+        started = time.monotonic()
+        slots = self._acquire_slots(len(arrays))
+        self._slot_wait_ms.add((time.monotonic() - started) * 1000.0)
+        frames = []
+        try:
+            for slot, image in zip(slots, arrays):
+                view = np.ndarray(image.shape, dtype=image.dtype, buffer=self._shm.buf,
+                                  offset=slot * self.slot_bytes)
+                view[...] = image
+                frames.append((slot, image.shape, image.dtype.str))
+            with self._lock:
+                live = [w for w in self._workers if not w.failed and w.process.is_alive()]
+                if not live:
+                    raise RuntimeError("No inference worker available (all exited or restarting)")
+                worker = min(live, key=lambda w: len(w.outstanding))
+                job_id = next(self._job_ids)
+                job = _Job(slots, worker)
+                self._jobs[job_id] = job
+                worker.outstanding.add(job_id)
+        except BaseException:
+            self._release_slots(slots)
+            raise
+        # Cancelling the future (caller timeout) drops the job and frees its slots
+        job.future.add_done_callback(
+            lambda done: done.cancelled() and self._finish(job_id, error="Inference job cancelled", dropped=True))
+        worker.tasks.put((job_id, frames, imgsz))
+        return job.future
+
+    def submit_batch(self, images: list, imgsz: int = None) -> Future:
+        """Hand images to the least busy workers, max_job_frames per job; the future resolves to
+        their person counts (0 for None/empty images), in order."""
+        if self._closed:
+            raise RuntimeError("Inference worker pool is closed")
+        counts = [0] * len(images)
+        valid = [i for i, img in enumerate(images) if img is not None and img.size > 0]
+        if not valid:
+            future = Future()
+            future.set_result(counts)
+            return future
+
+        chunks = [valid[start:start + self.max_job_frames] for start in range(0, len(valid), self.max_job_frames)]
+        if len(chunks) == 1 and len(valid) == len(images):
+            return self._submit_job(images, imgsz)
+
+        # Several jobs and/or skipped images: gather the per-job counts into one result
+        outer = Future()
+        pending = [len(chunks)]
+        lock = threading.Lock()
+        jobs = []
+        outer.add_done_callback(lambda done: done.cancelled() and [job.cancel() for job in jobs])
+
+        def _gather(indices: list, done: Future):
+            if done.cancelled():
+                return
+            error = done.exception()
+            with lock:
+                if outer.done():
+                    return
+                if error is not None:
+                    _settle(outer, error=error)
+                    return
+                for i, count in zip(indices, done.result()):
+                    counts[i] = count
+                pending[0] -= 1
+                if pending[0] == 0:
+                    _settle(outer, counts)
+
+        for indices in chunks:
+            try:
+                job = self._submit_job([images[i] for i in indices], imgsz)
+            except BaseException as e:
+                with lock:
+                    if not outer.done():
+                        _settle(outer, error=e)
+                for job in jobs:
+                    job.cancel()  # the batch failed; free the slots of the jobs already queued
+                break
+            jobs.append(job)
+            job.add_done_callback(lambda done, indices=indices: _gather(indices, done))
+        return outer
+
+    def count_persons_batch(self, images: list, imgsz: int = None) -> list:
+        """Blocking batch helper; on timeout the batch's jobs are dropped (slots freed)."""
+        future = self.submit_batch(images, imgsz)
+        try:
+            return future.result(timeout=RESULT_TIMEOUT_SEC)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def count_persons(self, image, imgsz: int = None) -> int:
+        """Blocking single-frame helper."""
+        return self.count_persons_batch([image], imgsz)[0]
+
+    def _finish(self, job_id: int, counts: list = None, error: str = None, dropped: bool = False):
+        """Resolve a job and return its slots. A dropped job (timed out or cancelled) stays counted as
+        outstanding on its worker, so no new work is routed there, until the worker answers or exits."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                worker = self._dropped.pop(job_id, None)
+                if worker is not None:
+                    worker.outstanding.discard(job_id)
+                return
+            if dropped:
+                self._dropped[job_id] = job.worker
+            else:
+                job.worker.outstanding.discard(job_id)
+            if error is None:
+                self._jobs_done += 1
+                self._frames += len(job.slots)
+            else:
+                self._errors += 1
+        self._release_slots(job.slots)
+        self._latency_ms.add((time.monotonic() - job.submitted_at) * 1000.0)
+        _settle(job.future, counts, RuntimeError(error) if error is not None else None)
+
+    def _listen(self):
+        """Resolve futures from worker results; every CHECK_INTERVAL_SEC, restart dead workers
+        and drop expired jobs."""
+        next_check = time.monotonic() + CHECK_INTERVAL_SEC
+        while not self._closed:
+            try:
+                kind, key, payload = self._results.get(timeout=CHECK_INTERVAL_SEC)
+            except queue.Empty:
+                kind = None
+            except (EOFError, OSError):
+                return
+            if kind == _MSG_READY:
+                worker = self._workers[key]
+                worker.ready = True
+                worker.start_failures = 0
+                self._update_ready()
+            elif kind == _MSG_RESULT:
+                self._finish(key, counts=payload)
+            elif kind == _MSG_ERROR:
+                self._finish(key, error=payload)
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                self._expire_jobs()
+                next_check = time.monotonic() + CHECK_INTERVAL_SEC
+
+    def _expire_jobs(self):
+        """Fail jobs unanswered for RESULT_TIMEOUT_SEC (stuck worker) so their slots return to the ring."""
+        deadline = time.monotonic() - RESULT_TIMEOUT_SEC
+        with self._lock:
+            expired = [(job_id, job.worker.index) for job_id, job in self._jobs.items()
+                       if job.submitted_at < deadline]
+        for job_id, index in expired:
+            self._finish(job_id, error=f"Inference worker {index} did not answer within {RESULT_TIMEOUT_SEC}s",
+                         dropped=True)
+
+    def _check_workers(self):
+        """Fail the jobs of exited workers and restart them with exponential backoff; give up on a
+        worker after MAX_START_FAILURES consecutive exits before its model loaded."""
+        now = time.monotonic()
+        for worker in self._workers:
+            if self._closed or worker.failed or worker.process.is_alive():
+                continue
+            if worker.restart_at is not None:
+                if now >= worker.restart_at:
+                    worker.restart_at = None
+                    with self._lock:
+                        self._restarts += 1
+                    self._start_worker(worker)
+                continue
+            with self._lock:
+                lost = list(worker.outstanding)
+            for job_id in lost:
+                self._finish(job_id, error=f"Inference worker {worker.index} exited")
+            if not worker.ready:
+                worker.start_failures += 1
+            if worker.start_failures >= MAX_START_FAILURES:
+                worker.failed = True
+                print(f"❌ Inference worker {worker.index} exited before loading its model "
+                      f"{worker.start_failures} times in a row (code {worker.process.exitcode}), not restarting")
+                self._update_ready()
+                continue
+            worker.ready = False
+            delay = min(RESTART_BACKOFF_MAX_SEC, RESTART_BACKOFF_SEC * 2 ** max(0, worker.start_failures - 1))
+            worker.restart_at = now + delay
+            print(f"⚠️ Inference worker {worker.index} exited (code {worker.process.exitcode}), "
+                  f"restarting in {delay:.0f}s")
+
+    def close(self):
+        """Stop the workers and release the shared-memory segment."""
+        if self._closed:
+            return
+        self._closed = True
+        with self._slots_available:
+            self._slots_available.notify_all()
+        for worker in self._workers:
+            try:
+                worker.tasks.put(None)
+            except Exception:
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        with self._lock:
+            pending = list(self._jobs)
+        for job_id in pending:
+            self._finish(job_id, error="Inference worker pool closed")
+        self._shm.close()
+        self._shm.unlink()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": True,
+                "workers": self.num_workers,
+                "threads_per_worker": self.threads,
+                "cpu_sets": [w.cpus for w in self._workers],
+                "alive": sum(1 for w in self._workers if w.process.is_alive()),
+                "ready": sum(1 for w in self._workers if w.ready),
+                "failed": sum(1 for w in self._workers if w.failed),
+                "max_job_frames": self.max_job_frames,
+                "outstanding_jobs": {str(w.index): len(w.outstanding) for w in self._workers},
+                "free_slots": len(self._free_slots),
+                "jobs": self._jobs_done,
+                "frames": self._frames,
+                "errors": self._errors,
+                "restarts": self._restarts,
+                "slot_wait_ms": self._slot_wait_ms.summary(),
+                "job_latency_ms": self._latency_ms.summary(),
+            }
+
+
+_pool = None
+_pool_failed = False
+_pool_lock = threading.Lock()
+
+
+def start_worker_pool():
+    """Create the process-wide pool (once, when INFERENCE_WORKERS > 0) and wait for its workers
+    in a daemon thread; call at server startup so the models load before the first frame."""
+    global _pool
+    if Config.INFERENCE_WORKERS <= 0 or is_worker_process() or _pool_failed or _pool is not None:
+        return
+    with _pool_lock:
+        if _pool is not None or _pool_failed:
+            return
+        pool = InferenceWorkerPool(
+            Config.INFERENCE_WORKERS,
+            threads=Config.INFERENCE_THREADS or None,
+            cpu_sets=parse_cpu_sets(Config.INFERENCE_WORKER_CPUS, Config.INFERENCE_WORKERS),
+            slot_bytes=int(Config.INFERENCE_WORKER_SLOT_MB * 1024 * 1024),
+            max_batch=Config.INFERENCE_BATCH_MAX_SIZE,
+        )
+        atexit.register(pool.close)
+        _pool = pool
+    threading.Thread(target=_await_pool, args=(pool,), name="inference-pool-start", daemon=True).start()
+
+
+def _await_pool(pool: InferenceWorkerPool):
+    """Log when the pool is ready; close it if no worker can load the model."""
+    global _pool, _pool_failed
+    if pool.wait_ready():
+        print(f"✅ Inference worker pool ready: {pool.num_workers} workers x {pool.threads} threads")
+    elif pool.all_failed():
+        print("❌ Inference worker pool: no worker could load the model, inferring in this process")
+        _pool_failed = True
+        _pool = None
+        pool.close()
+    else:
+        print("⚠️ Inference worker pool: workers still loading after "
+              f"{START_TIMEOUT_SEC}s, inferring in this process until one is ready")
+
+
+def get_worker_pool() -> InferenceWorkerPool | None:
+    """
+    Process-wide worker pool once a worker is ready, else None (infer in this process).
+    Never blocks: the first call starts the pool (see start_worker_pool) and returns None
+    while the models load. Also None when INFERENCE_WORKERS=0 or no worker could load the model.
+    """
+    if Config.INFERENCE_WORKERS <= 0 or is_worker_process() or _pool_failed:
+        return None
+    pool = _pool
+    if pool is None:
+        start_worker_pool()
+        return None
+    return pool if pool.is_ready() else None
+
+
+def worker_pool_stats() -> dict:
+    """Pool metrics, or a disabled marker."""
+    if _pool is None:
+        return {"enabled": Config.INFERENCE_WORKERS > 0, "workers": 0}
+    return _pool.stats()
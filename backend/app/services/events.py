@@ -0,0 +1,122 @@
+"""In-process event broker for the push channel (GET /api/events, Server-Sent Events).
+
+Rules publish alerts and classroom status changes here. Each event is
+serialized once into its SSE frame and kept in a bounded ring buffer;
+every subscriber reads the same frames, so one event reaches N dashboards
+without N database queries. Subscribers resume from Last-Event-ID by
+replaying the buffer.
+
+Fan-out is per process: with several workers, run the event stream on a
+single worker (or put a shared broker in front).
+"""
+import json
+import threading
+import time
+from collections import deque
+
+# Events kept for Last-Event-ID catch-up
+EVENT_HISTORY_SIZE = 1000
+
+# Comment line sent when no event arrived for this long (keeps proxies from closing the stream)
+HEARTBEAT_SEC = 15
+
+# Client reconnect delay advertised in the stream
+RETRY_MS = 3000
+
+EVENT_ALERT = "alert"
+EVENT_CLASSROOM_STATUS = "classroom_status"
+
+
+class EventBroker:
+    """Bounded, in-memory event log with blocking reads for stream subscribers."""
+
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE):
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=history_size)  # (event_id, event_type, sse_frame)
+        # Millisecond-based start keeps ids increasing across restarts, so a stale
+        # Last-Event-ID from a previous process never hides new events
+        self._last_id = int(time.time() * 1000)
+        self._published = 0
+        self._subscribers = 0
+
+    def publish(self, event_type: str, data: dict) -> int:
+        """Append an event and wake all subscribers. Returns the event id."""
+        payload = json.dumps(data, default=str)
+        with self._cond:
+            self._last_id += 1
+            event_id = self._last_id
+            frame = f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+            self._events.append((event_id, event_type, frame))
+            self._published += 1
+            self._cond.notify_all()
+        return event_id
+
+    def _events_after(self, last_id: int) -> list:
+        """Buffered events newer than last_id (caller holds the condition)."""
+        if not self._events or self._events[-1][0] <= last_id:
+            return []
+        return [e for e in self._events if e[0] > last_id]
+
+    def wait_for_events(self, last_id: int, timeout: float) -> list:
+        """Block until events newer than last_id exist (or timeout); return them."""
+        with self._cond:
+            events = self._events_after(last_id)
+            if not events:
+                self._cond.wait(timeout)
+                events = self._events_after(last_id)
+            return events
+
+    def latest_id(self) -> int:
+        with self._cond:
+            return self._last_id
+
+    def stream(self, last_event_id: int = None, event_types: set = None):
+        """
+        Generator of SSE text chunks for one subscriber.
+        :param last_event_id: Resume after this id (replays buffered events); None = only new events
+        :param event_types: Optional set of event types to forward
+        """
+        with self._cond:
+            self._subscribers += 1
+            oldest = self._events[0][0] if self._events else None
+            cursor = self._last_id if last_event_id is None else last_event_id
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            if last_event_id is not None and oldest is not None and last_event_id < oldest - 1:
+                # Gap larger than the buffer: tell the client to refetch via the REST API
+                yield "event: resync\ndata: {}\n\n"
+            while True:
+                events = self.wait_for_events(cursor, HEARTBEAT_SEC)
+                if not events:
+                    yield ": keep-alive\n\n"
+                    continue
+                cursor = events[-1][0]
+                chunk = "".join(frame for _, event_type, frame in events
+                                if event_types is None or event_type in event_types)
+                if chunk:
+                    yield chunk
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "subscribers": self._subscribers,
+                "published": self._published,
+                "buffered": len(self._events),
+                "last_event_id": self._last_id,
+            }
+
+
+_broker = EventBroker()
+
+
+def get_broker() -> EventBroker:
+    """Process-wide event broker."""
+    return _broker
+
+
+def publish_event(event_type: str, data: dict) -> int:
+    """Publish an event to all stream subscribers of this process."""
+    return _broker.publish(event_type, data)
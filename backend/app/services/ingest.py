@@ -0,0 +1,330 @@
+"""Server-side ingestion: pull frames from video files / stream URLs and analyze them.
+
+One worker thread per classroom keeps a long-lived StreamCapture open,
+samples it at INGEST_SAMPLE_FPS and feeds the same pipeline as the frame
+upload routes (app.sentinel.pipeline.analyze_image). When analysis takes
+longer than the sample interval, missed samples are dropped (counted), not
+queued, so a slow model never builds a backlog.
+
+Sources come from INGEST_SOURCES ("<classroom_id>=<file or URL>,...", or "db"
+for the video assigned to each classroom) or from POST /api/ingest. Needs a
+long-running server (not Vercel). Only INGEST_SOURCES entries may name any
+stream URL; API and "db" sources are limited to mock-media files and the hosts
+in INGEST_ALLOWED_HOSTS. INGEST_SOURCES are started by one server
+process per host: the one that takes the INGEST_LOCK_FILE lock (with several
+gunicorn workers, or the ASGI app's Flask fallback, the others skip them).
+"""
+import atexit
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from app.config import Config
+from app.services.latency import LatencyWindow
+
+# Wait before reopening a source that failed or ended
+RECONNECT_SEC = 5.0
+
+# URL schemes accepted for stream sources
+STREAM_SCHEMES = ("rtsp://", "rtsps://", "rtmp://", "http://", "https://")
+
+
+class IngestWorker:
+    """Samples one source for one classroom on a background thread."""
+
+    def __init__(self, classroom_id: str, source: str, sample_fps: float, frame_width: int = None):
+        self.classroom_id = classroom_id
+        self.source = source
+        self.sample_fps = sample_fps
+        self.frame_width = frame_width
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"ingest-{classroom_id}", daemon=True)
+        self._capture = None
+
+        # Metrics
+        self._lock = threading.Lock()
+        self._samples = 0
+        self._dropped = 0
+        self._reconnects = 0
+        self._last_error = None
+        self._last_result = None
+        self._read_ms = LatencyWindow(256)
+        self._analyze_ms = LatencyWindow(256)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def _run(self):
+        # Heavy imports stay off the API import path (see app/sentinel/vision.py)
+        from app.services.video_frames import StreamCapture
+        from app.sentinel.pipeline import analyze_image
+
+        interval = 1.0 / self.sample_fps
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                if self._capture is None:
+                    self._capture = StreamCapture(self.source, width=self.frame_width)
+                    self._capture.open()
+                started = time.monotonic()
+                frame = self._capture.read()
+                read_done = time.monotonic()
+                if frame is None:
+                    raise IOError(f"Source ended or failed: {self.source}")
+                result = analyze_image(self.classroom_id, frame)
+                done = time.monotonic()
+                self._read_ms.add((read_done - started) * 1000.0)
+                self._analyze_ms.add((done - read_done) * 1000.0)
+                with self._lock:
+                    self._samples += 1
+                    self._last_result = result
+                    self._last_error = None
+            except Exception as e:
+                print(f"⚠️ Ingest {self.classroom_id} ({self.source}): {e}")
+                with self._lock:
+                    self._last_error = str(e)
+                    self._reconnects += 1
+                self._close_capture()
+                self._stop.wait(RECONNECT_SEC)
+                next_tick = time.monotonic()
+                continue
+
+            next_tick += interval
+            now = time.monotonic()
+            if now > next_tick:
+                # Fell behind: skip the missed samples instead of catching up
+                missed = int((now - next_tick) / interval) + 1
+                next_tick += missed * interval
+                with self._lock:
+                    self._dropped += missed
+            self._stop.wait(next_tick - now)
+        self._close_capture()
+
+    def _close_capture(self):
+        if self._capture is not None:
+            try:
+                self._capture.close()
+            except Exception:
+                pass
+            self._capture = None
+
+    def stats(self) -> dict:
+        capture = self._capture
+        with self._lock:
+            return {
+                "classroom_id": self.classroom_id,
+                "source": self.source,
+                "sample_fps": self.sample_fps,
+                "running": self.running,
+                "samples_analyzed": self._samples,
+                "samples_dropped": self._dropped,
+                "source_frames_skipped": capture.frames_skipped if capture else 0,
+                "reconnects": self._reconnects,
+                "last_error": self._last_error,
+                "last_result": self._last_result,
+                "read_latency_ms": self._read_ms.summary(),
+                "analyze_latency_ms": self._analyze_ms.summary(),
+            }
+
+
+class IngestManager:
+    """Process-wide set of ingest workers, at most one per classroom."""
+
+    def __init__(self):
+        self._workers = {}
+        self._lock = threading.Lock()
+
+    def start(self, classroom_id: str, source: str, sample_fps: float = None) -> IngestWorker:
+        """Start (or restart) ingestion for a classroom."""
+        sample_fps = sample_fps or Config.INGEST_SAMPLE_FPS
+        if sample_fps <= 0:
+            raise ValueError("sample_fps must be > 0")
+        worker = IngestWorker(classroom_id, source, sample_fps, Config.INGEST_FRAME_WIDTH or None)
+        with self._lock:
+            previous = self._workers.pop(classroom_id, None)
+            self._workers[classroom_id] = worker
+        if previous is not None:
+            previous.stop()
+        worker.start()
+        print(f"✅ Ingest started: classroom {classroom_id} <- {source} @ {sample_fps:g} fps")
+        return worker
+
+    def stop(self, classroom_id: str) -> bool:
+        """Stop ingestion for a classroom. Returns False if none was running."""
+        with self._lock:
+            worker = self._workers.pop(classroom_id, None)
+        if worker is None:
+            return False
+        worker.stop()
+        return True
+
+    def stop_all(self):
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.stop(timeout=2.0)
+
+    def classroom_ids(self) -> list:
+        with self._lock:
+            return list(self._workers)
+
+    def stats(self) -> list:
+        with self._lock:
+            workers = list(self._workers.values())
+        return [w.stats() for w in workers]
+
+
+_manager = None
+_manager_lock = threading.Lock()
+_leader_lock = None
+_configured_started = False
+
+
+def get_ingest_manager() -> IngestManager:
+    """Process-wide ingest manager."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = IngestManager()
+                atexit.register(_manager.stop_all)
+    return _manager
+
+
+def resolve_source(source: str, trusted: bool = False) -> str:
+    """
+    Turn a source into something cv2.VideoCapture can open.
+    - Stream URLs (rtsp/rtmp/http/https) are used as-is; unless trusted, only for
+      hosts in INGEST_ALLOWED_HOSTS.
+    - Other values are files in MOCK_MEDIA_DIR; with trusted=True (INGEST_SOURCES)
+      absolute paths elsewhere are allowed too.
+    Raises ValueError for unsupported, disallowed or missing sources.
+    """
+    source = (source or "").strip()
+    if not source:
+        raise ValueError("source is required")
+    if "://" in source:
+        if not source.lower().startswith(STREAM_SCHEMES):
+            raise ValueError(f"Unsupported stream URL scheme: {source}")
+        if not trusted:
+            try:
+                host = (urlsplit(source).hostname or "").lower()
+            except ValueError:
+                host = ""
+            if host not in Config.INGEST_ALLOWED_HOSTS:
+                raise ValueError("Stream host is not in INGEST_ALLOWED_HOSTS")
+        return source
+    media_dir = os.path.realpath(Config.MOCK_MEDIA_DIR)
+    if source.startswith("/mock-media/"):
+        source = source[len("/mock-media/"):]
+    path = os.path.realpath(os.path.join(media_dir, source))
+    if not trusted and os.path.commonpath([media_dir, path]) != media_dir:
+        raise ValueError("File sources must be inside the mock-media directory")
+    if not os.path.isfile(path):
+        raise ValueError(f"Video file not found: {source}")
+    return path
+
+
+def _db_sources() -> list:
+    """(classroom_id, source) from the videos collection: first video per classroom, like the dashboard."""
+    from app.db.store import get_all_videos
+    sources = {}
+    for video in get_all_videos():
+        classroom_id = video.get("classroom_id")
+        if not classroom_id or classroom_id in sources:
+            continue
+        for candidate in (video.get("filename"), video.get("url")):
+            try:
+                sources[classroom_id] = resolve_source(candidate or "")
+                break
+            except ValueError:
+                continue
+        else:
+            print(f"⚠️ Ingest: no usable source for video {video.get('id')} (classroom {classroom_id})")
+    return list(sources.items())
+
+
+def parse_sources(value: str) -> list:
+    """Parse INGEST_SOURCES ("<classroom_id>=<file or URL>,...") into (classroom_id, source) pairs."""
+    pairs = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        classroom_id, sep, source = item.partition("=")
+        if not sep or not classroom_id.strip():
+            raise ValueError(f"Invalid INGEST_SOURCES entry (expected id=source): {item}")
+        pairs.append((classroom_id.strip(), resolve_source(source, trusted=True)))
+    return pairs
+
+
+def start_configured_sources():
+    """Start workers for INGEST_SOURCES (called at app startup)."""
+    value = Config.INGEST_SOURCES.strip()
+    if not value:
+        return
+    try:
+        pairs = _db_sources() if value.lower() == "db" else parse_sources(value)
+    except Exception as e:
+        print(f"❌ Ingest: could not load sources: {e}")
+        return
+    manager = get_ingest_manager()
+    for classroom_id, source in pairs:
+        manager.start(classroom_id, source)
+
+
+def acquire_ingest_leader() -> bool:
+    """Take the host-wide INGEST_LOCK_FILE lock (non-blocking flock, held until the process exits).
+    True if this process holds it; False (logged) if another process does or the file cannot be opened."""
+    global _leader_lock
+    if _leader_lock is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:
+        # No flock (Windows): assume a single server process
+        _leader_lock = True
+        return True
+    try:
+        handle = open(Config.INGEST_LOCK_FILE, "a")
+    except OSError as e:
+        print(f"❌ Ingest: cannot open lock file {Config.INGEST_LOCK_FILE!r}, INGEST_SOURCES not started: {e}")
+        return False
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        print(f"⚠️ Ingest: INGEST_SOURCES run by another server process ({Config.INGEST_LOCK_FILE}), skipped here")
+        return False
+    _leader_lock = handle
+    return True
+
+
+def start_configured_sources_async():
+    """Start configured sources on a background thread (the "db" lookup may block on MongoDB), once per
+    process and only in the process holding the ingest lock."""
+    global _configured_started
+    with _manager_lock:
+        if _configured_started:
+            return
+        _configured_started = True
+    if not acquire_ingest_leader():
+        return
+    threading.Thread(target=start_configured_sources, name="ingest-startup", daemon=True).start()
+
+
+def ingest_stats() -> dict:
+    """Summary of running ingest workers."""
+    if _manager is None:
+        return {"workers": 0, "classroom_ids": []}
+    return {"workers": len(_manager.classroom_ids()), "classroom_ids": _manager.classroom_ids()}
@@ -0,0 +1,36 @@
+"""Latency sample windows and percentile summaries for runtime stats."""
+import threading
+from collections import deque
+
+# Number of recent samples kept per window
+DEFAULT_WINDOW = 2048
+
+
+def percentiles(samples) -> dict:
+    """Return p50/p95/p99/max of a list of samples (rounded to 3 decimals)."""
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+
+    def pick(q):
+        return round(ordered[min(last, int(q * len(ordered)))], 3)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[last], 3)}
+
+
+class LatencyWindow:
+    """Thread-safe window of the most recent samples (e.g. milliseconds)."""
+
+    def __init__(self, size: int = DEFAULT_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, value: float):
+        with self._lock:
+            self._samples.append(value)
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+        return percentiles(samples)
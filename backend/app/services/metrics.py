@@ -0,0 +1,207 @@
+"""Prometheus metrics for the frame/audio hot path (GET /metrics, text format 0.0.4).
+
+- Stage histograms (sentinel_stage_duration_seconds{stage=...}): JSON parse,
+  base64 decode, image decode, motion reference, inference, motion score,
+  rule-state lock wait, rules, MongoDB writes.
+- Model inference (sentinel_inference_duration_seconds / _batch_size{backend=...}),
+  recorded where the model runs: in worker processes when INFERENCE_WORKERS > 0,
+  so those show up in each worker, not here; the "inference" stage still
+  measures the round trip.
+- Counters per classroom: frames analyzed, inferences skipped, audio samples,
+  alerts by type.
+
+Disabled with METRICS_ENABLED=false: every recording function returns on its
+first line and stage_timer() hands back a shared no-op context manager.
+No client library needed.
+"""
+import bisect
+import threading
+import time
+from contextlib import nullcontext
+
+from app.config import Config
+
+# Stage names (label values of sentinel_stage_duration_seconds)
+STAGE_JSON_PARSE = "json_parse"
+STAGE_BASE64_DECODE = "base64_decode"
+STAGE_IMAGE_DECODE = "image_decode"
+STAGE_MOTION_PREPARE = "motion_prepare"
+STAGE_INFERENCE = "inference"
+STAGE_MOTION_SCORE = "motion_score"
+STAGE_LOCK_WAIT = "lock_wait"
+STAGE_RULES = "rules"
+STAGE_DB_WRITE = "db_write"
+
+# Histogram buckets in seconds (sub-millisecond stages up to multi-second inference batches)
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+_NULL_TIMER = nullcontext()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels (name ends in _total)."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = STAGE_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._series.items())
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("sentinel_stage_duration_seconds", "Time spent per hot-path stage", ("stage",))
+INFERENCE_SECONDS = Histogram("sentinel_inference_duration_seconds", "Model forward pass time per batch", ("backend",))
+INFERENCE_BATCH_SIZE = Histogram("sentinel_inference_batch_size", "Frames per model forward pass", ("backend",),
+                                 buckets=BATCH_SIZE_BUCKETS)
+FRAMES = Counter("sentinel_frames_analyzed_total", "Frames analyzed", ("classroom_id",))
+FRAMES_SKIPPED = Counter("sentinel_inference_skipped_total", "Frames whose person count was reused (skip gate)",
+                         ("classroom_id",))
+AUDIO_SAMPLES = Counter("sentinel_audio_samples_total", "Audio level samples evaluated", ("classroom_id",))
+ALERTS = Counter("sentinel_alerts_total", "Alerts created", ("classroom_id", "type"))
+
+_METRICS = (STAGE_SECONDS, INFERENCE_SECONDS, INFERENCE_BATCH_SIZE, FRAMES, FRAMES_SKIPPED, AUDIO_SAMPLES, ALERTS)
+
+
+def enabled() -> bool:
+    return Config.METRICS_ENABLED
+
+
+class _StageTimer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, self.stage)
+        return False
+
+
+def stage_timer(stage: str):
+    """Context manager timing one stage (a shared no-op when metrics are disabled)."""
+    if not Config.METRICS_ENABLED:
+        return _NULL_TIMER
+    return _StageTimer(stage)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage duration measured by the caller."""
+    if not Config.METRICS_ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, stage)
+
+
+def observe_inference(backend: str, batch_size: int, seconds: float):
+    """Record one model forward pass."""
+    if not Config.METRICS_ENABLED:
+        return
+    INFERENCE_SECONDS.observe(seconds, backend)
+    INFERENCE_BATCH_SIZE.observe(batch_size, backend)
+
+
+def count_frame(classroom_id: str, skipped: bool = False):
+    if not Config.METRICS_ENABLED:
+        return
+    FRAMES.inc(classroom_id)
+    if skipped:
+        FRAMES_SKIPPED.inc(classroom_id)
+
+
+def count_audio_samples(classroom_id: str, samples: int = 1):
+    if not Config.METRICS_ENABLED:
+        return
+    AUDIO_SAMPLES.inc(classroom_id, amount=samples)
+
+
+def count_alert(classroom_id: str, alert_type: str):
+    if not Config.METRICS_ENABLED:
+        return
+    ALERTS.inc(classroom_id, alert_type)
+
+
+def render(gauges: list = ()) -> str:
+    """
+    Prometheus text exposition of all metrics.
+    :param gauges: Extra (name, help, value) gauges sampled at scrape time
+    """
+    lines = []
+    for metric in _METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    for name, help_text, value in gauges:
+        if value is None:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -1,27 +1,255 @@
-"""Report generation utilities - will be implemented in Step 9.
-This module will generate PDF reports from alert data.
+"""Report generation: alert summaries and exports per classroom and time range.
+
+Summaries are read from the pre-aggregated alert rollups (app/db/rollups.py),
+so a report over a term costs a few hundred small documents, not the alert
+history. generate_session_summary() shapes the same summary from an in-memory
+list of alerts.
+
+Exports (export_report) stream raw alerts or daily counts as CSV, NDJSON or a
+text PDF straight from a Mongo cursor, in chunks of REPORT_EXPORT_CHUNK_BYTES,
+so memory does not grow with the range.
 """
-from typing import Dict, List, Any
+import csv
+import io
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Any
+
+from app.config import Config
+from app.db.rollups import compacted_dates, floor_time, iter_rollups, rollup_counts, rollup_series
+from app.db.schema import ALERT_TYPES
+from app.db.store import iter_alerts
+from app.services.report_pdf import stream_text_pdf
+
+# Report series bucket sizes (?interval=)
+SERIES_INTERVALS = ("hour", "day")
+_INTERVAL_STEPS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}
+# Default report range when ?from= is missing
+DEFAULT_REPORT_RANGE = timedelta(days=1)
+
+
+def _iso(when: datetime) -> str:
+    return when.isoformat(timespec="microseconds") + "Z"
+
+
+def parse_report_time(value: str, name: str) -> datetime:
+    """ISO 8601 date or timestamp ("2026-01-31", "2026-01-31T08:00:00Z", with offset) -> naive UTC datetime."""
+    try:
+        when = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid '{name}': expected an ISO 8601 date or timestamp")
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
+
+
+def report_range(from_value: str = None, to_value: str = None, now: datetime = None):
+    """
+    Parse a report's [from, to) query bounds.
+    :param from_value: Start (default: to - DEFAULT_REPORT_RANGE)
+    :param to_value: End, exclusive (default: now)
+    :return: (start, end) naive UTC datetimes
+    """
+    end = parse_report_time(to_value, "to") if to_value else (now or datetime.utcnow())
+    start = parse_report_time(from_value, "from") if from_value else end - DEFAULT_REPORT_RANGE
+    if start >= end:
+        raise ValueError("'from' must be before 'to'")
+    return start, end
+
+
+def summarize_counts(classroom_id: str, alert_counts: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Summary dict from alert counts per type.
+    :param classroom_id: Classroom ID (None = all classrooms)
+    :param alert_counts: {alert type: count}
+    :return: Summary dict with total and per-type counts
+    """
+    total = sum(alert_counts.values())
+    return {
+        "classroom_id": classroom_id,
+        "total_alerts": total,
+        "alert_counts": alert_counts,
+        "session_summary": f"{total} alerts: {', '.join(f'{count} {atype}' for atype, count in alert_counts.items())}",
+    }
 
 
 def generate_session_summary(classroom_id: str, alerts: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Generate a session summary from alerts for a classroom.
-    This will be fully implemented in Step 9.
-    
+
     :param classroom_id: Classroom ID
     :param alerts: List of alert documents
-    :return: Summary dict with counts, engagement score, etc.
+    :return: Summary dict with counts
     """
-    # Placeholder - will be implemented in Step 9
     alert_counts = {}
     for alert in alerts:
         alert_type = alert.get("type", "unknown")
         alert_counts[alert_type] = alert_counts.get(alert_type, 0) + 1
-    
-    return {
-        "classroom_id": classroom_id,
-        "total_alerts": len(alerts),
-        "alert_counts": alert_counts,
-        "session_summary": f"{len(alerts)} alerts: {', '.join(f'{count} {atype}' for atype, count in alert_counts.items())}",
-    }
+    return summarize_counts(classroom_id, alert_counts)
+
+
+def _resolution(classroom_id: str, start: datetime, end: datetime, now: datetime) -> str:
+    """Finest rollup available for [start, end): minute rollups expire (TTL), and a compacted day may
+    only have its day bucket (see rebuild_rollups), so a bound inside one widens the range to whole days."""
+    partial = [when.strftime("%Y-%m-%d") for when in (start, end) if floor_time(when, "day") != when]
+    if partial and compacted_dates(classroom_id, partial):
+        return "day"
+    retention = Config.ALERT_ROLLUP_MINUTE_RETENTION_DAYS
+    if retention <= 0 or start >= now - timedelta(days=retention):
+        return "minute"
+    return "hour"
+
+
+def build_summary(classroom_id: str, start: datetime, end: datetime, interval: str = None,
+                  now: datetime = None) -> Dict[str, Any]:
+    """
+    Alert summary for [start, end) from the rollups. Bounds are widened to whole minutes
+    (whole hours once minute rollups have expired, whole days inside a compacted day);
+    the effective range is returned.
+    :param classroom_id: One classroom, or None for all
+    :param interval: Optional "hour" or "day": add a per-bucket series
+    :return: summarize_counts() + from, to, resolution, per-classroom counts and series
+    """
+    if interval is not None and interval not in SERIES_INTERVALS:
+        raise ValueError(f"'interval' must be one of: {', '.join(SERIES_INTERVALS)}")
+    resolution = _resolution(classroom_id, start, end, now or datetime.utcnow())
+    start = floor_time(start, resolution)
+    end_floor = floor_time(end, resolution)
+    end = end_floor if end_floor == end else end_floor + _INTERVAL_STEPS[resolution]
+    if interval is not None:
+        points = (end - floor_time(start, interval)) / _INTERVAL_STEPS[interval]
+        if points > Config.REPORT_MAX_SERIES_POINTS:
+            raise ValueError(f"Range too long for interval '{interval}' "
+                             f"(max {Config.REPORT_MAX_SERIES_POINTS} points); use a coarser interval")
+
+    by_classroom = rollup_counts(classroom_id, start, end)
+    totals = {}
+    for counts in by_classroom.values():
+        for alert_type, n in counts.items():
+            totals[alert_type] = totals.get(alert_type, 0) + n
+
+    summary = summarize_counts(classroom_id, totals)
+    summary.update({
+        "from": _iso(start),
+        "to": _iso(end),
+        "resolution": resolution,
+        "classrooms": {cid: {"total_alerts": sum(counts.values()), "alert_counts": counts}
+                       for cid, counts in by_classroom.items()},
+    })
+    if interval is not None:
+        summary["interval"] = interval
+        summary["series"] = [{"start": _iso(point["start"]), "total_alerts": sum(point["counts"].values()),
+                              "alert_counts": point["counts"]}
+                             for point in rollup_series(classroom_id, start, end, interval)]
+    return summary
+
+
+# Export formats (?format=) and their content types
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson", "pdf": "application/pdf"}
+# Export datasets (?dataset=): raw alerts (kept until compaction), or per-classroom daily counts (rollups)
+EXPORT_DATASETS = ("alerts", "daily")
+ALERT_EXPORT_FIELDS = ("id", "timestamp", "classroom_id", "type", "image_snapshot_path", "metadata")
+DAILY_EXPORT_FIELDS = ("date", "classroom_id", "total_alerts") + ALERT_TYPES
+
+
+def _export_rows(dataset: str, classroom_id: str, start: datetime, end: datetime) -> Iterator[Dict[str, Any]]:
+    """Rows of a dataset, oldest first. Daily rows cover the whole UTC days overlapping [start, end)."""
+    if dataset == "alerts":
+        return iter_alerts(classroom_id, _iso(start), _iso(end), batch_size=Config.REPORT_EXPORT_BATCH_SIZE)
+    return ({"date": doc["start"].strftime("%Y-%m-%d"), "classroom_id": doc["classroom_id"],
+             "total_alerts": doc.get("total", 0), "alert_counts": doc.get("counts", {})}
+            for doc in iter_rollups(classroom_id, start, end, "day", batch_size=Config.REPORT_EXPORT_BATCH_SIZE))
+
+
+def _csv_values(dataset: str, row: Dict[str, Any]) -> list:
+    if dataset == "alerts":
+        return [json.dumps(row.get("metadata") or {}, default=str, sort_keys=True) if field == "metadata"
+                else row.get(field) for field in ALERT_EXPORT_FIELDS]
+    return [row["date"], row["classroom_id"], row["total_alerts"]] + [row["alert_counts"].get(t, 0)
+                                                                      for t in ALERT_TYPES]
+
+
+def _stream_csv(dataset: str, rows) -> Iterator[bytes]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(ALERT_EXPORT_FIELDS if dataset == "alerts" else DAILY_EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow(_csv_values(dataset, row))
+        if out.tell() >= Config.REPORT_EXPORT_CHUNK_BYTES:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue().encode("utf-8")
+
+
+def _stream_ndjson(rows) -> Iterator[bytes]:
+    chunk = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, default=str, separators=(",", ":")) + "\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= Config.REPORT_EXPORT_CHUNK_BYTES:
+            yield "".join(chunk).encode("utf-8")
+            chunk = []
+            size = 0
+    if chunk:
+        yield "".join(chunk).encode("utf-8")
+
+
+def _pdf_lines(dataset: str, classroom_id: str, start: datetime, end: datetime, rows) -> Iterator[str]:
+    """Report text: header and totals (from the rollups), then one line per row."""
+    summary = build_summary(classroom_id, start, end)
+    yield "Vision X Sentinel - alert report"
+    yield ""
+    yield f"Classroom: {classroom_id or 'all'}"
+    yield f"Range:     {_iso(start)} - {_iso(end)} (totals at {summary['resolution']} resolution)"
+    yield f"Alerts:    {summary['total_alerts']}"
+    for alert_type, n in sorted(summary["alert_counts"].items()):
+        yield f"  {alert_type:<16}{n:>8}"
+    if not classroom_id:
+        yield ""
+        yield "Per classroom:"
+        for cid, counts in sorted(summary["classrooms"].items()):
+            yield f"  {cid:<16}{counts['total_alerts']:>8}"
+    yield ""
+    if dataset == "alerts":
+        yield "Alerts (oldest first):"
+        yield f"  {'timestamp':<20}{'classroom':<12}{'type':<14}metadata"
+        for row in rows:
+            metadata = json.dumps(row.get("metadata") or {}, default=str, sort_keys=True, ensure_ascii=False)
+            yield (f"  {str(row.get('timestamp'))[:19]:<20}{str(row.get('classroom_id')):<12}"
+                   f"{str(row.get('type')):<14}{metadata}")
+    else:
+        yield "Daily counts:"
+        yield f"  {'date':<12}{'classroom':<12}{'total':>7}" + "".join(f"{t:>13}" for t in ALERT_TYPES)
+        for row in rows:
+            yield f"  {row['date']:<12}{str(row['classroom_id']):<12}{row['total_alerts']:>7}" + \
+                  "".join(f"{row['alert_counts'].get(t, 0):>13}" for t in ALERT_TYPES)
+
+
+def export_filename(fmt: str, dataset: str, classroom_id: str, start: datetime, end: datetime) -> str:
+    """Download file name, e.g. alerts_8A_20260901-20261001.csv."""
+    scope = re.sub(r"[^A-Za-z0-9_-]", "_", classroom_id) if classroom_id else "all"
+    return f"{dataset}_{scope}_{start:%Y%m%d}-{end:%Y%m%d}.{fmt}"
+
+
+def export_report(fmt: str, dataset: str, classroom_id: str, start: datetime, end: datetime) -> Iterator[bytes]:
+    """
+    Stream an export of [start, end). Arguments are validated before the first chunk is produced.
+    :param fmt: "csv", "ndjson" or "pdf"
+    :param dataset: "alerts" (raw alerts still stored) or "daily" (per-classroom daily counts, all history)
+    :param classroom_id: One classroom, or None for all
+    :return: Iterator of byte chunks
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"'format' must be one of: {', '.join(EXPORT_FORMATS)}")
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"'dataset' must be one of: {', '.join(EXPORT_DATASETS)}")
+    rows = _export_rows(dataset, classroom_id, start, end)
+    if fmt == "csv":
+        return _stream_csv(dataset, rows)
+    if fmt == "ndjson":
+        return _stream_ndjson(rows)
+    return stream_text_pdf(_pdf_lines(dataset, classroom_id, start, end, rows))
@@ -0,0 +1,89 @@
+"""Streaming text PDF writer for report exports (no PDF library needed).
+
+Lines are laid out in a monospaced font (Courier) on A4 pages and each page is
+yielded as soon as it is full, so memory is one page of text plus an
+8-byte offset per PDF object, however long the report. Characters outside
+Windows-1252 are replaced by "?"; lines longer than the page width are cut.
+"""
+from array import array
+from typing import Iterable, Iterator
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 40
+FONT_SIZE = 8
+LEADING = 11
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+# Courier glyphs are 0.6 em wide
+MAX_LINE_CHARS = int((PAGE_WIDTH - 2 * MARGIN) / (FONT_SIZE * 0.6))
+
+# Fixed object numbers; pages use 4, 5, ... (content stream, page) in pairs
+_CATALOG, _PAGES, _FONT = 1, 2, 3
+# Cross-reference table entries per yielded chunk (20 bytes each)
+_XREF_CHUNK_ENTRIES = 1024
+
+
+def _escape(line: str) -> bytes:
+    text = line[:MAX_LINE_CHARS].encode("cp1252", "replace")
+    return text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _page_content(lines: list) -> bytes:
+    parts = [b"BT /F1 %d Tf %d TL %d %d Td\n" % (FONT_SIZE, LEADING, MARGIN, PAGE_HEIGHT - MARGIN - FONT_SIZE)]
+    parts.extend(b"(%s) Tj T*\n" % _escape(line) for line in lines)
+    parts.append(b"ET")
+    return b"".join(parts)
+
+
+def _pages(lines: Iterable[str]) -> Iterator[list]:
+    page = []
+    for line in lines:
+        page.append(line)
+        if len(page) == LINES_PER_PAGE:
+            yield page
+            page = []
+    yield page  # remainder (an empty report still gets one blank page)
+
+
+def stream_text_pdf(lines: Iterable[str]) -> Iterator[bytes]:
+    """
+    Render text lines as a PDF, yielding it page by page.
+    :param lines: Lines of text (any iterable, consumed lazily)
+    :return: Iterator of PDF byte chunks
+    """
+    offsets = array("q", [0] * _FONT)  # byte offset of object n at index n - 1
+    written = 0
+
+    def emit(num: int, body: bytes) -> bytes:
+        nonlocal written
+        data = b"%d 0 obj\n%s\nendobj\n" % (num, body)
+        if num > len(offsets):
+            offsets.append(written)
+        else:
+            offsets[num - 1] = written
+        written += len(data)
+        return data
+
+    header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    written = len(header)
+    yield header
+    yield emit(_CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % _PAGES)
+    yield emit(_FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+
+    next_id = _FONT + 1
+    for page in _pages(lines):
+        content = _page_content(page)
+        chunk = emit(next_id, b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        chunk += emit(next_id + 1, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+                                   b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+                      % (_PAGES, PAGE_WIDTH, PAGE_HEIGHT, _FONT, next_id))
+        next_id += 2
+        yield chunk
+
+    # Page objects are _FONT + 2, _FONT + 4, ...
+    page_ids = range(_FONT + 2, next_id, 2)
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    yield emit(_PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    yield b"xref\n0 %d\n0000000000 65535 f \n" % next_id
+    for i in range(0, len(offsets), _XREF_CHUNK_ENTRIES):
+        yield b"".join(b"%010d 00000 n \n" % offset for offset in offsets[i:i + _XREF_CHUNK_ENTRIES])
+    yield b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_id, _CATALOG, written)
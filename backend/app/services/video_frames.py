@@ -1,12 +1,154 @@
 """Video frame utilities for mock streams.
-Note: In the current implementation, frames are captured directly in the frontend
-(ClassCard.jsx) using canvas and sent to the backend via POST /api/sentinel/analyze-frame.
-This module is kept for potential future use (e.g., server-side frame extraction from video files).
+Note: By default, frames are captured in the frontend (ClassCard.jsx) using canvas
+and sent to the backend via POST /api/sentinel/analyze-frame. Server-side ingestion
+(app/services/ingest.py) reads sources through StreamCapture instead.
 """
+import threading
+import time
+
 import cv2
 import numpy as np
 from typing import Optional
 
+# Used when a source does not report its frame rate
+DEFAULT_SOURCE_FPS = 25.0
+# Longest wait for the next stream frame before read() reports the stream as failed
+STREAM_READ_TIMEOUT_SEC = 10.0
+
+
+class StreamCapture:
+    """
+    One long-lived capture of a video file or stream URL, read sequentially.
+    - Files play at their own frame rate (looping, like the dashboard players):
+      read() returns the frame at the current media time; frames the clock
+      has passed are skipped with grab() (no color conversion/copy), never
+      seeked to.
+    - Streams (rtsp://, http://, ...) are drained by a background thread, the
+      only one using the capture: it grab()s every frame without holding the
+      lock and retrieve()s only the one read() asks for, so read() returns the
+      next fresh frame and stale ones are dropped without being decoded.
+    """
+
+    def __init__(self, source: str, loop: bool = True, width: int = None):
+        """
+        :param source: File path or stream URL
+        :param loop: Restart files at the end (ignored for streams)
+        :param width: Resize frames to this width (keeps aspect), None = source size
+        """
+        self.source = source
+        self.is_stream = "://" in source
+        self.loop = loop
+        self.width = width
+        self.fps = DEFAULT_SOURCE_FPS
+        self.frames_read = 0
+        self.frames_skipped = 0
+        self._cap = None
+        self._lock = threading.Lock()
+        self._frame_ready = threading.Condition(self._lock)
+        self._closed = False
+        self._pos = 0
+        self._clock_start = 0.0
+        self._wanted = False
+        self._frame = None
+        self._stream_failed = False
+        self._reader = None
+
+    def open(self):
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            raise IOError(f"Cannot open video source: {self.source}")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and 0 < fps < 1000 else DEFAULT_SOURCE_FPS
+        self._cap = cap
+        self._pos = 0
+        self._clock_start = time.monotonic()
+        if self.is_stream:
+            self._reader = threading.Thread(target=self._drain, name=f"capture-{self.source}", daemon=True)
+            self._reader.start()
+
+    def _drain(self):
+        """Stream reader: grab every frame (blocks until the next one arrives, outside the lock) and
+        decode only the frames read() is waiting for."""
+        try:
+            while not self._closed:
+                ok = self._cap.grab()
+                with self._lock:
+                    wanted = self._wanted
+                frame = None
+                if ok and wanted:
+                    ok, frame = self._cap.retrieve()
+                with self._frame_ready:
+                    if not ok:
+                        self._stream_failed = True
+                    elif wanted:
+                        self._frame = frame
+                        self._wanted = False
+                    else:
+                        self.frames_skipped += 1
+                    self._frame_ready.notify_all()
+                if not ok:
+                    return
+        finally:
+            if self._closed:
+                self._cap.release()
+
+    def read(self) -> Optional[np.ndarray]:
+        """Return the current frame, or None if the source ended or failed."""
+        if self._cap is None:
+            self.open()
+        frame = self._read_stream() if self.is_stream else self._read_file()
+        if frame is not None:
+            self.frames_read += 1
+            if self.width and frame.shape[1] != self.width:
+                height = max(1, round(frame.shape[0] * self.width / frame.shape[1]))
+                frame = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        return frame
+
+    def _read_stream(self) -> Optional[np.ndarray]:
+        """Wait for the reader thread to decode the next frame."""
+        with self._frame_ready:
+            self._wanted = True
+            self._frame_ready.wait_for(lambda: self._frame is not None or self._stream_failed or self._closed,
+                                       timeout=STREAM_READ_TIMEOUT_SEC)
+            frame, self._frame = self._frame, None
+            self._wanted = False
+        return frame
+
+    def _rewind(self):
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self._pos = 0
+        self._clock_start = time.monotonic()
+
+    def _read_file(self) -> Optional[np.ndarray]:
+        target = int((time.monotonic() - self._clock_start) * self.fps)
+        # Skip frames the media clock has passed (dropped when sampling falls behind)
+        while self._pos < target:
+            if not self._cap.grab():
+                break
+            self._pos += 1
+            self.frames_skipped += 1
+        ok, frame = self._cap.read()
+        if not ok:
+            if not self.loop:
+                return None
+            self._rewind()
+            ok, frame = self._cap.read()
+            if not ok:
+                return None
+        self._pos += 1
+        return frame
+
+    def close(self):
+        with self._frame_ready:
+            self._closed = True
+            self._frame_ready.notify_all()
+        if self._reader is not None:
+            self._reader.join(timeout=1.0)
+            if self._reader.is_alive():
+                return  # blocked in grab(): the reader releases the capture when it returns
+        if self._cap is not None:
+            self._cap.release()
+
 
 def extract_frame_from_video(video_path: str, timestamp_seconds: float = 0.0) -> Optional[np.ndarray]:
     """
@@ -0,0 +1,7 @@
+"""Run the ASGI application (sentinel/alerts/classrooms on an event loop, see app/asgi.py)."""
+import uvicorn
+
+from app.config import Config
+
+if __name__ == '__main__':
+    uvicorn.run('app.asgi:app', host='0.0.0.0', port=Config.FLASK_PORT)
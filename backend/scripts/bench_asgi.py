@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""Load test: WSGI (Flask threaded server, as run.py) vs. ASGI (uvicorn app.asgi:app).
+- Starts each server in a subprocess on a local port, then drives it with
+  --concurrency concurrent keep-alive clients (asyncio, one connection each) for --duration seconds
+  per scenario:
+  poll   GET /api/alerts?classroom_id=..&limit=20 with If-None-Match (mostly 304),
+         every 5th request GET /api/classrooms
+  audio  POST /api/sentinel/audio-level
+  frame  POST /api/sentinel/analyze-frame/raw (a 640x360 JPEG from mock-media)
+- --slow-clients N keeps N extra connections open during each run, each trickling
+  an upload body at one byte per second (a slow or stalled camera uplink).
+- Reports requests/s, p50/p95/p99 latency, errors, and the server's peak RSS and
+  thread count. --output saves the results as JSON.
+- --db mongomock (default) needs mongomock and, for ASGI, mongomock-motor;
+  --db env uses MONGO_URI (e.g. a local mongod).
+Client and server share the machine: compare the two modes at equal settings,
+not against numbers from another host.
+
+Run from backend directory:
+  python scripts/bench_asgi.py --scenario poll,audio --concurrency 10,100,1000
+  python scripts/bench_asgi.py --scenario frame --concurrency 4,16 --slow-clients 200
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add backend root to path so we can import app
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_ROOT)
+
+# app.* is imported after --db has decided which MongoDB client to use
+
+MODES = ("wsgi", "asgi")
+SCENARIOS = ("poll", "audio", "frame")
+FRAME_SIZE = (640, 360)  # same as the frontend canvas
+SLOW_CLIENT_BODY_BYTES = 4096
+
+
+def raise_fd_limit():
+    """Allow as many sockets as the hard limit permits (thousands of client connections)."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+# Server side (--serve)
+
+@contextlib.contextmanager
+def use_mongomock_async():
+    """mongomock for both stores inside the block: the async store wraps the sync store's mongomock client."""
+    from scripts.replay_bench import use_mongomock
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("❌ --db mongomock for the ASGI server needs mongomock-motor (or use --db env)")
+    import app.db.async_store as async_store
+    from app.db.connection import get_client
+    client_class = async_store._client_class
+    with use_mongomock():
+        async_store._client_class = lambda: (lambda uri, **kwargs: AsyncMongoMockClient(mock_mongo_client=get_client()))
+        try:
+            yield
+        finally:
+            async_store._client_class = client_class
+
+
+def seed(classrooms: int, alerts_per_classroom: int = 20):
+    from app.db.store import upsert_classroom, insert_alerts
+    from app.db.schema import default_alert
+    for i in range(1, classrooms + 1):
+        upsert_classroom(str(i), name=f"Class {i}")
+    insert_alerts([default_alert(str(i), "LOUD_NOISE", metadata={"seed": n})
+                   for i in range(1, classrooms + 1) for n in range(alerts_per_classroom)])
+
+
+def serve(mode: str, port: int, db: str, classrooms: int):
+    """Run one server in the foreground (subprocess of the load test)."""
+    import logging
+    raise_fd_limit()
+    if db == "mongomock" and mode == "asgi":
+        mock_db = use_mongomock_async()
+    elif db == "mongomock":
+        from scripts.replay_bench import use_mongomock
+        mock_db = use_mongomock()
+    else:
+        mock_db = contextlib.nullcontext()
+    with mock_db:
+        seed(classrooms)
+        if mode == "wsgi":
+            from app.main import create_app
+            logging.getLogger("werkzeug").setLevel(logging.WARNING)
+            create_app().run(host="127.0.0.1", port=port, threaded=True)
+        else:
+            import uvicorn
+            from app.asgi import app
+            uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False, backlog=4096)
+
+
+def start_server(mode: str, port: int, args, log_path: str) -> subprocess.Popen:
+    cmd = [sys.executable, os.path.abspath(__file__), "--serve", mode, "--port", str(port),
+           "--db", args.db, "--classrooms", str(args.classrooms)]
+    log = open(log_path, "w")
+    return subprocess.Popen(cmd, cwd=BACKEND_ROOT, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 120.0) -> bool:
+    import urllib.request
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(url + "/api/classrooms", timeout=2) as r:
+                if r.status == 200:
+                    return True
+        except Exception:
+            time.sleep(0.5)
+    return False
+
+
+def proc_stats(pid: int) -> dict:
+    """Current RSS (MB) and thread count of a process (Linux /proc)."""
+    stats = {"rss_mb": 0.0, "threads": 0}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    stats["rss_mb"] = int(line.split()[1]) / 1024.0
+                elif line.startswith("Threads:"):
+                    stats["threads"] = int(line.split()[1])
+    except OSError:
+        pass
+    return stats
+
+
+# Client side
+
+def load_frame(media_dir: str) -> bytes:
+    """One frontend-sized JPEG from the first readable mock-media video (synthetic if none)."""
+    import cv2
+    import numpy as np
+    for name in sorted(os.listdir(media_dir)) if os.path.isdir(media_dir) else []:
+        cap = cv2.VideoCapture(os.path.join(media_dir, name))
+        ok, frame = cap.read()
+        cap.release()
+        if ok:
+            return cv2.imencode(".jpg", cv2.resize(frame, FRAME_SIZE), [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+    frame = np.random.default_rng(0).integers(0, 255, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+class Connection:
+    """Minimal HTTP/1.1 client over one keep-alive connection (reconnects when the server
+    closes it, as the WSGI dev server does after every response)."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes = b"", headers: dict = None) -> tuple:
+        """Send one request; return (status, headers with lower-case names, body)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        try:
+            head = await self.reader.readuntil(b"\r\n\r\n")
+            status_line, *header_lines = head.decode("latin-1").split("\r\n")
+            version, status = status_line.split(" ", 2)[:2]
+            response_headers = {}
+            for line in header_lines:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    response_headers[name.strip().lower()] = value.strip()
+            keep_alive = version == "HTTP/1.1" and response_headers.get("connection", "").lower() != "close"
+            if "content-length" in response_headers:
+                content = await self.reader.readexactly(int(response_headers["content-length"]))
+            elif status == "304" or keep_alive:
+                content = b""
+            else:
+                content = await self.reader.read()
+        except BaseException:
+            self.close()
+            raise
+        if not keep_alive:
+            self.close()
+        return int(status), response_headers, content
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def client_loop(host: str, port: int, scenario: str, index: int, classrooms: int, frame: bytes,
+                      stop_at: float, latencies: list, statuses: dict, errors: dict):
+    """One simulated dashboard/camera sending requests back to back on its own connection."""
+    conn = Connection(host, port)
+    classroom_id = str(index % classrooms + 1)
+    etag = None
+    n = 0
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        try:
+            if scenario == "poll":
+                if n % 5 == 4:
+                    status, _, _ = await conn.request("GET", "/api/classrooms")
+                else:
+                    headers = {"If-None-Match": etag} if etag else {}
+                    status, response_headers, _ = await conn.request(
+                        "GET", f"/api/alerts?classroom_id={classroom_id}&limit=20", headers=headers)
+                    etag = response_headers.get("etag", etag)
+            elif scenario == "audio":
+                body = json.dumps({"classroom_id": classroom_id, "level": random.random()}).encode()
+                status, _, _ = await conn.request("POST", "/api/sentinel/audio-level", body,
+                                                  {"Content-Type": "application/json"})
+            else:
+                status, _, _ = await conn.request("POST", "/api/sentinel/analyze-frame/raw", frame,
+                                                  {"Content-Type": "image/jpeg", "X-Classroom-Id": classroom_id})
+            statuses[status] = statuses.get(status, 0) + 1
+            if status < 400:
+                latencies.append((time.perf_counter() - started) * 1000.0)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            await asyncio.sleep(0.05)
+        n += 1
+    conn.close()
+
+
+async def slow_client(host: str, port: int, stop_at: float, opened: list):
+    """Hold a connection with an upload that trickles one byte per second."""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    opened.append(1)
+    try:
+        writer.write((f"POST /api/sentinel/audio-level HTTP/1.1\r\nHost: {host}\r\n"
+                      f"Content-Type: application/json\r\nContent-Length: {SLOW_CLIENT_BODY_BYTES}\r\n\r\n").encode())
+        while time.monotonic() < stop_at:
+            writer.write(b" ")
+            await writer.drain()
+            await asyncio.sleep(1.0)
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+
+async def sample_server(pid: int, stop_at: float, peak: dict):
+    while time.monotonic() < stop_at:
+        stats = proc_stats(pid)
+        peak["rss_mb"] = max(peak["rss_mb"], stats["rss_mb"])
+        peak["threads"] = max(peak["threads"], stats["threads"])
+        await asyncio.sleep(0.2)
+
+
+async def run_load(url: str, pid: int, scenario: str, concurrency: int, duration: float,
+                   classrooms: int, frame: bytes, slow_clients: int) -> dict:
+    from urllib.parse import urlparse
+    from app.services.latency import percentiles
+
+    parsed = urlparse(url)
+    latencies, statuses, errors, opened = [], {}, {}, []
+    peak = {"rss_mb": 0.0, "threads": 0}
+    stop_at = time.monotonic() + duration + 2.0
+    slow = [asyncio.create_task(slow_client(parsed.hostname, parsed.port, stop_at, opened))
+            for _ in range(slow_clients)]
+    if slow_clients:
+        await asyncio.sleep(1.0)  # let the slow uploads connect first
+    started = time.monotonic()
+    stop_at = started + duration
+    sampler = asyncio.create_task(sample_server(pid, stop_at, peak))
+    await asyncio.gather(*(client_loop(parsed.hostname, parsed.port, scenario, i, classrooms, frame, stop_at,
+                                       latencies, statuses, errors) for i in range(concurrency)))
+    elapsed = time.monotonic() - started
+    await sampler
+    for task in slow:
+        task.cancel()
+    await asyncio.gather(*slow, return_exceptions=True)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "slow_clients": len(opened),
+        "requests": len(latencies),
+        "requests_per_sec": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "latency_ms": percentiles(latencies),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "errors": errors,
+        "server_peak_rss_mb": round(peak["rss_mb"], 1),
+        "server_peak_threads": peak["threads"],
+    }
+
+
+def print_result(mode: str, result: dict):
+    lat = result["latency_ms"]
+    errors = sum(result["errors"].values()) + sum(v for k, v in result["statuses"].items() if int(k) >= 400)
+    print(f"{mode:<6}{result['scenario']:<7}{result['concurrency']:>6}{result['requests_per_sec']:>10.1f}"
+          f"{lat['p50']:>9.1f}{lat['p95']:>9.1f}{lat['p99']:>9.1f}{errors:>8}"
+          f"{result['server_peak_rss_mb']:>9.0f}{result['server_peak_threads']:>9}")
+
+
+def print_comparison(results: dict):
+    print("\nASGI vs. WSGI (requests/s, p99):")
+    for wsgi, asgi in zip(results.get("wsgi", []), results.get("asgi", [])):
+        ratio = asgi["requests_per_sec"] / wsgi["requests_per_sec"] if wsgi["requests_per_sec"] else float("inf")
+        print(f"  {wsgi['scenario']:<6} c={wsgi['concurrency']:<5} {ratio:6.2f}x throughput, "
+              f"p99 {wsgi['latency_ms']['p99']:.1f} -> {asgi['latency_ms']['p99']:.1f} ms, "
+              f"threads {wsgi['server_peak_threads']} -> {asgi['server_peak_threads']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", default="wsgi,asgi", help='comma-separated: "wsgi", "asgi"')
+    parser.add_argument("--scenario", default="poll,audio", help='comma-separated: "poll", "audio", "frame"')
+    parser.add_argument("--concurrency", default="10,100,500", help="comma-separated concurrent client counts")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario and concurrency")
+    parser.add_argument("--slow-clients", type=int, default=0, help="extra connections trickling an upload")
+    parser.add_argument("--classrooms", type=int, default=50, help="classrooms seeded and spread over clients")
+    parser.add_argument("--port", type=int, default=5055, help="local port for the server under test")
+    parser.add_argument("--media-dir", help="directory of videos for the frame scenario (default: MOCK_MEDIA_DIR)")
+    parser.add_argument("--db", default="mongomock", choices=("mongomock", "env"),
+                        help="mongomock (in-memory, no server) or env (MONGO_URI)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--serve", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.db == "mongomock" and not os.getenv("MONGO_URI"):
+        os.environ["MONGO_URI"] = "mongodb://localhost:27017"  # placeholder, never contacted
+    if args.serve:
+        serve(args.serve, args.port, args.db, args.classrooms)
+        return
+
+    modes = [m.strip() for m in args.mode.split(",") if m.strip()]
+    scenarios = [s.strip() for s in args.scenario.split(",") if s.strip()]
+    for name, allowed in ((modes, MODES), (scenarios, SCENARIOS)):
+        unknown = [n for n in name if n not in allowed]
+        if unknown:
+            sys.exit(f"❌ Unknown value(s) {unknown}; choose from {allowed}")
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    raise_fd_limit()
+
+    from app.config import Config
+    frame = load_frame(args.media_dir or Config.MOCK_MEDIA_DIR) if "frame" in scenarios else b""
+    url = f"http://127.0.0.1:{args.port}"
+    print(f"Scenarios {scenarios}, concurrency {levels}, {args.duration:.0f}s each, "
+          f"{args.slow_clients} slow clients, db={args.db}\n")
+    print(f"{'mode':<6}{'scen.':<7}{'conc.':>6}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'errors':>8}{'RSS MB':>9}{'threads':>9}")
+
+    results = {}
+    for mode in modes:
+        log_path = os.path.join(tempfile.gettempdir(), f"bench_asgi_{mode}.log")
+        proc = start_server(mode, args.port, args, log_path)
+        try:
+            if not wait_ready(url, proc):
+                with open(log_path) as f:
+                    print(f"❌ {mode} server did not start:\n{f.read()[-2000:]}")
+                continue
+            results[mode] = []
+            for scenario in scenarios:
+                for concurrency in levels:
+                    result = asyncio.run(run_load(url, proc.pid, scenario, concurrency, args.duration,
+                                                  args.classrooms, frame, args.slow_clients))
+                    results[mode].append(result)
+                    print_result(mode, result)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    if "wsgi" in results and "asgi" in results:
+        print_comparison(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "host": platform.node(),
+                       "cpus": os.cpu_count(), "db": args.db, "duration_sec": args.duration,
+                       "slow_clients": args.slow_clients, "results": results}, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Benchmark classroom status changes: round trips and latency per change.
+- legacy: find_one + replace_one (the previous upsert_classroom)
+- upsert: upsert_classroom (one find_one_and_update with $set/$setOnInsert)
+- bulk:   bulk_upsert_classrooms, one bulk_write per --batch status changes
+Round trips are counted with a pymongo command listener. Runs against its
+own database (default: <MONGO_DB_NAME>_bench), which is dropped afterwards.
+
+Run from backend directory (local mongod):
+  MONGO_URI=mongodb://localhost:27017/ python scripts/bench_classroom_upsert.py --changes 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add backend root to path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import MongoClient, monitoring
+
+import app.db.store as store
+from app.db.connection import use_client
+from app.config import Config
+from app.db.schema import TABLE_CLASSROOMS, CLASSROOM_STATUSES
+from app.services.latency import percentiles
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to the server (one per round trip)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def legacy_upsert(classroom_id: str, current_status: str, updated_at: str):
+    """The previous upsert_classroom: read the document, then replace it."""
+    collection = store.get_mongo_db()[TABLE_CLASSROOMS]
+    existing = collection.find_one({"id": classroom_id})
+    doc = {
+        "id": classroom_id,
+        "name": existing.get("name") if existing else f"Class {classroom_id}",
+        "current_status": current_status,
+        "video_id": existing.get("video_id") if existing else None,
+        "updated_at": updated_at,
+    }
+    collection.replace_one({"id": classroom_id}, doc, upsert=True)
+
+
+def make_changes(count: int, classrooms: int) -> list:
+    """Random (classroom_id, status, updated_at) status changes."""
+    rng = random.Random(42)
+    return [(str(rng.randint(1, classrooms)), rng.choice(CLASSROOM_STATUSES),
+             f"2024-01-01T00:00:{i % 60:02d}.{i:06d}Z") for i in range(count)]
+
+
+def run(label: str, changes: list, counter: CommandCounter, batch: int) -> dict:
+    """Apply all changes with one method; return round trips and latency per change."""
+    latencies = []
+    before = counter.count
+    start = time.perf_counter()
+    if label == "bulk":
+        for i in range(0, len(changes), batch):
+            chunk = changes[i:i + batch]
+            t0 = time.perf_counter()
+            store.bulk_upsert_classrooms([{"id": cid, "current_status": status, "updated_at": ts}
+                                          for cid, status, ts in chunk])
+            latencies.append((time.perf_counter() - t0) * 1000.0 / len(chunk))
+    else:
+        fn = legacy_upsert if label == "legacy" else (
+            lambda cid, status, ts: store.upsert_classroom(cid, current_status=status, updated_at=ts))
+        for cid, status, ts in changes:
+            t0 = time.perf_counter()
+            fn(cid, status, ts)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+    total = time.perf_counter() - start
+    return {
+        "method": label,
+        "round_trips": (counter.count - before) / len(changes),
+        "changes_per_sec": len(changes) / total,
+        "latency_ms": percentiles(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--changes", type=int, default=2000, help="status changes per method")
+    parser.add_argument("--classrooms", type=int, default=20, help="distinct classroom ids")
+    parser.add_argument("--batch", type=int, default=100, help="status changes per bulk_write")
+    parser.add_argument("--db", default=Config.MONGO_DB_NAME + "_bench", help="scratch database (dropped after)")
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client = MongoClient(Config.MONGO_URI, serverSelectionTimeoutMS=5000, event_listeners=[counter])
+    try:
+        client.admin.command("ping")
+    except Exception as e:
+        print(f"❌ MongoDB connection failed: {e}")
+        sys.exit(1)
+    # Point the store at the scratch database (skips the connection manager's own client)
+    use_client(client, args.db)
+    store.get_mongo_db()[TABLE_CLASSROOMS].create_index("id", unique=True)
+
+    changes = make_changes(args.changes, args.classrooms)
+    print("=" * 72)
+    print(f"Classroom status changes: {args.changes} over {args.classrooms} classrooms (db: {args.db})")
+    print("=" * 72)
+    print(f"{'method':<10}{'round trips':>14}{'changes/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    try:
+        for label in ("legacy", "upsert", "bulk"):
+            store.get_mongo_db()[TABLE_CLASSROOMS].delete_many({})
+            r = run(label, changes, counter, args.batch)
+            lat = r["latency_ms"]
+            print(f"{r['method']:<10}{r['round_trips']:>14.3f}{r['changes_per_sec']:>12.0f}"
+                  f"{lat['p50']:>10.3f}{lat['p95']:>10.3f}{lat['p99']:>10.3f}")
+    finally:
+        client.drop_database(args.db)
+    print(f"(bulk: latency is per change, {args.batch} changes per bulk_write)")
+
+
+if __name__ == "__main__":
+    main()
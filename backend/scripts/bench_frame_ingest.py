@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Benchmark frame ingestion: base64-in-JSON vs raw JPEG bytes.
+- Samples frames from the mock-media videos, resized/encoded like the frontend
+  (640x360 JPEG, quality 80).
+- Reports bytes per request and server CPU per frame for the parse + decode
+  stage of /analyze-frame (JSON) and /analyze-frame/raw (binary).
+- With --url, also POSTs every frame to a running backend through both routes
+  and reports end-to-end latency.
+
+Run from backend directory: python scripts/bench_frame_ingest.py [--frames 200] [--url http://localhost:5000]
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+import urllib.request
+
+# Add backend root to path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+
+from app.config import Config
+from app.api.sentinel import CLASSROOM_ID_HEADER, _decode_frame, _decode_frame_bytes
+
+FRAME_SIZE = (640, 360)  # same as the frontend canvas
+JPEG_QUALITY = 80
+
+
+def load_jpeg_frames(limit: int) -> list:
+    """Return up to `limit` JPEG-encoded frames sampled from mock-media videos."""
+    media_dir = os.path.abspath(Config.MOCK_MEDIA_DIR)
+    videos = [os.path.join(media_dir, f) for f in sorted(os.listdir(media_dir)) if f.endswith(".mp4")]
+    frames = []
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        while len(frames) < limit:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frame = cv2.resize(frame, FRAME_SIZE)
+            ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            if ok:
+                frames.append(jpeg.tobytes())
+        cap.release()
+    return frames
+
+
+def json_body(classroom_id: str, jpeg: bytes) -> bytes:
+    """Request body exactly as the frontend builds it for /analyze-frame."""
+    data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii")
+    return json.dumps({"classroom_id": classroom_id, "frame": data_url}).encode("utf-8")
+
+
+def cpu_per_frame(bodies: list, decode) -> float:
+    """CPU milliseconds per frame spent in `decode(body)`."""
+    start = time.process_time()
+    for body in bodies:
+        if decode(body) is None:
+            raise RuntimeError("decode failed")
+    return (time.process_time() - start) * 1000.0 / len(bodies)
+
+
+def post_latencies(url: str, bodies: list, headers: dict) -> list:
+    """POST every body and return wall-clock latencies (ms)."""
+    latencies = []
+    for body in bodies:
+        req = urllib.request.Request(url, data=body, headers=headers, method="POST")
+        start = time.perf_counter()
+        with urllib.request.urlopen(req) as resp:
+            resp.read()
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200, help="number of frames to sample")
+    parser.add_argument("--classroom-id", default="bench", help="classroom_id used in requests")
+    parser.add_argument("--url", help="backend base URL for an end-to-end run (optional)")
+    args = parser.parse_args()
+
+    frames = load_jpeg_frames(args.frames)
+    if not frames:
+        print(f"No frames found in {Config.MOCK_MEDIA_DIR}")
+        sys.exit(1)
+
+    json_bodies = [json_body(args.classroom_id, f) for f in frames]
+    raw_bodies = frames
+
+    json_bytes = statistics.mean(len(b) for b in json_bodies)
+    raw_bytes = statistics.mean(len(b) for b in raw_bodies)
+    json_cpu = cpu_per_frame(json_bodies, lambda b: _decode_frame(json.loads(b)["frame"]))
+    raw_cpu = cpu_per_frame(raw_bodies, _decode_frame_bytes)
+
+    print("=" * 60)
+    print(f"Frame ingestion benchmark ({len(frames)} frames, {FRAME_SIZE[0]}x{FRAME_SIZE[1]} JPEG q{JPEG_QUALITY})")
+    print("=" * 60)
+    print(f"{'route':<28}{'bytes/request':>16}{'CPU ms/frame':>16}")
+    print(f"{'/analyze-frame (JSON)':<28}{json_bytes:>16.0f}{json_cpu:>16.3f}")
+    print(f"{'/analyze-frame/raw':<28}{raw_bytes:>16.0f}{raw_cpu:>16.3f}")
+    print(f"Bytes saved: {100.0 * (1 - raw_bytes / json_bytes):.1f}%  "
+          f"CPU saved: {100.0 * (1 - raw_cpu / json_cpu):.1f}%")
+
+    if args.url:
+        base = args.url.rstrip("/") + "/api/sentinel"
+        json_lat = post_latencies(base + "/analyze-frame", json_bodies,
+                                  {"Content-Type": "application/json"})
+        raw_lat = post_latencies(base + "/analyze-frame/raw", raw_bodies,
+                                 {"Content-Type": "image/jpeg", CLASSROOM_ID_HEADER: args.classroom_id})
+        print("\nEnd-to-end latency (ms, includes inference):")
+        for name, lat in (("JSON", json_lat), ("raw", raw_lat)):
+            lat.sort()
+            print(f"  {name:<6} p50={lat[len(lat) // 2]:.1f}  p95={lat[int(len(lat) * 0.95)]:.1f}  max={lat[-1]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Benchmark inference backends (ultralytics / onnx / openvino) on mock-media videos.
+- Samples frames from every .mp4 in mock-media (640x360, like the frontend).
+- For each backend: loads it, runs one warm-up inference, then times
+  single-frame count_persons calls.
+- Reports frames/sec, p50/p95 latency and mean person count (sanity check
+  that backends agree).
+
+Run from backend directory:
+  python scripts/bench_inference_backends.py --backends ultralytics,onnx,openvino --threads 4
+  python scripts/bench_inference_backends.py --export   # export ONNX/OpenVINO models first
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add backend root to path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+
+from app.config import Config
+from app.sentinel.backends import BACKENDS, DEFAULT_MODEL_PATHS, create_backend
+
+FRAME_SIZE = (640, 360)  # same as the frontend canvas
+
+
+def load_frames(limit: int, step: int) -> list:
+    """Return up to `limit` frames (every `step`-th frame) from mock-media videos."""
+    media_dir = os.path.abspath(Config.MOCK_MEDIA_DIR)
+    videos = [os.path.join(media_dir, f) for f in sorted(os.listdir(media_dir)) if f.endswith(".mp4")]
+    per_video = max(1, limit // max(1, len(videos)))
+    frames = []
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        taken = index = 0
+        while taken < per_video:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if index % step == 0:
+                frames.append(cv2.resize(frame, FRAME_SIZE))
+                taken += 1
+            index += 1
+        cap.release()
+    return frames
+
+
+def export_models(imgsz: int):
+    """Export yolov8n.pt to ONNX and OpenVINO with Ultralytics (fixed input size)."""
+    from app.sentinel.backends import UltralyticsBackend
+    model = UltralyticsBackend().model
+    for fmt in ("onnx", "openvino"):
+        print(f"Exporting {fmt} (imgsz={imgsz})...")
+        model.export(format=fmt, imgsz=imgsz)
+
+
+def bench_backend(name: str, frames: list, threads: int, imgsz: int) -> dict:
+    """Time single-frame inference for one backend."""
+    backend = create_backend(name, threads=threads or None, imgsz=imgsz)
+    backend.warm_up()
+    latencies = []
+    counts = []
+    for frame in frames:
+        start = time.perf_counter()
+        counts.append(backend.count_persons_batch([frame])[0])
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    latencies.sort()
+    return {
+        "backend": name,
+        "imgsz": backend.imgsz,
+        "fps": 1000.0 * len(latencies) / sum(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95)],
+        "mean_persons": statistics.mean(counts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated backend names")
+    parser.add_argument("--frames", type=int, default=100, help="number of frames to time")
+    parser.add_argument("--step", type=int, default=15, help="sample every N-th video frame")
+    parser.add_argument("--threads", type=int, default=Config.INFERENCE_THREADS, help="intra-op threads (0 = default)")
+    parser.add_argument("--imgsz", type=int, default=Config.INFERENCE_IMGSZ, help="model input size")
+    parser.add_argument("--export", action="store_true", help="export ONNX/OpenVINO models before benchmarking")
+    args = parser.parse_args()
+
+    if args.export:
+        export_models(args.imgsz)
+
+    frames = load_frames(args.frames, args.step)
+    if not frames:
+        print(f"No frames found in {Config.MOCK_MEDIA_DIR}")
+        sys.exit(1)
+
+    print("=" * 72)
+    print(f"Inference backend benchmark ({len(frames)} frames, threads={args.threads or 'default'})")
+    print("=" * 72)
+    print(f"{'backend':<14}{'imgsz':>8}{'frames/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'persons':>10}")
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        try:
+            r = bench_backend(name, frames, args.threads, args.imgsz)
+        except Exception as e:
+            print(f"{name:<14}  skipped: {e} (model: {DEFAULT_MODEL_PATHS.get(name)})")
+            continue
+        print(f"{r['backend']:<14}{r['imgsz']:>8}{r['fps']:>12.1f}{r['p50_ms']:>10.1f}"
+              f"{r['p95_ms']:>10.1f}{r['mean_persons']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
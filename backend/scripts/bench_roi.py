@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Benchmark the latency/accuracy tradeoff of detection ROI and model input size.
+- Samples frames from every .mp4 in mock-media (640x360, like the frontend).
+- Reference: full frame at --ref-imgsz.
+- For each ROI x imgsz: p50/p95 latency, mean person count, mean absolute
+  error and exact agreement vs. the reference, and count flips (changes
+  between consecutive frames of the same clip, per 100 frames; lower = steadier).
+- Suggests the fastest setting within --max-mae of the reference.
+Set the chosen values per classroom with PUT /api/classrooms/<id>/detection.
+
+Run from backend directory:
+  python scripts/bench_roi.py --imgsz 320,480,640 --rois "full;0,0.25,1,0.75"
+(ONNX/OpenVINO need a dynamic-shape export for imgsz other than the export size.)
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add backend root to path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+
+from app.config import Config
+from app.sentinel.backends import create_backend
+from app.sentinel.roi import crop_to_roi, validate_roi, validate_imgsz
+from app.services.latency import percentiles
+
+FRAME_SIZE = (640, 360)  # same as the frontend canvas
+
+
+def load_clip_frames(per_clip: int, step: int) -> list:
+    """Return (clip name, frame) pairs: every `step`-th frame, up to `per_clip` per mock-media video."""
+    media_dir = os.path.abspath(Config.MOCK_MEDIA_DIR)
+    frames = []
+    for name in sorted(f for f in os.listdir(media_dir) if f.endswith(".mp4")):
+        cap = cv2.VideoCapture(os.path.join(media_dir, name))
+        taken = index = 0
+        while taken < per_clip:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if index % step == 0:
+                frames.append((name, cv2.resize(frame, FRAME_SIZE)))
+                taken += 1
+            index += 1
+        cap.release()
+    return frames
+
+
+def parse_rois(value: str) -> list:
+    """ "full;0,0.25,1,0.75" -> [None, [0, 0.25, 1, 0.75]] """
+    rois = []
+    for part in value.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        rois.append(None if part == "full" else validate_roi([float(v) for v in part.split(",")]))
+    return rois
+
+
+def run(backend, frames: list, roi, imgsz: int) -> tuple:
+    """Count persons in every frame; return (counts, latencies in ms)."""
+    counts, latencies = [], []
+    for _, frame in frames:
+        started = time.perf_counter()
+        counts.append(backend.count_persons_batch([crop_to_roi(frame, roi)], imgsz=imgsz)[0])
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    return counts, latencies
+
+
+def count_flips(frames: list, counts: list) -> float:
+    """Count changes between consecutive frames of the same clip, per 100 frames."""
+    flips = sum(1 for i in range(1, len(frames))
+                if frames[i][0] == frames[i - 1][0] and counts[i] != counts[i - 1])
+    return 100.0 * flips / max(1, len(frames) - 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", default=Config.INFERENCE_BACKEND, help="inference backend name")
+    parser.add_argument("--model", default=Config.INFERENCE_MODEL_PATH or None, help="model path (default per backend)")
+    parser.add_argument("--imgsz", default="320,480,640", help="comma-separated model input sizes")
+    parser.add_argument("--rois", default="full", help='";"-separated ROIs: "full" or "x,y,w,h" fractions')
+    parser.add_argument("--ref-imgsz", type=int, default=640, help="input size of the full-frame reference")
+    parser.add_argument("--frames", type=int, default=60, help="frames per clip")
+    parser.add_argument("--step", type=int, default=10, help="sample every N-th video frame")
+    parser.add_argument("--max-mae", type=float, default=0.25, help="accuracy tolerance for the suggestion")
+    args = parser.parse_args()
+
+    frames = load_clip_frames(args.frames, args.step)
+    if not frames:
+        print(f"No frames found in {Config.MOCK_MEDIA_DIR}")
+        sys.exit(1)
+    sizes = [validate_imgsz(s) for s in args.imgsz.split(",") if s.strip()]
+    rois = parse_rois(args.rois)
+
+    backend = create_backend(args.backend, args.model, threads=Config.INFERENCE_THREADS or None)
+    backend.warm_up()
+    if getattr(backend, "static_imgsz", False):
+        print(f"⚠️ {args.backend} model has a fixed input size ({backend.imgsz}); imgsz values are ignored")
+    reference, _ = run(backend, frames, None, args.ref_imgsz)
+
+    print("=" * 88)
+    print(f"ROI / input size benchmark ({len(frames)} frames, backend={backend.name}, "
+          f"reference: full frame @ {args.ref_imgsz})")
+    print("=" * 88)
+    print(f"{'roi':<24}{'imgsz':>7}{'p50 ms':>9}{'p95 ms':>9}{'persons':>9}{'MAE':>8}{'agree %':>9}{'flips/100':>11}")
+    rows = []
+    for roi in rois:
+        for imgsz in sizes:
+            counts, latencies = run(backend, frames, roi, imgsz)
+            lat = percentiles(latencies)
+            mae = statistics.mean(abs(c - r) for c, r in zip(counts, reference))
+            agree = 100.0 * sum(1 for c, r in zip(counts, reference) if c == r) / len(counts)
+            label = "full" if roi is None else ",".join(f"{v:g}" for v in roi)
+            rows.append((label, imgsz, lat["p50"], mae))
+            print(f"{label:<24}{imgsz:>7}{lat['p50']:>9.1f}{lat['p95']:>9.1f}{statistics.mean(counts):>9.2f}"
+                  f"{mae:>8.3f}{agree:>9.1f}{count_flips(frames, counts):>11.1f}")
+
+    within = [r for r in rows if r[3] <= args.max_mae]
+    if within:
+        label, imgsz, p50, mae = min(within, key=lambda r: r[2])
+        print(f"\nFastest setting within MAE {args.max_mae}: roi={label} imgsz={imgsz} "
+              f"(p50 {p50:.1f} ms, MAE {mae:.3f})")
+    else:
+        print(f"\nNo setting within MAE {args.max_mae} of the reference")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Benchmark cold start: import time per blueprint and time to first response.
+Every measurement runs in a fresh Python process, like a serverless cold start.
+- Import: time to import each blueprint module, and which heavy modules
+  (torch, ultralytics, cv2, numpy) it pulled in.
+- First response: create_app() time plus the first request to one route of
+  each blueprint (DB routes need MONGO_URI to point at a reachable MongoDB;
+  the sentinel frame route includes model load + first inference).
+
+Run from backend directory: python scripts/bench_startup.py [--repeat 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BLUEPRINT_MODULES = ["app.api.classrooms", "app.api.alerts", "app.api.videos",
+                     "app.api.stats", "app.api.sentinel"]
+
+HEAVY_MODULES = ["torch", "ultralytics", "cv2", "numpy"]
+
+# (label, method, path, body kind)
+FIRST_REQUESTS = [
+    ("GET /api/classrooms", "GET", "/api/classrooms", None),
+    ("GET /api/alerts", "GET", "/api/alerts?limit=1", None),
+    ("GET /api/videos", "GET", "/api/videos", None),
+    ("GET /api/stats", "GET", "/api/stats", None),
+    ("POST /api/sentinel/audio-level", "POST", "/api/sentinel/audio-level", "audio"),
+    ("POST /api/sentinel/analyze-frame/raw", "POST", "/api/sentinel/analyze-frame/raw", "frame"),
+]
+
+IMPORT_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+REQUEST_SNIPPET = """
+import json, time
+start = time.perf_counter()
+from app.main import create_app
+app = create_app()
+created = time.perf_counter()
+client = app.test_client()
+kind = {kind!r}
+if kind == "audio":
+    resp = client.post({path!r}, json={{"classroom_id": "bench", "level": 0.0}})
+elif kind == "frame":
+    import cv2, numpy as np
+    ok, jpeg = cv2.imencode(".jpg", np.zeros((360, 640, 3), dtype=np.uint8))
+    resp = client.post({path!r}, data=jpeg.tobytes(),
+                       headers={{"Content-Type": "image/jpeg", "X-Classroom-Id": "bench"}})
+else:
+    resp = client.open({path!r}, method={method!r})
+done = time.perf_counter()
+print(json.dumps({{"create_app": created - start, "first_response": done - start, "status": resp.status_code}}))
+"""
+
+
+def run_snippet(code: str) -> dict:
+    """Run code in a fresh interpreter (cwd = backend) and parse its last JSON line."""
+    proc = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_ROOT,
+                          capture_output=True, text=True)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        err = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+        return {"error": err}
+    return json.loads(lines[-1])
+
+
+def median_of(runs: list, key: str) -> float:
+    return statistics.median(r[key] for r in runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per measurement (median)")
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print("Import time per blueprint (fresh process, median of %d)" % args.repeat)
+    print("=" * 72)
+    for module in BLUEPRINT_MODULES:
+        runs = [run_snippet(IMPORT_SNIPPET.format(module=module, heavy=HEAVY_MODULES)) for _ in range(args.repeat)]
+        ok = [r for r in runs if "error" not in r]
+        if not ok:
+            print(f"{module:<24} error: {runs[0]['error']}")
+            continue
+        heavy = ", ".join(ok[0]["heavy"]) or "-"
+        print(f"{module:<24}{median_of(ok, 'seconds') * 1000:>10.1f} ms   heavy: {heavy}")
+
+    print()
+    print("=" * 72)
+    print("Time to first response (fresh process: create_app + first request)")
+    print("=" * 72)
+    for label, method, path, kind in FIRST_REQUESTS:
+        code = REQUEST_SNIPPET.format(method=method, path=path, kind=kind)
+        runs = [run_snippet(code) for _ in range(args.repeat)]
+        ok = [r for r in runs if "error" not in r]
+        if not ok:
+            print(f"{label:<40} error: {runs[0]['error']}")
+            continue
+        print(f"{label:<40} create_app {median_of(ok, 'create_app') * 1000:>8.1f} ms   "
+              f"first response {median_of(ok, 'first_response') * 1000:>9.1f} ms   (HTTP {ok[0]['status']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Benchmark inference throughput vs. number of worker processes.
+- Samples frames from every .mp4 in mock-media (640x360, like the frontend).
+- Baseline: in-process count_persons called from --clients threads (one GIL).
+- Pool: InferenceWorkerPool with 1, 2, ... workers, frames handed over via
+  shared memory, same number of client threads per worker.
+- --batch N sends N frames per call (count_persons_batch, the scheduler's
+  path) instead of single frames; latency is then per batch.
+- Each pool first runs one batch larger than its whole shared-memory ring and
+  checks the counts against in-process inference (exit code 1 on mismatch).
+- Reports frames/sec, p50/p95 latency per call and speedup vs. in-process.
+
+Run from backend directory:
+  python scripts/bench_worker_pool.py --workers 1,2,4 --frames 200
+  INFERENCE_BACKEND=onnx python scripts/bench_worker_pool.py --workers 1,2,4 --cpus auto
+  python scripts/bench_worker_pool.py --workers 1,2 --batch 8
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Add backend root to path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+from app.services.latency import percentiles
+from app.sentinel.worker_pool import InferenceWorkerPool, parse_cpu_sets
+from bench_inference_backends import load_frames
+
+
+def drive(count_fn, frames: list, total: int, clients: int, batch: int = 0) -> dict:
+    """Push `total` calls through count_fn from `clients` threads (one frame per call, or a list of
+    `batch` frames); return frames/sec and latency per call."""
+    latencies = []
+    lock = threading.Lock()
+    next_index = [0]
+
+    def client():
+        while True:
+            with lock:
+                i = next_index[0]
+                if i >= total:
+                    return
+                next_index[0] += 1
+            item = ([frames[(i * batch + j) % len(frames)] for j in range(batch)] if batch
+                    else frames[i % len(frames)])
+            started = time.perf_counter()
+            count_fn(item)
+            elapsed = (time.perf_counter() - started) * 1000.0
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    return {"fps": total * max(1, batch) / wall, "latency_ms": percentiles(latencies)}
+
+
+def check_oversized_batch(pool: InferenceWorkerPool, frames: list) -> bool:
+    """Run one batch larger than the pool's whole ring; True if the counts match in-process inference."""
+    from app.sentinel.vision import count_persons_batch
+
+    size = pool.num_workers * pool.max_job_frames + 1
+    batch = [frames[i % len(frames)] for i in range(size)]
+    batch[1] = None  # skipped frames count 0
+    expected = [0 if img is None else c for img, c in zip(batch, count_persons_batch(batch))]
+    got = pool.count_persons_batch(batch)
+    if got != expected:
+        print(f"❌ {pool.num_workers} workers: batch of {size} frames: {got} != in-process {expected}")
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--frames", type=int, default=200, help="frames per run")
+    parser.add_argument("--clients", type=int, default=2, help="client threads per worker (in-process: total)")
+    parser.add_argument("--threads", type=int, default=Config.INFERENCE_THREADS,
+                        help="intra-op threads per worker (0 = CPUs / workers)")
+    parser.add_argument("--cpus", default=Config.INFERENCE_WORKER_CPUS, help='pinning: "", "auto" or "0,1;2,3"')
+    parser.add_argument("--batch", type=int, default=0, help="frames per call (0 = single frames)")
+    parser.add_argument("--skip-inprocess", action="store_true", help="skip the in-process baseline")
+    args = parser.parse_args()
+    calls = args.frames // args.batch if args.batch > 0 else args.frames
+
+    frames = load_frames(min(args.frames, 100), 15)
+    if not frames:
+        print(f"No frames found in {Config.MOCK_MEDIA_DIR}")
+        sys.exit(1)
+
+    print("=" * 72)
+    print(f"Inference worker pool benchmark ({args.frames} frames/run, batch={args.batch or 1}, backend={Config.INFERENCE_BACKEND}, "
+          f"{os.cpu_count()} CPUs)")
+    print("=" * 72)
+    print(f"{'mode':<16}{'threads':>9}{'clients':>9}{'frames/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'speedup':>9}")
+
+    baseline = None
+    if not args.skip_inprocess:
+        from app.sentinel.vision import count_persons, count_persons_batch, warm_up
+        warm_up()
+        r = drive(count_persons_batch if args.batch > 0 else count_persons, frames, calls, args.clients, args.batch)
+        baseline = r["fps"]
+        print(f"{'in-process':<16}{args.threads or '-':>9}{args.clients:>9}{r['fps']:>11.1f}"
+              f"{r['latency_ms']['p50']:>10.1f}{r['latency_ms']['p95']:>10.1f}{1.0:>9.2f}")
+
+    ok = True
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        pool = InferenceWorkerPool(workers, threads=args.threads or None,
+                                   cpu_sets=parse_cpu_sets(args.cpus, workers),
+                                   slot_bytes=int(Config.INFERENCE_WORKER_SLOT_MB * 1024 * 1024),
+                                   max_batch=args.batch or Config.INFERENCE_BATCH_MAX_SIZE)
+        try:
+            if not pool.wait_ready():
+                print(f"{workers} workers: not ready, skipped")
+                continue
+            if not check_oversized_batch(pool, frames):
+                ok = False
+                continue
+            clients = args.clients * workers
+            r = drive(pool.count_persons_batch if args.batch > 0 else pool.count_persons, frames, calls, clients,
+                      args.batch)
+            speedup = f"{r['fps'] / baseline:.2f}" if baseline else "-"
+            print(f"{f'{workers} workers':<16}{pool.threads:>9}{clients:>9}{r['fps']:>11.1f}"
+                  f"{r['latency_ms']['p50']:>10.1f}{r['latency_ms']['p95']:>10.1f}{speedup:>9}")
+        finally:
+            pool.close()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
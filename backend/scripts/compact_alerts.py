@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Alert retention job: backfill created_at, then compact old alerts into daily summaries.
+Alerts older than --older-than-days (default ALERT_COMPACT_AFTER_DAYS) are rolled
+into alert_daily_summaries (one document per classroom and UTC day) and deleted;
+see app/db/retention.py. Safe to rerun; meant for a daily cron.
+
+Run from backend directory:
+  python scripts/compact_alerts.py
+  python scripts/compact_alerts.py --older-than-days 60 --max-days 7 --dry-run
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add backend root to path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+from app.db.retention import backfill_created_at, compact_alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact old alerts into per-day summaries")
+    parser.add_argument("--older-than-days", type=float, default=Config.ALERT_COMPACT_AFTER_DAYS,
+                        help="Compact whole UTC days older than this (default: ALERT_COMPACT_AFTER_DAYS)")
+    parser.add_argument("--max-days", type=int, default=None, help="Compact at most this many days")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be compacted")
+    parser.add_argument("--skip-backfill", action="store_true", help="Don't add created_at to older alerts")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if not args.skip_backfill and not args.dry_run:
+        updated = backfill_created_at()
+        if updated:
+            print(f"✅ Backfilled created_at on {updated} alerts")
+
+    def report(day):
+        action = "would compact" if args.dry_run else "compacted"
+        note = " (resumed delete)" if day["resumed"] else ""
+        print(f"  {day['date']}: {action} {day['alerts']} alerts from {day['classrooms']} classrooms, "
+              f"deleted {day['deleted']}{note}")
+
+    totals = compact_alerts(older_than_days=args.older_than_days, max_days=args.max_days,
+                            dry_run=args.dry_run, on_day=report)
+    print(f"✅ {totals['days']} days before {totals['cutoff']}: {totals['alerts']} alerts summarized, "
+          f"{totals['deleted']} deleted ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
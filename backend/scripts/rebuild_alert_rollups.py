@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""Recompute the alert rollups behind GET /api/reports/summary from stored alerts.
+Needed once for alerts written before rollups existed, or after a logged rollup
+write failure. Compacted days (app/db/retention.py) are restored from their daily
+summaries as day buckets only. Run while ingestion is idle; see app/db/rollups.py.
+
+Run from backend directory:
+  python scripts/rebuild_alert_rollups.py
+"""
+import os
+import sys
+import time
+
+# Add backend root to path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.rollups import rebuild_rollups
+
+
+def main():
+    start = time.perf_counter()
+    stats = rebuild_rollups()
+    print(f"✅ Rebuilt {stats['buckets']} rollup buckets from {stats['alerts']} alerts and "
+          f"{stats['summaries']} daily summaries ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Replay benchmark: mock-media clips as simulated multi-classroom streams through the full pipeline.
+- Decodes every video in --media-dir (default mock-media) once, sampled at --fps and
+  resized/encoded like the frontend (640x360 JPEG q80). Classroom i replays clip
+  i mod N, looped, from a staggered offset, for --duration simulated seconds.
+- Frames carry simulated timestamps, so the rules (empty-class duration, cooldowns)
+  see stream time even when the replay runs faster than real time
+  (--speed 0 = as fast as possible, 1 = real time).
+- Modes:
+  inprocess  JPEG decode -> analyze_frames (motion -> count_persons -> motion score -> rules)
+  http       the Flask app through its test client, or a running server with --url,
+             via POST /api/sentinel/analyze-frames (multipart, --batch frames per request)
+- Reports throughput, p50/p95/p99 latency per request, RSS memory and alerts by type.
+  --output saves the run as JSON; --compare prints the change against a saved run.
+- --db mongomock (default) runs without a server; --db env uses MONGO_URI (e.g. a local mongod).
+
+Run from backend directory:
+  python scripts/replay_bench.py --classrooms 8 --duration 120
+  python scripts/replay_bench.py --mode http --url http://localhost:5000 --output run.json
+  python scripts/replay_bench.py --db env --compare run.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+
+# Add backend root to path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.* is imported in run(), inside use_mongomock() when --db mongomock
+
+FRAME_SIZE = (640, 360)  # same as the frontend canvas
+JPEG_QUALITY = 80
+MODES = ("inprocess", "http")
+
+
+def load_clips(media_dir: str, fps: float, max_frames: int) -> dict:
+    """{clip name: [JPEG bytes]} sampled at `fps` (stream time) from every video in media_dir."""
+    import cv2
+
+    clips = {}
+    for name in sorted(f for f in os.listdir(media_dir) if f.lower().endswith((".mp4", ".avi", ".mov", ".mkv"))):
+        cap = cv2.VideoCapture(os.path.join(media_dir, name))
+        source_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(1.0, source_fps / fps)
+        frames, index, next_take = [], 0, 0.0
+        while len(frames) < max_frames:
+            ok = cap.grab()
+            if not ok:
+                break
+            if index >= next_take:
+                ok, frame = cap.retrieve()
+                if ok:
+                    frame = cv2.resize(frame, FRAME_SIZE)
+                    ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                    if ok:
+                        frames.append(jpeg.tobytes())
+                next_take += step
+            index += 1
+        cap.release()
+        if frames:
+            clips[name] = frames
+    return clips
+
+
+def build_streams(clips: dict, classrooms: int, fps: float, duration: float, prefix: str) -> list:
+    """[(classroom_id, [(stream time, JPEG bytes)])]: classroom i loops clip i mod N from a staggered offset."""
+    names = sorted(clips)
+    per_stream = max(1, int(duration * fps))
+    streams = []
+    for i in range(classrooms):
+        frames = clips[names[i % len(names)]]
+        offset = (i // len(names)) * 7  # different starting frame per copy of the same clip
+        schedule = [(k / fps, frames[(offset + k) % len(frames)]) for k in range(per_stream)]
+        streams.append((f"{prefix}-{i + 1:03d}", schedule))
+    return streams
+
+
+def rss_mb() -> float:
+    """Current resident set size (MB)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if platform.system() == "Darwin" else peak / 1024.0
+
+
+def multipart_body(classroom_id: str, frames: list, base_ts: float) -> tuple:
+    """(body, content type) of an analyze-frames multipart request."""
+    boundary = uuid.uuid4().hex
+    meta = json.dumps([{"classroom_id": classroom_id, "timestamp": base_ts + t} for t, _ in frames])
+    parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="frames"\r\n\r\n{meta}\r\n'.encode()]
+    for i, (_, jpeg) in enumerate(frames):
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="frame"; filename="f{i}.jpg"\r\n'
+                     f'Content-Type: image/jpeg\r\n\r\n'.encode() + jpeg + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def make_sender(mode: str, url: str = None):
+    """Return a per-thread factory of send(classroom_id, frames, base_ts) -> number of alerts flagged."""
+    if mode == "inprocess":
+        from app.api.sentinel import _decode_frame_bytes
+        from app.sentinel.pipeline import analyze_frames
+
+        def factory():
+            def send(classroom_id, frames, base_ts):
+                batch = [(classroom_id, base_ts + t, _decode_frame_bytes(jpeg)) for t, jpeg in frames]
+                return sum(r["alert_created"] for r in analyze_frames(batch))
+            return send
+        return factory
+
+    if url:
+        endpoint = url.rstrip("/") + "/api/sentinel/analyze-frames"
+
+        def factory():
+            def send(classroom_id, frames, base_ts):
+                body, content_type = multipart_body(classroom_id, frames, base_ts)
+                req = urllib.request.Request(endpoint, data=body, method="POST",
+                                             headers={"Content-Type": content_type})
+                with urllib.request.urlopen(req) as resp:
+                    results = json.loads(resp.read())["frames"]
+                return sum(r["alert_created"] for r in results)
+            return send
+        return factory
+
+    from app.main import create_app
+    app = create_app()
+
+    def factory():
+        client = app.test_client()
+
+        def send(classroom_id, frames, base_ts):
+            body, content_type = multipart_body(classroom_id, frames, base_ts)
+            resp = client.post("/api/sentinel/analyze-frames", data=body, content_type=content_type)
+            if resp.status_code != 200:
+                raise RuntimeError(f"HTTP {resp.status_code}: {resp.get_data(as_text=True)[:200]}")
+            return sum(r["alert_created"] for r in resp.get_json()["frames"])
+        return send
+    return factory
+
+
+def replay(streams: list, factory, threads: int, batch: int, speed: float) -> dict:
+    """
+    Drive the streams: classroom i is owned by thread i mod `threads` (per-classroom order holds),
+    each thread sends its classrooms' frames in stream-time order, `batch` frames per request.
+    """
+    from app.services.latency import percentiles
+
+    duration = max(t for _, schedule in streams for t, _ in schedule[-1:])
+    base_ts = time.time() - duration - 1.0  # stream times map to the recent past (never "future" frames)
+    latencies, errors, flagged = [], [], [0]
+    lock = threading.Lock()
+
+    def worker(owned):
+        send = factory()
+        requests = []
+        for classroom_id, schedule in owned:
+            for k in range(0, len(schedule), batch):
+                chunk = schedule[k:k + batch]
+                requests.append((chunk[-1][0], classroom_id, chunk))
+        requests.sort(key=lambda r: r[0])
+        for due, classroom_id, chunk in requests:
+            if speed > 0:
+                delay = started + due / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            t0 = time.perf_counter()
+            try:
+                alerts = send(classroom_id, chunk, base_ts)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            with lock:
+                latencies.append(elapsed)
+                flagged[0] += alerts
+
+    owned = [streams[i::threads] for i in range(threads)]
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(o,)) for o in owned if o]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    wall = time.perf_counter() - started
+    frames = sum(len(schedule) for _, schedule in streams)
+    return {
+        "frames": frames,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_sec": round(wall, 3),
+        "throughput_fps": round(frames / wall, 2) if wall > 0 else 0.0,
+        "stream_sec": round(duration, 1),
+        "realtime_factor": round(duration / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": percentiles(latencies),
+        "rss_mb": {"before": round(rss_before, 1), "after": round(rss_mb(), 1), "peak": round(peak_rss_mb(), 1)},
+        "frames_with_alert": flagged[0],
+    }
+
+
+def count_alerts(classroom_ids: list, url: str = None) -> dict:
+    """Alerts stored for the replayed classrooms, by type."""
+    by_type = {}
+    for classroom_id in classroom_ids:
+        if url:
+            with urllib.request.urlopen(f"{url.rstrip('/')}/api/alerts?classroom_id={classroom_id}&limit=1000") as r:
+                alerts = json.loads(r.read())
+        else:
+            from app.db.store import get_alerts
+            alerts = get_alerts(classroom_id, limit=1000)
+        for alert in alerts:
+            by_type[alert["type"]] = by_type.get(alert["type"], 0) + 1
+    return by_type
+
+
+@contextlib.contextmanager
+def use_mongomock():
+    """Point app.db.connection at an in-memory mongomock client inside the block; the patches are
+    undone and the mock client dropped on exit."""
+    import mongomock
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError, DuplicateKeyError
+    import app.db.connection as connection
+
+    collection_class = mongomock.collection.Collection
+    original_client, original_bulk_write = connection.MongoClient, collection_class.bulk_write
+
+    # mongomock's bulk_write predates pymongo 4.9's UpdateOne(sort=...): apply update batches one by one
+    # (reading the operation's fields, pymongo has no public accessor) and report duplicate keys like MongoDB
+    def bulk_write(collection, requests, ordered=True, **kwargs):
+        requests = list(requests)
+        if not all(isinstance(op, UpdateOne) for op in requests):
+            return original_bulk_write(collection, requests, ordered=ordered, **kwargs)
+        errors = []
+        for index, op in enumerate(requests):
+            try:
+                collection.update_one(op._filter, op._doc, upsert=op._upsert)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "writeConcernErrors": [], "nInserted": 0})
+
+    connection.MongoClient = mongomock.MongoClient
+    collection_class.bulk_write = bulk_write
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.MongoClient = original_client
+        collection_class.bulk_write = original_bulk_write
+
+
+def print_result(mode: str, result: dict):
+    lat = result["latency_ms"]
+    print(f"{mode:<12}{result['frames']:>8}{result['throughput_fps']:>10.1f}{result['realtime_factor']:>8.1f}x"
+          f"{lat['p50']:>9.1f}{lat['p95']:>9.1f}{lat['p99']:>9.1f}{result['rss_mb']['peak']:>9.0f}"
+          f"  {json.dumps(result['alerts'])}" + (f"  errors={result['errors']}" if result["errors"] else ""))
+
+
+def print_comparison(current: dict, baseline: dict):
+    print(f"\nvs. {baseline.get('label') or 'baseline'} ({baseline.get('created_at')}):")
+    for mode, result in current["results"].items():
+        old = baseline.get("results", {}).get(mode)
+        if not old:
+            print(f"  {mode}: not in baseline")
+            continue
+
+        def change(new, before):
+            return f"{100.0 * (new - before) / before:+.1f}%" if before else "n/a"
+        print(f"  {mode}: throughput {change(result['throughput_fps'], old['throughput_fps'])}, "
+              f"p50 {change(result['latency_ms']['p50'], old['latency_ms']['p50'])}, "
+              f"p95 {change(result['latency_ms']['p95'], old['latency_ms']['p95'])}, "
+              f"p99 {change(result['latency_ms']['p99'], old['latency_ms']['p99'])}, "
+              f"peak RSS {change(result['rss_mb']['peak'], old['rss_mb']['peak'])}, "
+              f"alerts {old.get('alerts')} -> {result['alerts']}")
+
+
+def run(args, modes: list):
+    """Replay every mode, then print (and optionally save / compare) the results."""
+    from app.config import Config
+
+    media_dir = os.path.abspath(args.media_dir or Config.MOCK_MEDIA_DIR)
+    clip_frames = max(1, int(args.duration * args.fps))
+    clips = load_clips(media_dir, args.fps, clip_frames)
+    if not clips:
+        print(f"No videos found in {media_dir}")
+        sys.exit(1)
+
+    run_id = uuid.uuid4().hex[:6]
+    report = {
+        "label": args.label,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            **{k: v for k, v in vars(args).items() if k not in ("output", "compare", "label")},
+            "clips": {name: len(frames) for name, frames in clips.items()},
+            "inference_backend": Config.INFERENCE_BACKEND,
+            "inference_workers": Config.INFERENCE_WORKERS,
+            "inference_batching": Config.INFERENCE_BATCH_ENABLED,
+            "inference_gate": Config.INFERENCE_GATE_ENABLED,
+            "rule_state_backend": Config.RULE_STATE_BACKEND,
+            "write_behind": Config.PERSISTENCE_WRITE_BEHIND,
+            "cpus": os.cpu_count(),
+        },
+        "results": {},
+    }
+
+    print("=" * 96)
+    print(f"Replay benchmark: {args.classrooms} classrooms x {args.duration:g}s @ {args.fps:g} fps, "
+          f"{len(clips)} clips, speed={'max' if args.speed <= 0 else f'{args.speed:g}x'}, "
+          f"backend={Config.INFERENCE_BACKEND}, db={args.db if not args.url else args.url}")
+    print("=" * 96)
+
+    streams_by_mode = {}
+    for mode in modes:
+        streams = build_streams(clips, args.classrooms, args.fps, args.duration, f"replay-{run_id}-{mode}")
+        streams_by_mode[mode] = streams
+        factory = make_sender(mode, args.url if mode == "http" else None)
+        report["results"][mode] = replay(streams, factory, max(1, args.threads), max(1, args.batch), args.speed)
+
+    # Let write-behind persistence flush before counting stored alerts
+    from app.db.writer import get_writer
+    writer = get_writer()
+    if writer is not None:
+        writer.close()
+    print(f"{'mode':<12}{'frames':>8}{'fps':>10}{'x real':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'RSS MB':>9}  alerts")
+    for mode, result in report["results"].items():
+        url = args.url if mode == "http" else None
+        result["alerts"] = count_alerts([cid for cid, _ in streams_by_mode[mode]], url)
+        print_result(mode, result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--media-dir", help="directory of videos (default: MOCK_MEDIA_DIR)")
+    parser.add_argument("--classrooms", type=int, default=8, help="simulated classrooms (streams)")
+    parser.add_argument("--fps", type=float, default=0.67, help="frames per second per classroom (stream time)")
+    parser.add_argument("--duration", type=float, default=120, help="simulated seconds per stream")
+    parser.add_argument("--speed", type=float, default=0, help="replay speed vs. stream time (0 = max)")
+    parser.add_argument("--threads", type=int, default=4, help="client threads")
+    parser.add_argument("--batch", type=int, default=1, help="frames per request (one classroom)")
+    parser.add_argument("--mode", default="inprocess,http", help='comma-separated: "inprocess", "http"')
+    parser.add_argument("--url", help="running backend for --mode http (default: Flask test client)")
+    parser.add_argument("--db", default="mongomock", choices=("mongomock", "env"),
+                        help="in-process MongoDB: mongomock, or MONGO_URI from the environment")
+    parser.add_argument("--label", default="", help="label stored with the results")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.mode.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(unknown)}")
+    remote_only = bool(args.url) and modes == ["http"]
+    if args.db == "mongomock" or remote_only:
+        # Config requires MONGO_URI; only the server needs a real one when every request goes to --url
+        os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/")
+    with use_mongomock() if args.db == "mongomock" and not remote_only else contextlib.nullcontext():
+        run(args, modes)
+
+
+if __name__ == "__main__":
+    main()
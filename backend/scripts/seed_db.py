@@ -26,7 +26,7 @@ import shutil
 # Add backend root to path so we can import app
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.db.store import upsert_classroom, insert_alert, upsert_video
+from app.db.store import bulk_upsert_classrooms, insert_alert, upsert_video
 
 NUM_CLASSROOMS = 20
 BACKEND_MOCK_MEDIA = "mock-media"  # relative to repo root (parent of backend)
@@ -91,11 +91,11 @@ def sync_mock_media():
 def seed_classrooms():
     """Create 20 classrooms: id '1'..'20', name 'Class 1'..'Class 20'. No video_id."""
     from datetime import datetime, timezone
-    now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-    for i in range(1, NUM_CLASSROOMS + 1):
-        cid = str(i)
-        name = f"Class {i}"
-        upsert_classroom(cid, name=name, current_status="active", video_id=None, updated_at=now)
+    now = datetime.now(timezone.utc).isoformat(timespec="microseconds").replace("+00:00", "Z")
+    bulk_upsert_classrooms([
+        {"id": str(i), "name": f"Class {i}", "current_status": "active", "updated_at": now}
+        for i in range(1, NUM_CLASSROOMS + 1)
+    ])
     print(f"Seeded {NUM_CLASSROOMS} classrooms (id 1..{NUM_CLASSROOMS})")
 
 
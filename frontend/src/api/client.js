@@ -1,6 +1,9 @@
 /** API client for Vision X Sentinel backend. */
 const API_BASE_URL = 'http://localhost:5000/api';
 
+/** Server-Sent Events stream of new alerts and classroom status changes. */
+export const EVENTS_URL = `${API_BASE_URL}/events`;
+
 /**
  * Get all classrooms.
  * @returns {Promise<Array>} List of classrooms
@@ -32,19 +35,105 @@ export async function getClassroom(id) {
 /**
  * Get alerts, optionally filtered by classroom ID.
  * @param {string|null} classroomId - Optional classroom ID to filter
+ * @param {Object} [options]
+ * @param {number} [options.limit] - Max alerts to return (newest first)
  * @returns {Promise<Array>} List of alerts
  */
-export async function getAlerts(classroomId = null) {
-  const url = classroomId
-    ? `${API_BASE_URL}/alerts?classroom_id=${classroomId}`
-    : `${API_BASE_URL}/alerts`;
-  const response = await fetch(url);
+export async function getAlerts(classroomId = null, { limit } = {}) {
+  const params = new URLSearchParams();
+  if (classroomId) params.set('classroom_id', classroomId);
+  if (limit) params.set('limit', String(limit));
+  const query = params.toString();
+  const response = await fetch(`${API_BASE_URL}/alerts${query ? `?${query}` : ''}`);
+  if (!response.ok) {
+    throw new Error(`Failed to fetch alerts: ${response.statusText}`);
+  }
+  return response.json();
+}
+
+/**
+ * Incremental alert poll: only alerts inserted after `since`, with ETag revalidation.
+ * Without `since` returns the newest alerts (up to `limit`).
+ * @param {string|null} since - X-Poll-Cursor of the previous poll (insertion sequence)
+ * @param {string|null} etag - ETag from the previous poll
+ * @param {Object} [options]
+ * @param {number} [options.limit] - Max alerts to return
+ * @returns {Promise<{alerts: Array, etag: string|null, cursor: string|null, notModified: boolean}>}
+ */
+export async function getAlertsSince(since = null, etag = null, { limit } = {}) {
+  const params = new URLSearchParams();
+  if (since) params.set('since', since);
+  if (limit) params.set('limit', String(limit));
+  const query = params.toString();
+  const headers = etag ? { 'If-None-Match': etag } : {};
+  const response = await fetch(`${API_BASE_URL}/alerts${query ? `?${query}` : ''}`, { headers, cache: 'no-store' });
+  if (response.status === 304) {
+    return { alerts: [], etag, cursor: since, notModified: true };
+  }
   if (!response.ok) {
     throw new Error(`Failed to fetch alerts: ${response.statusText}`);
   }
+  return {
+    alerts: await response.json(),
+    etag: response.headers.get('ETag'),
+    cursor: response.headers.get('X-Poll-Cursor'),
+    notModified: false,
+  };
+}
+
+/**
+ * Keyset cursor for an alert (matches the backend's "timestamp|id" format).
+ * @param {Object} alert
+ * @returns {string}
+ */
+export function alertCursor(alert) {
+  return `${alert.timestamp}|${alert.id}`;
+}
+
+/**
+ * Alert summary for a time range, from the backend's pre-aggregated rollups.
+ * @param {Object} [options]
+ * @param {string} [options.classroomId] - Classroom ID (default: all classrooms)
+ * @param {string} [options.from] - ISO 8601 start (default: 24 hours before `to`)
+ * @param {string} [options.to] - ISO 8601 end, exclusive (default: now)
+ * @param {string} [options.interval] - "hour" or "day" to include a per-bucket series
+ * @returns {Promise<Object>} Summary (total_alerts, alert_counts, classrooms, series)
+ */
+export async function getReportSummary({ classroomId, from, to, interval } = {}) {
+  const params = new URLSearchParams();
+  if (classroomId) params.set('classroom_id', classroomId);
+  if (from) params.set('from', from);
+  if (to) params.set('to', to);
+  if (interval) params.set('interval', interval);
+  const query = params.toString();
+  const response = await fetch(`${API_BASE_URL}/reports/summary${query ? `?${query}` : ''}`);
+  if (!response.ok) {
+    throw new Error(`Failed to fetch report summary: ${response.statusText}`);
+  }
   return response.json();
 }
 
+/**
+ * Download URL of a streamed report export (use as a link `href` or `window.location`).
+ * @param {Object} [options]
+ * @param {string} [options.format] - "csv" (default), "ndjson" or "pdf"
+ * @param {string} [options.dataset] - "alerts" (default) or "daily" (per-classroom daily counts)
+ * @param {string} [options.classroomId] - Classroom ID (default: all classrooms)
+ * @param {string} [options.from] - ISO 8601 start (default: 24 hours before `to`)
+ * @param {string} [options.to] - ISO 8601 end, exclusive (default: now)
+ * @returns {string} Export URL
+ */
+export function getReportExportUrl({ format, dataset, classroomId, from, to } = {}) {
+  const params = new URLSearchParams();
+  if (format) params.set('format', format);
+  if (dataset) params.set('dataset', dataset);
+  if (classroomId) params.set('classroom_id', classroomId);
+  if (from) params.set('from', from);
+  if (to) params.set('to', to);
+  const query = params.toString();
+  return `${API_BASE_URL}/reports/export${query ? `?${query}` : ''}`;
+}
+
 /**
  * Get all videos, optionally filtered by classroom ID.
  * @param {string|null} classroomId - Optional classroom ID to filter
@@ -100,6 +189,47 @@ export async function analyzeFrame(classroomId, frameBase64) {
   return response.json();
 }
 
+/**
+ * Send a raw JPEG frame to backend for analysis (no base64/JSON overhead).
+ * @param {string} classroomId - Classroom ID (e.g. "8A")
+ * @param {Blob} frameBlob - JPEG image blob (e.g. from canvas.toBlob)
+ * @returns {Promise<Object>} Analysis result
+ */
+export async function analyzeFrameBinary(classroomId, frameBlob) {
+  const response = await fetch(`${API_BASE_URL}/sentinel/analyze-frame/raw`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'image/jpeg',
+      'X-Classroom-Id': classroomId,
+    },
+    body: frameBlob,
+  });
+  if (!response.ok) {
+    throw new Error(`Failed to analyze frame: ${response.statusText}`);
+  }
+  return response.json();
+}
+
+/**
+ * Send a backlog of timestamped JPEG frames for batch analysis (replayed in time order).
+ * @param {string} classroomId - Classroom ID (e.g. "8A")
+ * @param {Array<{timestamp: number, blob: Blob}>} frames - Frames with capture time (ms since epoch)
+ * @returns {Promise<Object>} { frames: [analysis result per frame] }
+ */
+export async function analyzeFramesBinary(classroomId, frames) {
+  const form = new FormData();
+  form.append('frames', JSON.stringify(frames.map((f) => ({ classroom_id: classroomId, timestamp: f.timestamp }))));
+  frames.forEach((f, i) => form.append('frame', f.blob, `frame-${i}.jpg`));
+  const response = await fetch(`${API_BASE_URL}/sentinel/analyze-frames`, {
+    method: 'POST',
+    body: form,
+  });
+  if (!response.ok) {
+    throw new Error(`Failed to analyze frames: ${response.statusText}`);
+  }
+  return response.json();
+}
+
 /**
  * Send audio level to backend for loud noise detection.
  * @param {string} classroomId - Classroom ID (e.g. "8A")
@@ -122,3 +252,16 @@ export async function sendAudioLevel(classroomId, level) {
   }
   return response.json();
 }
+
+/**
+ * Get classrooms whose frames are ingested server-side (no browser upload needed).
+ * @returns {Promise<Array<string>>} Classroom IDs with a running ingest worker
+ */
+export async function getIngestedClassroomIds() {
+  const response = await fetch(`${API_BASE_URL}/ingest`);
+  if (!response.ok) {
+    throw new Error(`Failed to fetch ingest status: ${response.statusText}`);
+  }
+  const data = await response.json();
+  return (data.workers || []).filter((w) => w.running).map((w) => w.classroom_id);
+}
@@ -1,5 +1,5 @@
 import React, { useRef, useEffect, useState } from 'react';
-import { sendAudioLevel } from '../api/client';
+import { sendAudioLevel, analyzeFramesBinary } from '../api/client';
 
 function ClassCard({ classroom, videoUrl, onFrameCapture, hasNewAlert = false }) {
   const videoRef = useRef(null);
@@ -14,14 +14,39 @@ function ClassCard({ classroom, videoUrl, onFrameCapture, hasNewAlert = false })
   const audioResumeHandlerRef = useRef(null);
   const consecutiveFailuresRef = useRef(0);
   const retryCheckIntervalRef = useRef(null);
+  const backlogRef = useRef([]);
   const onFrameCaptureRef = useRef(onFrameCapture);
   const isSeekingRef = useRef(false);
   const cameraStreamRef = useRef(null);
   const MAX_CONSECUTIVE_FAILURES = 3;
   const RETRY_CHECK_INTERVAL = 5000;
+  // Frames kept while the backend is unreachable, replayed in one batch on recovery
+  const MAX_BACKLOG_FRAMES = 40;
+  const BACKLOG_BATCH_SIZE = 20;
+
+  // Keep a frame that could not be sent (oldest dropped beyond MAX_BACKLOG_FRAMES)
+  const bufferFrame = (blob, timestamp) => {
+    backlogRef.current.push({ blob, timestamp });
+    if (backlogRef.current.length > MAX_BACKLOG_FRAMES) {
+      backlogRef.current.splice(0, backlogRef.current.length - MAX_BACKLOG_FRAMES);
+    }
+  };
+
+  // Replay buffered frames oldest first; throws (keeping the rest) if a batch fails
+  const flushBacklog = async (classroomId) => {
+    while (backlogRef.current.length > 0) {
+      const batch = backlogRef.current.slice(0, BACKLOG_BATCH_SIZE);
+      await analyzeFramesBinary(classroomId, batch);
+      backlogRef.current.splice(0, batch.length);
+    }
+  };
 
   onFrameCaptureRef.current = onFrameCapture;
 
+  // Encode the canvas as a JPEG blob (sent as raw bytes, not base64)
+  const canvasToJpegBlob = (canvas) =>
+    new Promise((resolve) => canvas.toBlob(resolve, 'image/jpeg', 0.8));
+
   // Handle camera stream setup/cleanup
   useEffect(() => {
     const video = videoRef.current;
@@ -191,17 +216,28 @@ function ClassCard({ classroom, videoUrl, onFrameCapture, hasNewAlert = false })
       canvas.height = 360;
 
       captureIntervalRef.current = setInterval(async () => {
+        // No handler: frames for this classroom are ingested server-side
+        if (!onFrameCaptureRef.current) return;
         if (video.readyState >= 2) {
           try {
             const ctx = canvas.getContext('2d');
             ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
-            const frameBase64 = canvas.toDataURL('image/jpeg', 0.8);
+            const capturedAt = Date.now();
+            const frameBlob = await canvasToJpegBlob(canvas);
             const fn = onFrameCaptureRef.current;
-            if (fn && frameBase64) {
+            if (fn && frameBlob) {
+              const hasBacklog = backlogRef.current.length > 0;
               try {
-                await fn(classroom.id, frameBase64);
+                if (hasBacklog) {
+                  // Earlier frames failed: send them first, with this one, in order
+                  bufferFrame(frameBlob, capturedAt);
+                  await flushBacklog(classroom.id);
+                } else {
+                  await fn(classroom.id, frameBlob);
+                }
                 consecutiveFailuresRef.current = 0;
               } catch (err) {
+                if (!hasBacklog) bufferFrame(frameBlob, capturedAt);
                 consecutiveFailuresRef.current += 1;
                 if (consecutiveFailuresRef.current >= MAX_CONSECUTIVE_FAILURES) {
                   if (captureIntervalRef.current) {
@@ -214,10 +250,13 @@ function ClassCard({ classroom, videoUrl, onFrameCapture, hasNewAlert = false })
                         try {
                           const ctx = canvas.getContext('2d');
                           ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
-                          const frameBase64 = canvas.toDataURL('image/jpeg', 0.8);
+                          const capturedAt = Date.now();
+                          const frameBlob = await canvasToJpegBlob(canvas);
                           const fn = onFrameCaptureRef.current;
-                          if (fn && frameBase64) {
-                            await fn(classroom.id, frameBase64);
+                          if (fn && frameBlob) {
+                            // Send the backlog plus this frame in order; on failure all stay buffered
+                            bufferFrame(frameBlob, capturedAt);
+                            await flushBacklog(classroom.id);
                             if (retryCheckIntervalRef.current) {
                               clearInterval(retryCheckIntervalRef.current);
                               retryCheckIntervalRef.current = null;
@@ -1,14 +1,15 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import ClassCard from './ClassCard';
-import { getClassrooms, getVideos, analyzeFrame } from '../api/client';
+import { getClassrooms, getVideos, getIngestedClassroomIds, analyzeFrameBinary } from '../api/client';
 import { useAlerts } from '../hooks/useAlerts';
 
 function Dashboard({ searchQuery = '' }) {
   const [classrooms, setClassrooms] = useState([]);
   const [videos, setVideos] = useState([]);
+  const [ingestedIds, setIngestedIds] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
-  const { recentAlertClassroomIds } = useAlerts();
+  const { recentAlertClassroomIds, classroomStatuses } = useAlerts();
 
   useEffect(() => {
     loadData();
@@ -24,6 +25,10 @@ function Dashboard({ searchQuery = '' }) {
       setClassrooms(classroomsData);
       setVideos(videosData);
       setError(null);
+      // Classrooms analyzed server-side don't need frame uploads (optional endpoint)
+      getIngestedClassroomIds()
+        .then(setIngestedIds)
+        .catch(() => setIngestedIds([]));
     } catch (err) {
       setError(err.message);
       console.error('Failed to load data:', err);
@@ -32,8 +37,8 @@ function Dashboard({ searchQuery = '' }) {
     }
   };
 
-  const handleFrameCapture = useCallback(async (classroomId, frameBase64) => {
-    await analyzeFrame(classroomId, frameBase64);
+  const handleFrameCapture = useCallback(async (classroomId, frameBlob) => {
+    await analyzeFrameBinary(classroomId, frameBlob);
   }, []);
 
   // Map classroom_id -> video URL (videos have classroom_id; first video per classroom wins)
@@ -74,12 +79,17 @@ function Dashboard({ searchQuery = '' }) {
         {filteredClassrooms.map((classroom) => {
           // Get video URL from videos that have this classroom_id
           const videoUrl = classroomIdToVideoUrl[classroom.id] || null;
+          // Status pushed over the event stream overrides the one loaded on page load
+          const liveStatus = classroomStatuses[classroom.id];
+          const liveClassroom = liveStatus && liveStatus !== classroom.current_status
+            ? { ...classroom, current_status: liveStatus }
+            : classroom;
           return (
             <ClassCard
               key={classroom.id}
-              classroom={classroom}
+              classroom={liveClassroom}
               videoUrl={videoUrl}
-              onFrameCapture={handleFrameCapture}
+              onFrameCapture={ingestedIds.includes(classroom.id) ? null : handleFrameCapture}
               hasNewAlert={recentAlertClassroomIds.includes(classroom.id)}
             />
           );
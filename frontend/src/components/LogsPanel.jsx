@@ -22,7 +22,7 @@ function LogsPanel({ isOpen, onClose }) {
     try {
       setLoading(true);
       const [alertsData, classroomsData] = await Promise.all([
-        getAlerts(),
+        getAlerts(null, { limit: 20 }),
         getClassrooms(),
       ]);
       setAlerts(alertsData.slice(0, 20));
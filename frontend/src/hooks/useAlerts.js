@@ -1,8 +1,10 @@
 import { useState, useEffect, useRef } from 'react';
 import toast from 'react-hot-toast';
-import { getAlerts } from '../api/client';
+import { getAlertsSince, EVENTS_URL } from '../api/client';
 
 const POLL_INTERVAL_MS = 3000;
+// Alerts per poll (the first poll loads the newest ones; later polls page through new ones)
+const POLL_LIMIT = 100;
 
 const ALERT_LABELS = {
   empty_class: 'Empty Class',
@@ -11,56 +13,103 @@ const ALERT_LABELS = {
 };
 
 /**
- * Polls GET /api/alerts every 3s, shows a toast for each new alert.
- * Returns { alerts, recentAlertClassroomIds } for optional card indicators.
+ * Loads alerts once, then receives new alerts and classroom status changes
+ * over the GET /api/events stream (Server-Sent Events) and shows a toast for
+ * each new alert. While the stream is down it falls back to polling
+ * GET /api/alerts every 3s, asking only for alerts inserted since the previous
+ * poll (?since=X-Poll-Cursor, so backdated alerts are not missed) and
+ * revalidating with If-None-Match, so an idle poll is a 304.
+ * Returns { alerts, recentAlertClassroomIds, classroomStatuses } for card indicators.
  */
 export function useAlerts() {
   const [alerts, setAlerts] = useState([]);
+  const [classroomStatuses, setClassroomStatuses] = useState({});
   const seenIdsRef = useRef(new Set());
   const firstPollDoneRef = useRef(false);
+  const sinceRef = useRef(null);
+  const etagRef = useRef(null);
+  const streamingRef = useRef(false);
 
   useEffect(() => {
     let cancelled = false;
 
-    const poll = async () => {
-      try {
-        const list = await getAlerts();
-        if (cancelled) return;
-        setAlerts(list);
+    // Add alerts not seen yet (kept newest first) and toast each one
+    const handleNewAlerts = (list, notify) => {
+      const fresh = list.filter((a) => a.id && !seenIdsRef.current.has(a.id));
+      if (fresh.length === 0) return;
+      fresh.forEach((a) => seenIdsRef.current.add(a.id));
+      setAlerts((prev) =>
+        [...fresh, ...prev].sort((a, b) => (a.timestamp < b.timestamp ? 1 : a.timestamp > b.timestamp ? -1 : 0))
+      );
+      if (!notify) return;
+      for (const a of fresh) {
+        const label = ALERT_LABELS[a.type] || a.type;
+        const msg = `${label} detected in ${a.classroom_id}`;
+        toast(msg, {
+          icon: '⚠️',
+          duration: 5000,
+        });
+      }
+    };
 
-        if (!firstPollDoneRef.current) {
+    // force: fetch even while the event stream is up (resync after a gap in the stream)
+    const poll = async ({ force = false } = {}) => {
+      // The event stream delivers new alerts; polling is only the fallback
+      if (!force && firstPollDoneRef.current && streamingRef.current) return;
+      try {
+        let full = true;
+        while (full && !cancelled) {
+          const { alerts: list, etag, cursor, notModified } = await getAlertsSince(
+            sinceRef.current, etagRef.current, { limit: POLL_LIMIT }
+          );
+          if (cancelled || notModified) return;
+          etagRef.current = etag;
+          const isFirstPoll = !firstPollDoneRef.current;
           firstPollDoneRef.current = true;
-          list.forEach((a) => a.id && seenIdsRef.current.add(a.id));
-          return;
-        }
-
-        for (const a of list) {
-          const id = a.id;
-          if (id && !seenIdsRef.current.has(id)) {
-            seenIdsRef.current.add(id);
-            const label = ALERT_LABELS[a.type] || a.type;
-            const msg = `${label} detected in ${a.classroom_id}`;
-            toast(msg, {
-              icon: '⚠️',
-              duration: 5000,
-            });
-          }
+          if (cursor) sinceRef.current = cursor;
+          handleNewAlerts(list, !isFirstPoll);
+          // A full page of new alerts: fetch the rest now (the first poll only loads the newest page)
+          full = !isFirstPoll && list.length === POLL_LIMIT;
         }
       } catch (err) {
         if (!cancelled) console.error('Alerts poll failed:', err);
       }
     };
 
+    let events = null;
+    if (window.EventSource) {
+      events = new EventSource(EVENTS_URL);
+      events.onopen = () => {
+        streamingRef.current = true;
+      };
+      events.onerror = () => {
+        streamingRef.current = false;
+      };
+      events.addEventListener('alert', (e) => {
+        if (firstPollDoneRef.current) handleNewAlerts([JSON.parse(e.data)], true);
+      });
+      events.addEventListener('classroom_status', (e) => {
+        const { id, current_status: status } = JSON.parse(e.data);
+        setClassroomStatuses((prev) => ({ ...prev, [id]: status }));
+      });
+      // Too far behind for the server's buffer: catch up through the REST API
+      events.addEventListener('resync', () => {
+        etagRef.current = null;
+        poll({ force: true });
+      });
+    }
+
     poll();
-    const interval = setInterval(poll, POLL_INTERVAL_MS);
+    const interval = setInterval(() => poll(), POLL_INTERVAL_MS);
     return () => {
       cancelled = true;
       clearInterval(interval);
+      if (events) events.close();
     };
   }, []);
 
   // Classroom IDs that have at least one alert in the current list (for card indicator)
   const recentAlertClassroomIds = [...new Set(alerts.map((a) => a.classroom_id))];
 
-  return { alerts, recentAlertClassroomIds };
+  return { alerts, recentAlertClassroomIds, classroomStatuses };
 }